@@ -0,0 +1,95 @@
+"""
+Runs the whole benchmark suite and writes the results to a JSON file, along with the environment they were measured
+in, so that releases can be compared.
+
+Usage:
+    python -m benchmarks --output results.json
+    python -m benchmarks --quick --only update_cost contention
+    python -m benchmarks --output new.json --compare old.json
+"""
+import datetime
+import json
+import os
+import platform
+import sys
+
+import progressBarDistributed
+from progressBarDistributed.atomicOps import HAS_NATIVE_ATOMICS
+from benchmarks import falseSharing, importTime, monitorCost, renderCost, segmentLatency, updateCost
+
+# name: (function, arguments, quick arguments)
+BENCHMARKS = {
+    "update_cost": (updateCost.main, dict(n_calls=1000000, repeats=5), dict(n_calls=100000, repeats=3)),
+    "contention": (falseSharing.main, dict(n_updates=200000), dict(n_updates=20000)),
+    "monitor_cost": (monitorCost.main, dict(n_slots=(10, 100, 1000, 10000, 100000)),
+                     dict(n_slots=(10, 1000, 100000), n_ticks=50, duration=0.3)),
+    "segment_latency": (segmentLatency.main, dict(n_workers=(1, 1000, 100000)),
+                        dict(n_workers=(1, 100000), repeats=20)),
+    "import_time": (importTime.main, dict(repeats=10), dict(repeats=3)),
+    "render_cost": (renderCost.main, dict(n_bars=(1, 10, 50)), dict(n_bars=(1, 50), duration=0.3)),
+}
+
+
+def environment():
+    return {
+        "version": progressBarDistributed.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "native_atomics": HAS_NATIVE_ATOMICS,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def run(names=None, quick=False):
+    """Runs the benchmarks `names` (all by default) and returns their results with the environment"""
+    results = {"environment": environment(), "quick": quick, "results": {}}
+    for name in names or BENCHMARKS:
+        function, kwargs, quick_kwargs = BENCHMARKS[name]
+        print(f"== {name}")
+        # Round trip through JSON so that the results look the same as when they are loaded from a file
+        results["results"][name] = json.loads(json.dumps(function(**(quick_kwargs if quick else kwargs))))
+    return results
+
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old, new):
+    """Prints the relative change of every measurement present in both results"""
+    old_flat, new_flat = _flatten(old["results"]), _flatten(new["results"])
+    print(f"== {old['environment']['version']} -> {new['environment']['version']}")
+    for key in sorted(old_flat.keys() & new_flat.keys()):
+        change = new_flat[key] / old_flat[key] - 1 if old_flat[key] else float("nan")
+        print(f"{key:>70s} {old_flat[key]:>14.4g} {new_flat[key]:>14.4g} {change:>+9.1%}")
+
+
+def main(output=None, only=None, quick=False, compare_with=None):
+    results = run(only, quick)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}")
+    if compare_with:
+        with open(compare_with) as f:
+            compare(json.load(f), results)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog=f"{os.path.basename(sys.executable)} -m benchmarks")
+    parser.add_argument("--output", "-o", default=None, help="JSON file to write the results to")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for a smoke run")
+    parser.add_argument("--compare", dest="compare_with", default=None, help="Previous JSON results to compare to")
+    args = parser.parse_args()
+    main(**vars(args))
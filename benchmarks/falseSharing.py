@@ -0,0 +1,73 @@
+"""
+Update throughput of concurrent worker processes for the packed and padded layouts.
+
+Each process hammers its own slot with update(1). With the packed layout, up to 8 step counters share a cache
+line, so the line bounces between cores; the padded layout gives each worker its own cache line.
+
+Usage:
+    python -m benchmarks.falseSharing --n_updates 200000
+"""
+import multiprocessing
+import os
+import time
+
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar, SharedMemoryProgressBarWorker
+
+
+def _hammer(worker_id, shm_name, n_updates, start_event):
+    with SharedMemoryProgressBarWorker(worker_id, shm_name) as worker:
+        update = worker.update
+        start_event.wait()
+        for _ in range(n_updates):
+            update(1)
+
+
+def measure_throughput(n_processes, layout, n_updates=200000):
+    """Returns the aggregated number of updates per second of n_processes workers"""
+    pbar = SharedMemoryProgressBar(n_processes, layout=layout)
+    try:
+        start_event = multiprocessing.Event()
+        processes = [multiprocessing.Process(target=_hammer, args=(i, pbar.shm_name, n_updates, start_event))
+                     for i in range(n_processes)]
+        for p in processes:
+            p.start()
+        time.sleep(0.5)  # Let all the processes attach
+        t0 = time.perf_counter()
+        start_event.set()
+        for p in processes:
+            p.join()
+        elapsed = time.perf_counter() - t0
+        assert pbar.get_cum_steps() == n_processes * n_updates
+    finally:
+        pbar.close()
+    return n_processes * n_updates / elapsed
+
+
+def _default_process_counts():
+    n_cpus = os.cpu_count() or 1
+    counts = []
+    n = 1
+    while n < n_cpus:
+        counts.append(n)
+        n *= 2
+    counts.append(n_cpus)
+    return counts
+
+
+def main(n_updates=200000, n_processes=None):
+    n_processes = n_processes or _default_process_counts()
+    results = {}
+    print(f"{'processes':>10s} {'packed (upd/s)':>16s} {'padded (upd/s)':>16s}")
+    for n in n_processes:
+        results[n] = {layout: measure_throughput(n, layout, n_updates) for layout in ("packed", "padded")}
+        print(f"{n:>10d} {results[n]['packed']:>16.0f} {results[n]['padded']:>16.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_updates", type=int, default=200000)
+    parser.add_argument("--n_processes", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+    main(**vars(args))
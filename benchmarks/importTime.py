@@ -0,0 +1,56 @@
+"""
+Import time of the worker side vs the progress bar side of the package, measured in fresh interpreters, along with
+the heavy third-party modules that each import loads.
+
+Usage:
+    python -m benchmarks.importTime --repeats 10
+"""
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ("numpy", "tqdm", "joblib")
+
+IMPORTS = {
+    "worker": "from progressBarDistributed import SharedMemoryProgressBarWorker",
+    "worker (via shmProgressBar)": "from progressBarDistributed.shmProgressBar import SharedMemoryProgressBarWorker",
+    "progress bar": "from progressBarDistributed import SharedMemoryProgressBar",
+}
+
+_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - t0
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def measure_import_ms(statement, repeats=10):
+    """Returns the best time in milliseconds of `statement` in a fresh interpreter, and the heavy modules it loaded"""
+    best = float("inf")
+    loaded = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", _SCRIPT.format(statement=statement, heavy=HEAVY_MODULES)],
+                                check=True, capture_output=True, text=True).stdout
+        elapsed, loaded = json.loads(output)
+        best = min(best, elapsed * 1e3)
+    return best, loaded
+
+
+def main(repeats=10):
+    results = {}
+    print(f"{'import':>30s} {'time (ms)':>10s}  heavy modules loaded")
+    for name, statement in IMPORTS.items():
+        elapsed, loaded = measure_import_ms(statement, repeats)
+        results[name] = {"ms": elapsed, "heavy_modules": loaded}
+        print(f"{name:>30s} {elapsed:>10.1f}  {', '.join(loaded) or '-'}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+    main(**vars(args))
@@ -0,0 +1,71 @@
+"""
+Cost of one monitor tick (get_cum_steps + get_total_steps + are_workers_ready) as the number of slots grows,
+scanning all the slots vs reading the aggregates maintained in the header (aggregates=True), and CPU usage of the
+progress thread while the workers are running.
+
+Usage:
+    python -m benchmarks.monitorCost --n_slots 10 1000 100000
+"""
+import io
+import time
+
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar
+
+
+def measure_tick_us(n_slots, aggregates, n_ticks=200):
+    """Returns the mean cost in microseconds of one monitor tick"""
+    pbar = SharedMemoryProgressBar(n_slots, aggregates=aggregates)
+    try:
+        for worker_id in range(n_slots):
+            pbar.set_total_steps(10, worker_id)
+        t0 = time.perf_counter()
+        for _ in range(n_ticks):
+            pbar.get_cum_steps()
+            pbar.get_total_steps()
+            pbar.are_workers_ready()
+        elapsed = time.perf_counter() - t0
+    finally:
+        pbar.close()
+    return elapsed / n_ticks * 1e6
+
+
+def measure_thread_cpu(n_slots, aggregates, refresh_seconds=0.05, duration=1.):
+    """Returns the fraction of a core used by the progress thread refreshing a running bar every refresh_seconds"""
+    pbar = SharedMemoryProgressBar(n_slots, aggregates=aggregates)
+    try:
+        for worker_id in range(n_slots):
+            pbar.set_total_steps(10, worker_id)
+        pbar.progress_thread = pbar.progress_bar_thread(refresh_seconds, file=io.StringIO())
+        time.sleep(refresh_seconds)  # Skip the start of the thread
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        time.sleep(duration)  # The main thread is idle, so the process CPU time is the one of the progress thread
+        cpu = (time.process_time() - cpu0) / (time.perf_counter() - t0)
+    finally:
+        pbar.close()
+    return cpu
+
+
+def main(n_slots=(10, 100, 1000, 10000, 100000), n_ticks=200, refresh_seconds=0.05, duration=1.):
+    results = {}
+    print(f"{'slots':>10s} {'scan (us/tick)':>16s} {'aggregates (us/tick)':>22s} "
+          f"{'scan thread CPU':>16s} {'aggregates thread CPU':>22s}")
+    for n in n_slots:
+        results[n] = {"scan": measure_tick_us(n, False, n_ticks),
+                      "aggregates": measure_tick_us(n, True, n_ticks),
+                      "thread_cpu_scan": measure_thread_cpu(n, False, refresh_seconds, duration),
+                      "thread_cpu_aggregates": measure_thread_cpu(n, True, refresh_seconds, duration)}
+        r = results[n]
+        print(f"{n:>10d} {r['scan']:>16.1f} {r['aggregates']:>22.1f} "
+              f"{r['thread_cpu_scan']:>16.2%} {r['thread_cpu_aggregates']:>22.2%}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_slots", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--n_ticks", type=int, default=200)
+    parser.add_argument("--refresh_seconds", type=float, default=0.05)
+    parser.add_argument("--duration", type=float, default=1.)
+    args = parser.parse_args()
+    main(**vars(args))
@@ -0,0 +1,55 @@
+"""
+CPU usage of rendering many concurrent progress bars in one process: one progress thread per bar vs a single
+RenderManager thread polling all of them, while the workers of the bars are idle.
+
+Usage:
+    python -m benchmarks.renderCost --n_bars 1 10 50
+"""
+import io
+import time
+
+from progressBarDistributed.renderManager import RenderManager
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar
+
+
+def measure_cpu(n_bars, shared, refresh_seconds=0.05, duration=1.):
+    """Returns the fraction of a core used to render n_bars running progress bars"""
+    manager = RenderManager(refresh_seconds) if shared else None
+    pbars = [SharedMemoryProgressBar(1, aggregates=True, render_manager=manager) for _ in range(n_bars)]
+    output = io.StringIO()
+    try:
+        for pbar in pbars:
+            pbar.set_total_steps(10, 0)
+            if shared:
+                manager.register(pbar, file=output)
+            else:
+                pbar.progress_thread = pbar.progress_bar_thread(refresh_seconds, file=output)
+        time.sleep(2 * refresh_seconds)  # Skip the start of the threads
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        time.sleep(duration)  # The main thread is idle, so the process CPU time is the one of the rendering
+        cpu = (time.process_time() - cpu0) / (time.perf_counter() - t0)
+    finally:
+        for pbar in pbars:
+            pbar.close()
+    return cpu
+
+
+def main(n_bars=(1, 10, 50), refresh_seconds=0.05, duration=1.):
+    results = {}
+    print(f"{'bars':>6s} {'thread per bar CPU':>20s} {'render manager CPU':>20s}")
+    for n in n_bars:
+        results[n] = {"thread_per_bar": measure_cpu(n, False, refresh_seconds, duration),
+                      "render_manager": measure_cpu(n, True, refresh_seconds, duration)}
+        r = results[n]
+        print(f"{n:>6d} {r['thread_per_bar']:>20.2%} {r['render_manager']:>20.2%}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_bars", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--refresh_seconds", type=float, default=0.05)
+    parser.add_argument("--duration", type=float, default=1.)
+    args = parser.parse_args()
+    main(**vars(args))
@@ -0,0 +1,66 @@
+"""
+Latency of the segment lifecycle: creating a progress bar (segment creation and initialization), attaching a worker
+to it and detaching it, and closing the bar (unlink), for the shared memory, memory-mapped file and in-process (thread)
+backends, and for shared memory segments recycled by a SegmentPool.
+
+Usage:
+    python -m benchmarks.segmentLatency --n_workers 1 1000 --repeats 200
+"""
+import tempfile
+import time
+
+from progressBarDistributed.mmapProgressBar import MmapProgressBar
+from progressBarDistributed.segmentPool import SegmentPool
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar
+from progressBarDistributed.threadProgressBar import ThreadProgressBar
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure_lifecycle_us(n_workers, backend="shm", repeats=200):
+    """Returns the median latencies in microseconds of create, attach (+ detach) and close (unlink)"""
+    timings = {"create": [], "attach": [], "close": []}
+    with tempfile.TemporaryDirectory() as tmp_dir, SegmentPool() as pool:
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            if backend == "shm":
+                pbar = SharedMemoryProgressBar(n_workers)
+            elif backend == "pool":
+                pbar = SharedMemoryProgressBar(n_workers, pool=pool)
+            elif backend == "thread":
+                pbar = ThreadProgressBar(n_workers, growable=False, aggregates=False)
+            else:
+                pbar = MmapProgressBar(n_workers, dir=tmp_dir)
+            t1 = time.perf_counter()
+            worker = SharedMemoryProgressBar.get_worker(0, pbar.shm_name)
+            worker.close()
+            t2 = time.perf_counter()
+            pbar.close()
+            t3 = time.perf_counter()
+            timings["create"].append(t1 - t0)
+            timings["attach"].append(t2 - t1)
+            timings["close"].append(t3 - t2)
+    return {name: _median(values) * 1e6 for name, values in timings.items()}
+
+
+def main(n_workers=(1, 1000, 100000), repeats=200):
+    results = {}
+    print(f"{'backend':>8s} {'slots':>8s} {'create (us)':>12s} {'attach (us)':>12s} {'close (us)':>12s}")
+    for backend in ("shm", "pool", "mmap", "thread"):
+        results[backend] = {}
+        for n in n_workers:
+            r = results[backend][n] = measure_lifecycle_us(n, backend, repeats)
+            print(f"{backend:>8s} {n:>8d} {r['create']:>12.1f} {r['attach']:>12.1f} {r['close']:>12.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_workers", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    main(**vars(args))
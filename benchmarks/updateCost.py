@@ -0,0 +1,49 @@
+"""
+Per-call overhead of SharedMemoryProgressBarWorker.update()
+
+Usage:
+    python -m benchmarks.updateCost --n_calls 1000000
+"""
+import time
+
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar, SharedMemoryProgressBarWorker
+
+
+def measure_update_ns(n_calls=1000000, repeats=5, **worker_kwargs):
+    """Returns the best (minimum) ns per update() call over `repeats` runs"""
+    best = float("inf")
+    pbar = SharedMemoryProgressBar(1)  # No rendering thread, we only measure the worker side
+    try:
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name, **worker_kwargs) as worker:
+            worker.set_total_steps(n_calls * repeats)
+            update = worker.update
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                for _ in range(n_calls):
+                    update(1)
+                best = min(best, (time.perf_counter() - t0) / n_calls * 1e9)
+        assert pbar.get_cum_steps() == n_calls * repeats
+    finally:
+        pbar.close()
+    return best
+
+
+def main(n_calls=1000000, repeats=5):
+    configs = [("unbuffered", {}),
+               ("flush_every=1000", dict(flush_every=1000)),
+               ("flush_interval_ms=100", dict(flush_interval_ms=100)),
+               ("flush_every=1000 + flush_interval_ms=100", dict(flush_every=1000, flush_interval_ms=100))]
+    results = {}
+    for name, kwargs in configs:
+        results[name] = measure_update_ns(n_calls, repeats, **kwargs)
+        print(f"{name:>45s}: {results[name]:8.1f} ns/update")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_calls", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(**vars(args))
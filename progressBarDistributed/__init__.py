@@ -1,3 +1,36 @@
 __version__ = "25.09.01"
 
-from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar, SharedMemoryProgressBarWorker
+# The classes are imported lazily (PEP 562), so that worker processes only load the standard library modules they
+# need: importing SharedMemoryProgressBarWorker does not import numpy, tqdm nor joblib.
+_LAZY_ATTRIBUTES = {
+    "SharedMemoryProgressBar": "progressBarDistributed.shmProgressBar",
+    "ProgressSnapshot": "progressBarDistributed.shmProgressBar",
+    "SharedMemoryProgressBarWorker": "progressBarDistributed.shmWorker",
+    "get_worker": "progressBarDistributed.shmWorker",
+    "MmapProgressBar": "progressBarDistributed.mmapProgressBar",
+    "MmapProgressBarWorker": "progressBarDistributed.mmapWorker",
+    "ThreadProgressBar": "progressBarDistributed.threadProgressBar",
+    "ThreadProgressBarWorker": "progressBarDistributed.threadWorker",
+    "pmap": "progressBarDistributed.parallelMap",
+    "imap_unordered": "progressBarDistributed.parallelMap",
+    "ProgressParallel": "progressBarDistributed.joblibParallel",
+    "Checkpoint": "progressBarDistributed.checkpoint",
+    "load_checkpoint": "progressBarDistributed.checkpoint",
+    "RenderManager": "progressBarDistributed.renderManager",
+    "SegmentPool": "progressBarDistributed.segmentPool",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value  # Later accesses do not go through __getattr__
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,50 @@
+"""
+Command line interface:
+
+    python -m progressBarDistributed monitor <shm_name> [--once] [--refresh SECONDS] ...
+"""
+import argparse
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m progressBarDistributed")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    monitor_parser = subparsers.add_parser(
+        "monitor", help="Display the progress of a progress bar created by another process, without modifying it")
+    monitor_parser.add_argument("shm_name", help="The name of the shared memory block (SharedMemoryProgressBar."
+                                                 "shm_name), or the path of the file of a MmapProgressBar")
+    monitor_parser.add_argument("--once", action="store_true",
+                                help="Print a one-line summary of the progress and exit")
+    monitor_parser.add_argument("--refresh", type=float, default=0.5, help="Refresh interval, in seconds")
+    monitor_parser.add_argument("--show-slowest", type=int, default=0, metavar="N",
+                                help="Show the N slowest active workers")
+    monitor_parser.add_argument("--show-phases", action="store_true", help="Show the dominant phase")
+    monitor_parser.add_argument("--show-counters", action="store_true", help="Show the rates of the named counters")
+    monitor_parser.add_argument("--stale-timeout", type=float, default=None, metavar="SECONDS",
+                                help="Show the running workers without progress for SECONDS as stale")
+    monitor_parser.add_argument("--desc", default=None, help="Description shown before the bar")
+
+    args = parser.parse_args(argv)
+    from progressBarDistributed.monitor import attach, describe, monitor
+    try:
+        if args.once:
+            pbar = attach(args.shm_name, stale_timeout=args.stale_timeout)
+            try:
+                print(describe(pbar))
+            finally:
+                pbar.close()
+        else:
+            monitor(args.shm_name, args.refresh, args.show_slowest, args.show_phases, args.stale_timeout,
+                    args.show_counters, desc=args.desc)
+    except FileNotFoundError:
+        print("No progress bar named %r" % args.shm_name, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Atomic operations on int64 words living in a shared buffer (e.g. SharedMemory.buf).
+
+When libatomic (or the libc of the running process) exports the GCC __atomic builtins, the operations are real
+hardware atomics, so they are safe across threads *and* processes sharing the buffer (see HAS_NATIVE_ATOMICS).
+Otherwise, every operation runs under a lock: an InterProcessLock, a lock file shared by all the processes using the
+buffer, or a process-local lock for buffers that only threads of one process use.
+"""
+import ctypes
+import ctypes.util
+import functools
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_SEQ_CST = 5  # __ATOMIC_SEQ_CST
+
+
+def _load_atomic_lib():
+    candidates = []
+    libname = ctypes.util.find_library("atomic")
+    if libname is not None:
+        candidates.append(libname)
+    if os.name != "nt":
+        candidates.append(None)  # Symbols already loaded in the current process
+    for candidate in candidates:
+        try:
+            lib = ctypes.CDLL(candidate)
+            funcs = {name: getattr(lib, "__atomic_%s_8" % name)
+                     for name in ("fetch_add", "load", "store", "exchange", "compare_exchange")}
+        except (OSError, AttributeError, TypeError):  # TypeError: CDLL(None) on Windows
+            continue
+        funcs["fetch_add"].argtypes = [ctypes.c_void_p, ctypes.c_int64, ctypes.c_int]
+        funcs["fetch_add"].restype = ctypes.c_int64
+        funcs["load"].argtypes = [ctypes.c_void_p, ctypes.c_int]
+        funcs["load"].restype = ctypes.c_int64
+        funcs["store"].argtypes = [ctypes.c_void_p, ctypes.c_int64, ctypes.c_int]
+        funcs["store"].restype = None
+        funcs["exchange"].argtypes = [ctypes.c_void_p, ctypes.c_int64, ctypes.c_int]
+        funcs["exchange"].restype = ctypes.c_int64
+        funcs["compare_exchange"].argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64,
+                                              ctypes.c_int, ctypes.c_int]
+        funcs["compare_exchange"].restype = ctypes.c_bool
+        return funcs
+    return None
+
+
+_ATOMIC_FUNCS = _load_atomic_lib()
+HAS_NATIVE_ATOMICS = _ATOMIC_FUNCS is not None
+_FALLBACK_LOCK = threading.Lock()
+
+
+def lock_path(name):
+    """The lock file of the segment `name`: next to it for files, in the temporary directory for shared memory blocks"""
+    name = os.fspath(name)
+    if os.path.dirname(name):
+        return name + ".lock"
+    return os.path.join(tempfile.gettempdir(), name + ".lock")
+
+
+class InterProcessLock:
+    """
+    A lock excluding the threads of all the processes that open the same lock file: an exclusive lock on the file
+    (flock(), or msvcrt.locking() on Windows), taken under a lock of the threads of this process. It costs two
+    syscalls per acquisition, and is only used for the buffers shared by several processes when native atomics are
+    not available.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                while True:
+                    try:
+                        msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass  # LK_LOCK gives up after 10 seconds
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            self._thread_lock.release()
+        return False
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+
+def interprocess_lock(name):
+    """The InterProcessLock of the segment `name`, or None if native atomics are available and no lock is needed"""
+    return None if HAS_NATIVE_ATOMICS else InterProcessLock(lock_path(name))
+
+
+def remove_lock(name):
+    """Removes the lock file of the segment `name`, if any. Only the owner of the segment does it, when unlinking it"""
+    try:
+        os.unlink(lock_path(name))
+    except FileNotFoundError:
+        pass
+
+
+class AtomicInt64Array:
+    """
+    Atomic view of a writable buffer as an array of int64. Indices are in int64 units.
+    Call release() before closing the underlying buffer.
+    """
+
+    def __init__(self, buf, lock=None):
+        """
+
+        :param buf: A writable buffer, e.g. SharedMemory.buf
+        :param lock: When native atomics are not available, the lock serializing the operations: an InterProcessLock
+                     for buffers shared by several processes. By default, a lock of the threads of this process
+        """
+        self._view = memoryview(buf).cast("q")
+        self._size = len(self._view)
+        self.native = HAS_NATIVE_ATOMICS
+        self._lock = _FALLBACK_LOCK if lock is None else lock
+        if self.native:
+            c_obj = ctypes.c_char.from_buffer(self._view)
+            self._address = ctypes.addressof(c_obj)
+            del c_obj  # Do not keep the buffer exported, so that it can be closed later on
+            self._fetch_add = _ATOMIC_FUNCS["fetch_add"]
+            self._load = _ATOMIC_FUNCS["load"]
+            self._store = _ATOMIC_FUNCS["store"]
+            self._exchange = _ATOMIC_FUNCS["exchange"]
+            self._compare_exchange = _ATOMIC_FUNCS["compare_exchange"]
+
+    def __len__(self):
+        return self._size
+
+    def _check_index(self, index):
+        if not 0 <= index < self._size:
+            raise IndexError("index %d out of range" % index)
+
+    def address(self, index):
+        """The memory address of the word at index (native atomics only)"""
+        self._check_index(index)
+        return self._address + 8 * index
+
+    def fetch_add(self, index, n):
+        """Atomically adds n to the word at index. Returns the previous value"""
+        if self.native:
+            self._check_index(index)
+            return self._fetch_add(self._address + 8 * index, n, _SEQ_CST)
+        with self._lock:
+            old = self._view[index]
+            self._view[index] = old + n
+            return old
+
+    def adder(self, index):
+        """
+        A function adding n to the word at index and returning the previous value, like fetch_add(index, n). The index
+        is checked once, and native atomics are called without going through this class: for the hot paths, which
+        must not call it after release()
+        """
+        self._check_index(index)
+        if not self.native:
+            return functools.partial(self.fetch_add, index)
+        fetch_add, address = self._fetch_add, ctypes.c_void_p(self._address + 8 * index)
+
+        def add(n):
+            return fetch_add(address, n, _SEQ_CST)
+        return add
+
+    def load(self, index):
+        if self.native:
+            self._check_index(index)
+            return self._load(self._address + 8 * index, _SEQ_CST)
+        return self._view[index]
+
+    def store(self, index, value):
+        if self.native:
+            self._check_index(index)
+            self._store(self._address + 8 * index, value, _SEQ_CST)
+            return
+        with self._lock:
+            self._view[index] = value
+
+    def exchange(self, index, value):
+        """Atomically replaces the word at index with value. Returns the previous value"""
+        if self.native:
+            self._check_index(index)
+            return self._exchange(self._address + 8 * index, value, _SEQ_CST)
+        with self._lock:
+            old = self._view[index]
+            self._view[index] = value
+            return old
+
+    def compare_exchange(self, index, expected, desired):
+        """
+        Atomically sets the word at index to desired if it is equal to expected.
+        Returns a tuple (succeeded, value_seen)
+        """
+        if self.native:
+            self._check_index(index)
+            expected_c = ctypes.c_int64(expected)
+            ok = self._compare_exchange(self._address + 8 * index, ctypes.byref(expected_c), desired,
+                                        _SEQ_CST, _SEQ_CST)
+            return ok, expected_c.value
+        with self._lock:
+            old = self._view[index]
+            if old == expected:
+                self._view[index] = desired
+                return True, old
+            return False, old
+
+    def fetch_or(self, index, mask):
+        """Atomically sets the bits of mask in the word at index. Returns the previous value"""
+        old = self.load(index)
+        while True:
+            ok, old = self.compare_exchange(index, old, old | mask)
+            if ok:
+                return old
+
+    def release(self):
+        self._size = 0  # Any later access raises IndexError instead of touching unmapped memory
+        self._view.release()
@@ -1,10 +1,4 @@
 from abc import ABC, abstractmethod
-import numpy as np
-from multiprocessing import shared_memory
-import threading
-import time
-from tqdm import tqdm
-import joblib
 
 class AbstractProgressBarWorker(ABC):
     @abstractmethod
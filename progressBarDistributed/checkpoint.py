@@ -0,0 +1,92 @@
+"""
+Checkpoints of the progress of a SharedMemoryProgressBar, so that a job restarted after a crash or a preemption resumes
+its progress instead of starting from zero.
+
+A checkpoint is a small JSON file holding the step counters and the totals of every slot and the bitmap of the work
+units that are done. It is written atomically: the new content goes to a temporary file of the same directory, which
+is flushed to disk and then renamed over the previous checkpoint, so that a job killed while writing leaves either the
+previous checkpoint or the new one, never a truncated file. Only depends on the standard library.
+"""
+import base64
+import json
+import os
+import tempfile
+from typing import NamedTuple, List
+
+from progressBarDistributed.unitBitmap import is_bit_set, iter_set_bits
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint(NamedTuple):
+    time: float  # time.time() when the checkpoint was taken
+    steps: List[int]  # Steps done by each slot, indexed by worker id
+    totals: List[int]  # Total of each slot (-1 if it was not set), indexed by worker id
+    n_units: int  # Number of work units tracked by the bitmap (0 if the bar tracks no units)
+    done: bytes  # Bitmap of the work units that are done, unit u being bit u % 8 of byte u // 8
+
+    def is_done(self, unit):
+        """Whether the work unit `unit` was done when the checkpoint was taken"""
+        return is_bit_set(self.done, unit)
+
+    def done_units(self):
+        """The work units that were done when the checkpoint was taken, in increasing order"""
+        return list(iter_set_bits(self.done))
+
+    @property
+    def n_done(self):
+        return sum(bin(byte).count("1") for byte in self.done)
+
+
+def write_checkpoint(path, checkpoint):
+    """Writes `checkpoint` to `path` atomically"""
+    path = os.fspath(path)
+    content = {"version": CHECKPOINT_VERSION, "time": checkpoint.time, "steps": checkpoint.steps,
+               "totals": checkpoint.totals, "n_units": checkpoint.n_units,
+               "done": base64.b64encode(checkpoint.done).decode("ascii")}
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".%s." % os.path.basename(path), suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(content, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)  # Makes the rename itself durable
+
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # E.g. Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint written by SharedMemoryProgressBar. A restarted job can use it to skip the work units that are
+    already done, even before creating its progress bar:
+
+        checkpoint = load_checkpoint("job.ckpt")
+        todo = [unit for unit in range(n_units) if not checkpoint.is_done(unit)]
+
+    :return: A Checkpoint
+    """
+    with open(path) as f:
+        content = json.load(f)
+    if content.get("version") != CHECKPOINT_VERSION:
+        raise ValueError("Unsupported checkpoint version %r in %s" % (content.get("version"), path))
+    return Checkpoint(content["time"], content["steps"], content["totals"], content["n_units"],
+                      base64.b64decode(content["done"]))
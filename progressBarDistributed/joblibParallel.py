@@ -0,0 +1,167 @@
+"""
+joblib.Parallel with a progress bar, without changing the task functions.
+
+ProgressParallel wraps every delayed task so that, once it returns, its worker adds the cost of the task (1 by
+default) to a slot of a growable SharedMemoryProgressBar, or of a ThreadProgressBar when the tasks run in threads of
+the parent (threading backend, or a single job), which needs no shared memory. Worker processes (or threads) claim one
+slot the first time they run a task of the bar and keep it for the next tasks, so counting a task costs a single atomic
+addition. The parent holds its own slot for the total cost of the tasks.
+"""
+import atexit
+import threading
+
+import joblib
+from joblib.parallel import ThreadingBackend, SequentialBackend
+
+from progressBarDistributed.shmWorker import SharedMemoryProgressBarWorker
+from progressBarDistributed.threadWorker import is_local_name, thread_worker
+
+_workers = {}  # shm_name -> SharedMemoryProgressBarWorker of this process
+_workers_lock = threading.Lock()
+
+
+def _get_worker(shm_name):
+    """The worker of this process for the progress bar shm_name, attached on first use"""
+    if is_local_name(shm_name):
+        return thread_worker(shm_name)  # Tasks run by threads of the parent: one slot per thread
+    with _workers_lock:
+        worker = _workers.get(shm_name)
+        if worker is not None and worker._is_stale():
+            worker = None  # The segment of a closed bar was recycled by a SegmentPool for this new bar
+        if worker is None:
+            if not _workers:
+                atexit.register(_close_workers)
+            # Pools outlive progress bars: detach from the bars that were closed since the last task
+            for name in [name for name, cached in _workers.items() if cached.progress_bar_closed]:
+                _workers.pop(name).close()
+            worker = _workers[shm_name] = SharedMemoryProgressBarWorker(None, shm_name)
+            worker.set_total_steps(0)  # The parent reports the total
+        return worker
+
+
+def _close_workers():
+    with _workers_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.close()
+
+
+class TaskProgress:
+    """Handle given to the tasks that report their progress themselves (see ProgressParallel progress_arg)"""
+
+    def __init__(self, worker, cost):
+        self._worker = worker
+        self.cost = cost
+        self.reported = 0
+
+    def update(self, n=1):
+        """Reports n sub-steps of the task. At most `cost` steps are counted for the task in total"""
+        n = min(n, self.cost - self.reported)
+        if n > 0:
+            self._worker.update(n)
+            self.reported += n
+
+
+class _ProgressTask:
+    """A task function that reports its cost to the progress bar once it returns"""
+
+    def __init__(self, func, shm_name, cost, progress_arg):
+        self.func = func
+        self.shm_name = shm_name
+        self.cost = cost
+        self.progress_arg = progress_arg
+
+    def __call__(self, *args, **kwargs):
+        worker = _get_worker(self.shm_name)
+        handle = None
+        if self.progress_arg is not None:
+            handle = kwargs[self.progress_arg] = TaskProgress(worker, self.cost)
+        result = self.func(*args, **kwargs)
+        remaining = self.cost - (0 if handle is None else handle.reported)
+        if remaining > 0:
+            worker.update(remaining)
+        return result
+
+
+class ProgressParallel(joblib.Parallel):
+    def __init__(self, *args, cost=None, progress_arg=None, show_progress=True, refresh_seconds=0.5,
+                 tqdm_kwargs=None, **kwargs):
+        """
+        Drop-in replacement for joblib.Parallel that displays the progress of the tasks:
+
+            results = ProgressParallel(n_jobs=8)(delayed(process)(item) for item in items)
+
+        :param args: The arguments of joblib.Parallel
+        :param cost: A function returning the cost (an int) of a task from its arguments, `cost(*args, **kwargs)`.
+                     The progress counts the costs of the finished tasks. By default, every task costs 1
+        :param progress_arg: If set, the name of a keyword argument through which every task receives a
+                             TaskProgress handle, to report sub-steps while it runs with handle.update(n)
+        :param show_progress: Whether to display the progress bar
+        :param refresh_seconds: The refresh interval of the progress bar
+        :param tqdm_kwargs: Extra arguments for tqdm (desc, file...)
+        :param kwargs: The keyword arguments of joblib.Parallel
+        """
+        super().__init__(*args, **kwargs)
+        self.cost = cost
+        self.progress_arg = progress_arg
+        self.show_progress = show_progress
+        self.refresh_seconds = refresh_seconds
+        self.tqdm_kwargs = tqdm_kwargs or {}
+        self.progress_bar = None
+
+    def _task_cost(self, args, kwargs):
+        return 1 if self.cost is None else int(self.cost(*args, **kwargs))
+
+    def _wrap_tasks(self, tasks, pbar, parent):
+        """
+        Wraps the delayed tasks, and reports their total cost in the slot `parent` of the progress bar. If their
+        number is not known, the total grows as they are dispatched
+        """
+        if hasattr(tasks, "__len__"):
+            tasks = [(func, args, kwargs, self._task_cost(args, kwargs)) for func, args, kwargs in tasks]
+            pbar.set_total_steps(sum(cost for _, _, _, cost in tasks), parent)
+            for func, args, kwargs, cost in tasks:
+                yield _ProgressTask(func, pbar.shm_name, cost, self.progress_arg), args, kwargs
+        else:
+            for func, args, kwargs in tasks:
+                cost = self._task_cost(args, kwargs)
+                pbar.add_total_steps(cost, parent)
+                yield _ProgressTask(func, pbar.shm_name, cost, self.progress_arg), args, kwargs
+
+    def _runs_in_process(self):
+        """Whether the tasks run in threads of this process (threading backend, or a single job)"""
+        return isinstance(self._backend, (ThreadingBackend, SequentialBackend)) \
+            or joblib.effective_n_jobs(self.n_jobs) == 1
+
+    def __call__(self, iterable):
+        n_slots = max(1, joblib.effective_n_jobs(self.n_jobs)) + 1
+        if self._runs_in_process():
+            from progressBarDistributed.threadProgressBar import ThreadProgressBar as ProgressBar
+        else:
+            from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar as ProgressBar
+        pbar = self.progress_bar = ProgressBar(n_slots, growable=True, aggregates=True)
+        parent = pbar.reserve_slot()  # Holds the total cost of the tasks
+        # Closing a ThreadProgressBar also closes the workers of the threads that ran the tasks, freeing their slots
+        close = pbar.close
+        try:
+            tasks = self._wrap_tasks(iterable, pbar, parent)
+            if hasattr(iterable, "__len__"):
+                tasks = list(tasks)  # Reports the total before the work starts
+            if self.show_progress:
+                pbar.progress_thread = pbar.progress_bar_thread(self.refresh_seconds, **self.tqdm_kwargs)
+            output = super().__call__(tasks)
+        except BaseException:
+            close()
+            raise
+        if getattr(self, "return_as", "list") == "list":
+            close()
+            return output
+        return self._close_when_exhausted(output, close)
+
+    @staticmethod
+    def _close_when_exhausted(output, close):
+        try:
+            yield from output
+        finally:
+            close()
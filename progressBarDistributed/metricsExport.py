@@ -0,0 +1,186 @@
+"""
+Export of the progress of a SharedMemoryProgressBar to monitoring systems, for headless runs.
+
+MetricsExporter serves the metrics in the Prometheus text format on a local HTTP endpoint (scraped on demand), and/or
+appends them as JSON lines to a file at a fixed interval. It runs in daemon threads of the parent process and only
+reads the counters, so it works alongside the tqdm progress thread or without it.
+"""
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name, help, attribute of ProgressMetrics
+_PROGRESS_METRICS = (
+    ("progress_steps", "Steps done by all the workers", "steps"),
+    ("progress_total_steps", "Total number of steps of all the workers", "total"),
+    ("progress_rate_steps_per_second", "Steps per second of all the workers", "rate"),
+    ("progress_eta_seconds", "Estimated seconds until all the steps are done", "eta"),
+    ("progress_ready", "1 once all the workers reported their totals", "ready"),
+    ("progress_done", "1 once all the steps are done", "done"),
+)
+# name, help, attribute of WorkerStats
+_WORKER_METRICS = (
+    ("progress_worker_steps", "Steps done by the worker", "steps"),
+    ("progress_worker_total_steps", "Total number of steps of the worker", "total"),
+    ("progress_worker_rate_steps_per_second", "Steps per second of the worker", "rate"),
+)
+# name, help, attribute of CounterStats
+_COUNTER_METRICS = (
+    ("progress_counter", "Value of the named counter, summed over the workers", "value"),
+    ("progress_counter_rate_per_second", "Increase per second of the named counter", "rate"),
+)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{%s}" % ",".join('%s="%s"' % (name, value) for name, value in zip(labels, escaped))
+
+
+def _format_value(value):
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+def format_prometheus(metrics, labels=None):
+    """
+    Formats a ProgressMetrics in the Prometheus text exposition format.
+
+    :param metrics: The ProgressMetrics of a progress bar
+    :param labels: Labels added to every sample, e.g. {"job": "ingest"}, to tell concurrent jobs apart
+    """
+    labels = dict(labels or {})
+    lines = []
+    for name, help_text, attribute in _PROGRESS_METRICS:
+        value = getattr(metrics, attribute)
+        if value is None:
+            continue  # Unknown total or ETA
+        lines += ["# HELP %s %s" % (name, help_text), "# TYPE %s gauge" % name,
+                  "%s%s %s" % (name, _format_labels(labels), _format_value(value))]
+    for name, help_text, attribute in _WORKER_METRICS:
+        lines += ["# HELP %s %s" % (name, help_text), "# TYPE %s gauge" % name]
+        for stats in metrics.workers:
+            worker_labels = dict(labels, worker=stats.worker_id)
+            lines.append("%s%s %s" % (name, _format_labels(worker_labels), _format_value(getattr(stats, attribute))))
+    if metrics.counters:
+        for name, help_text, attribute in _COUNTER_METRICS:
+            lines += ["# HELP %s %s" % (name, help_text), "# TYPE %s gauge" % name]
+            for stats in metrics.counters:
+                counter_labels = dict(labels, counter=stats.name)
+                lines.append("%s%s %s" % (name, _format_labels(counter_labels),
+                                          _format_value(getattr(stats, attribute))))
+    return "\n".join(lines) + "\n"
+
+
+def metrics_to_json(metrics, labels=None):
+    """A ProgressMetrics as a JSON-serializable dict"""
+    content = {"time": metrics.time}
+    content.update(labels or {})
+    content.update(steps=metrics.steps, total=metrics.total, rate=metrics.rate, eta=metrics.eta,
+                   ready=metrics.ready, done=metrics.done,
+                   workers=[{"id": stats.worker_id, "steps": stats.steps, "total": stats.total, "rate": stats.rate}
+                            for stats in metrics.workers])
+    if metrics.counters:
+        content["counters"] = {stats.name: {"value": stats.value, "rate": stats.rate} for stats in metrics.counters}
+    return content
+
+
+class MetricsExporter:
+    def __init__(self, get_metrics, port=None, host="127.0.0.1", path=None, interval=10., labels=None):
+        """
+        Use SharedMemoryProgressBar.export_metrics(), which stops the exporter when the progress bar is closed.
+
+        :param get_metrics: A function returning the current ProgressMetrics
+        :param port: If set, the port of the HTTP endpoint serving the metrics at /metrics in the Prometheus text
+                     format. 0 picks a free port (see the port attribute)
+        :param host: The address the HTTP endpoint listens on. Only the local host by default
+        :param path: If set, a file to which a JSON line with the metrics is appended every `interval` seconds, and
+                     once more when the exporter is stopped
+        :param interval: The interval in seconds between two JSON lines
+        :param labels: Labels added to every metric, e.g. {"job": "ingest"}
+        """
+        self._get_metrics = get_metrics
+        self.labels = dict(labels or {})
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()  # The counters are only read while the exporter runs, see stop()
+        self._stopped = False
+        self._stop_event = threading.Event()
+        self._threads = []
+
+        self._server = None
+        if port is not None:
+            self._server = HTTPServer((host, port), self._make_handler())
+            self._threads.append(threading.Thread(target=self._server.serve_forever, args=(0.1,), daemon=True))
+        if path is not None:
+            self._threads.append(threading.Thread(target=self._write_lines, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def port(self):
+        """The port of the HTTP endpoint, or None"""
+        return None if self._server is None else self._server.server_address[1]
+
+    def _read_metrics(self):
+        with self._lock:
+            if self._stopped:
+                return None
+            return self._get_metrics()
+
+    def _make_handler(self):
+        exporter = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                metrics = exporter._read_metrics()
+                if metrics is None:
+                    self.send_error(503, "The progress bar is closed")
+                    return
+                body = format_prometheus(metrics, exporter.labels).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the logs of the job
+
+        return _MetricsHandler
+
+    def _append_line(self, metrics):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(metrics_to_json(metrics, self.labels)) + "\n")
+
+    def _write_lines(self):
+        while not self._stop_event.wait(self.interval):
+            metrics = self._read_metrics()
+            if metrics is not None:
+                self._append_line(metrics)
+
+    def stop(self):
+        """Stops the threads, after writing a last JSON line. The metrics function is never called afterwards"""
+        if self._stopped:
+            return
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        with self._lock:
+            if self.path is not None:
+                self._append_line(self._get_metrics())
+            self._stopped = True
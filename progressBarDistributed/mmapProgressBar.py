@@ -0,0 +1,44 @@
+"""
+Progress bar backend storing the counters in a memory-mapped file instead of a POSIX shared memory block.
+
+Useful when workers cannot see the /dev/shm of the parent (e.g. containers or job schedulers giving each task a
+private /dev/shm) but share a filesystem with it. The counter layout is the same as the one of
+SharedMemoryProgressBar, and updates are still plain atomic operations on mapped memory, with no syscall.
+All the processes must run on the same host, since the mapping is only kept coherent by the page cache of one kernel.
+"""
+import os
+
+from progressBarDistributed.mmapWorker import MmapSegment
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar
+
+
+class MmapProgressBar(SharedMemoryProgressBar):
+    _segment_class = MmapSegment
+
+    def __init__(self, n_workers, path=None, dir=None, **kwargs):
+        """
+
+        :param n_workers: The number of worker slots. For growable progress bars, the initial number of slots.
+        :param path: The path of the file storing the counters. It is created if it does not exist, and removed on
+                     close(). If None, a new file is created in `dir`. Workers attach to it with
+                     MmapProgressBarWorker(worker_id, path), or through get_worker().
+        :param dir: The directory where the file is created if path is None. It must be visible to all the workers
+        :param kwargs: The other options of SharedMemoryProgressBar (layout, growable, aggregates...)
+        """
+        self.dir = dir
+        super().__init__(n_workers, shm_name=None if path is None else os.fspath(path), **kwargs)
+
+    @property
+    def path(self):
+        return self.shm_name
+
+    def _open_segment(self, name, create, size):
+        if name is not None and not create:
+            if not os.path.exists(name):
+                create = True
+            else:
+                os.truncate(name, size)  # The existing file is reused, and reinitialized
+        return MmapSegment(name=name, create=create, size=size, dir=self.dir)
+
+    def _pool_key(self):
+        return MmapSegment, self.dir  # Pooled files are only reused in the directory they were created in
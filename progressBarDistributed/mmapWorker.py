@@ -0,0 +1,91 @@
+"""
+Worker side of the memory-mapped file backend. Like shmWorker, it only depends on the standard library.
+"""
+import mmap
+import os
+import tempfile
+
+from progressBarDistributed.shmWorker import SharedMemoryProgressBarWorker
+
+
+def is_path_like(name):
+    """Whether `name` designates a file (and thus the mmap backend) rather than a shared memory block"""
+    if isinstance(name, os.PathLike):
+        return True
+    if not isinstance(name, str):
+        return False
+    return os.sep in name.lstrip("/") or (os.altsep is not None and os.altsep in name) or os.path.isfile(name)
+
+
+class MmapSegment:
+    """A memory-mapped file with the same interface as multiprocessing.shared_memory.SharedMemory"""
+
+    def __init__(self, name=None, create=False, size=0, dir=None):
+        """
+
+        :param name: The path of the file. If None, a new file is created in `dir`
+        :param create: Whether to create the file. It must not exist already
+        :param size: The size in bytes of the file when it is created
+        :param dir: The directory of the file when name is None. By default, the system temporary directory
+        """
+        self._buf = self._mmap = None
+        self._fd = -1
+        if name is None:
+            if not create:
+                raise ValueError("'name' can only be None if create=True")
+            fd, name = tempfile.mkstemp(prefix="pbd_", suffix=".pbar", dir=dir)
+        else:
+            name = os.fspath(name)
+            flags = os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0)
+            fd = os.open(name, flags | getattr(os, "O_BINARY", 0), 0o600)
+        self._name = name
+        self._fd = fd
+        try:
+            if create:
+                os.ftruncate(fd, size)
+            self._size = os.fstat(fd).st_size
+            self._mmap = mmap.mmap(fd, self._size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._buf = memoryview(self._mmap)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def buf(self):
+        return self._buf
+
+    def close(self):
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def unlink(self):
+        try:
+            os.unlink(self._name)
+        except FileNotFoundError:
+            pass
+
+    def __del__(self):
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+
+class MmapProgressBarWorker(SharedMemoryProgressBarWorker):
+    """SharedMemoryProgressBarWorker attached to the file of a MmapProgressBar. shm_name is the path of the file"""
+    _segment_class = MmapSegment
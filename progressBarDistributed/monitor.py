@@ -0,0 +1,69 @@
+"""
+Read-only monitor of a progress bar created by another process, so that a headless job can be checked on from another
+terminal (e.g. another SSH session) without the job paying for any rendering:
+
+    python -m progressBarDistributed monitor <shm_name>
+
+The monitor attaches to the segments of the progress bar, reads the options of the bar from their header, and never
+writes to them nor unlinks them. It stops when the workers are done or when the owner of the bar closes it.
+"""
+from progressBarDistributed.mmapWorker import is_path_like
+from progressBarDistributed.threadWorker import is_local_name
+
+
+def attach(shm_name, **kwargs):
+    """
+    Read-only view of the progress bar `shm_name` (see SharedMemoryProgressBar.attach()). File paths designate the
+    progress bars of the memory-mapped file backend, and the names of the ThreadProgressBar of this process those of
+    the in-process backend.
+    """
+    if is_path_like(shm_name):
+        from progressBarDistributed.mmapProgressBar import MmapProgressBar
+        return MmapProgressBar.attach(shm_name, **kwargs)
+    if is_local_name(shm_name):
+        from progressBarDistributed.threadProgressBar import ThreadProgressBar
+        return ThreadProgressBar.attach(shm_name, **kwargs)
+    from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar
+    return SharedMemoryProgressBar.attach(shm_name, **kwargs)
+
+
+def describe(pbar):
+    """A one-line summary of the progress of `pbar`"""
+    snapshot = pbar.snapshot()
+    if pbar.total_mode == "unknown" or not snapshot.ready:
+        progress = "%d steps" % snapshot.steps
+    else:
+        percent = 100. * snapshot.steps / snapshot.total if snapshot.total > 0 else 100.
+        progress = "%d/%d steps (%.1f%%)" % (snapshot.steps, snapshot.total, percent)
+    statuses = pbar.worker_status()
+    counts = ", ".join("%d %s" % (statuses.count(status), status)
+                       for status in sorted(set(statuses)) if status != "free")
+    state = "closed" if pbar.progress_bar_closed else "done" if snapshot.done else "waiting for totals" \
+        if not snapshot.ready else "running"
+    summary = "%s: %s, %s | workers: %s" % (pbar.shm_name, progress, state, counts or "none")
+    if pbar.counter_names:
+        summary += " | " + ", ".join("%s: %d" % (stats.name, stats.value) for stats in pbar.counter_stats())
+    return summary
+
+
+def monitor(shm_name, refresh_seconds=0.5, show_slowest=0, show_phases=False, stale_timeout=None, show_counters=False,
+            **tqdm_kwargs):
+    """
+    Renders the progress of the progress bar `shm_name` with tqdm until its workers are done or its owner closes it.
+
+    :param shm_name: The name of the shared memory block, or the path of the file of a MmapProgressBar
+    :param refresh_seconds: The refresh interval of the progress bar
+    :param show_slowest: If > 0, the slowest `show_slowest` active workers are shown in the bar postfix
+    :param show_phases: Whether to show the dominant phase in the bar postfix
+    :param stale_timeout: If set, running workers that published no step for stale_timeout seconds are shown as stale
+    :param show_counters: Whether to show the rates of the named counters in the bar postfix
+    :param tqdm_kwargs: Extra arguments for tqdm (desc, file...)
+    """
+    pbar = attach(shm_name, show_slowest=show_slowest, show_phases=show_phases, stale_timeout=stale_timeout,
+                  show_counters=show_counters)
+    try:
+        pbar.progress_thread = pbar.progress_bar_thread(refresh_seconds, **tqdm_kwargs)
+        while pbar.progress_thread.is_alive() and not pbar.progress_bar_closed:
+            pbar.progress_thread.join(refresh_seconds)
+    finally:
+        pbar.close()  # Only detaches from the segments
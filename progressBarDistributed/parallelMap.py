@@ -0,0 +1,195 @@
+"""
+Parallel map with a progress bar, on top of concurrent.futures.ProcessPoolExecutor (or ThreadPoolExecutor).
+
+Each worker process claims a slot of a growable SharedMemoryProgressBar when it starts, and reports one step per
+processed item. Worker threads use a ThreadProgressBar instead, and claim a slot per thread on their first chunk. The
+parent holds its own slot for the total number of items. Items are sent to the workers in chunks whose size adapts to
+the per-item processing time measured from the shared counters: tiny items are batched so that dispatch overhead stays
+low, while big items are sent a few at a time so that the load stays balanced.
+"""
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from progressBarDistributed.shmWorker import SharedMemoryProgressBarWorker
+from progressBarDistributed.threadWorker import thread_worker
+
+EXECUTORS = ("process", "thread")
+
+_worker = None  # The progress bar worker of the current worker process
+
+
+class ChunkSizer:
+    def __init__(self, n_workers, target_seconds=0.1, chunksize=None, max_chunksize=None, rate_window=2.):
+        """
+
+        :param n_workers: The number of worker processes
+        :param target_seconds: The wall time that processing one chunk should take
+        :param chunksize: If set, the size of all the chunks (no tuning)
+        :param max_chunksize: An upper bound on the size of the chunks
+        :param rate_window: Time constant, in seconds, of the moving average of the throughput
+        """
+        self.n_workers = n_workers
+        self.target_seconds = target_seconds
+        self.chunksize = chunksize
+        self.max_chunksize = max_chunksize
+        self.rate_window = rate_window
+        self.rate = None  # Items per second, all the workers together
+        self._last_steps = 0
+        self._last_time = None
+
+    def observe(self, steps, now=None):
+        """Updates the throughput estimate with the number of items processed so far"""
+        now = time.monotonic() if now is None else now
+        if self._last_time is None:
+            self._last_steps, self._last_time = steps, now
+            return
+        dt = now - self._last_time
+        if dt < 1e-3:
+            return
+        instant_rate = (steps - self._last_steps) / dt
+        if self.rate is None:
+            if instant_rate > 0:
+                self.rate = instant_rate  # The first measured progress seeds the average
+        else:
+            alpha = 1. - math.exp(-dt / self.rate_window)
+            self.rate += alpha * (instant_rate - self.rate)
+        self._last_steps, self._last_time = steps, now
+
+    @property
+    def item_seconds(self):
+        """The estimated time for one worker to process one item, or None until some progress was measured"""
+        if not self.rate:
+            return None
+        return self.n_workers / self.rate
+
+    def next_size(self, remaining=None):
+        """
+        The size of the next chunk.
+
+        :param remaining: The number of items left to submit, if known. Chunks are kept under a quarter of a
+                          worker's share of them, so that the last chunks do not leave the other workers idle
+        """
+        if self.chunksize is not None:
+            return self.chunksize
+        item_seconds = self.item_seconds
+        size = 1 if item_seconds is None else max(1, int(self.target_seconds / item_seconds))
+        if self.max_chunksize is not None:
+            size = min(size, self.max_chunksize)
+        if remaining is not None:
+            size = min(size, max(1, math.ceil(remaining / (4 * self.n_workers))))
+        return size
+
+
+def _init_worker(shm_name):
+    global _worker
+    from multiprocessing import util
+    _worker = SharedMemoryProgressBarWorker(None, shm_name, flush_interval_ms=50)
+    _worker.set_total_steps(0)  # The parent reports the total
+    util.Finalize(_worker, _worker.close, exitpriority=10)  # Releases the slot when the process exits
+
+
+def _run_chunk(func, start, items, shm_name=None):
+    """Processes a chunk in a worker process, or in a worker thread of the progress bar shm_name"""
+    worker = _worker if shm_name is None else thread_worker(shm_name)
+    results = []
+    try:
+        for item in items:
+            results.append(func(item))
+            worker.update(1)
+    finally:
+        worker.flush()
+    return start, results
+
+
+def _imap_chunks(func, iterable, max_workers=None, chunksize=None, target_chunk_seconds=0.1, mp_context=None,
+                 show_progress=True, refresh_seconds=0.5, tqdm_kwargs=None, executor="process"):
+    """Yields (index of the first item, results) for each chunk, as they complete"""
+    if executor not in EXECUTORS:
+        raise ValueError("Invalid executor %r. Valid executors: %s" % (executor, list(EXECUTORS)))
+    threads = executor == "thread"
+    if threads:
+        from progressBarDistributed.threadProgressBar import ThreadProgressBar as ProgressBar
+    else:
+        from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar as ProgressBar
+    n_workers = max_workers or os.cpu_count() or 1
+    total = len(iterable) if hasattr(iterable, "__len__") else None
+    items = iter(iterable)
+    sizer = ChunkSizer(n_workers, target_chunk_seconds, chunksize)
+
+    pbar = ProgressBar(n_workers + 1, growable=True, aggregates=True)
+    parent = pbar.reserve_slot()  # Holds the total number of items
+    executor = None
+    pending = set()
+    try:
+        if total is not None:
+            pbar.set_total_steps(total, parent)
+        if show_progress:
+            pbar.progress_thread = pbar.progress_bar_thread(refresh_seconds, **(tqdm_kwargs or {}))
+        if threads:
+            executor = ThreadPoolExecutor(n_workers)
+        else:
+            executor = ProcessPoolExecutor(n_workers, mp_context=mp_context, initializer=_init_worker,
+                                           initargs=(pbar.shm_name,))
+        n_submitted = 0
+        exhausted = False
+        while True:
+            # Keep two chunks per worker in flight, so that workers never wait for the parent
+            while not exhausted and len(pending) < 2 * n_workers:
+                sizer.observe(pbar.get_cum_steps())
+                remaining = None if total is None else total - n_submitted
+                chunk = list(itertools.islice(items, sizer.next_size(remaining)))
+                if not chunk:
+                    exhausted = True
+                    break
+                if total is None:
+                    pbar.add_total_steps(len(chunk), parent)  # The total grows as the iterable is consumed
+                pending.add(executor.submit(_run_chunk, func, n_submitted, chunk, pbar.shm_name if threads else None))
+                n_submitted += len(chunk)
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
+        pbar.close()
+
+
+def imap_unordered(func, iterable, max_workers=None, chunksize=None, target_chunk_seconds=0.1, mp_context=None,
+                   show_progress=True, refresh_seconds=0.5, tqdm_kwargs=None, executor="process"):
+    """
+    Applies `func` to every item of `iterable` in a pool of worker processes, showing the progress, and yields the
+    results in completion order.
+
+    :param func: A picklable function of one argument (any function with executor="thread")
+    :param iterable: The items. If it has no len(), the total grows as it is consumed
+    :param max_workers: The number of worker processes. By default, the number of CPUs
+    :param chunksize: If set, the number of items sent to a worker at once. By default, it is tuned during the run
+                      so that processing a chunk takes about target_chunk_seconds
+    :param target_chunk_seconds: The wall time that processing one chunk should take when chunksize is tuned
+    :param mp_context: The multiprocessing context of the ProcessPoolExecutor
+    :param show_progress: Whether to display the progress bar
+    :param refresh_seconds: The refresh interval of the progress bar
+    :param tqdm_kwargs: Extra arguments for tqdm (desc, file...)
+    :param executor: "process" runs `func` in a ProcessPoolExecutor, "thread" in a ThreadPoolExecutor (e.g. for I/O
+                     bound functions, or free-threaded Python), with an in-process ThreadProgressBar
+    """
+    for _, results in _imap_chunks(func, iterable, max_workers, chunksize, target_chunk_seconds, mp_context,
+                                   show_progress, refresh_seconds, tqdm_kwargs, executor):
+        yield from results
+
+
+def pmap(func, iterable, max_workers=None, chunksize=None, target_chunk_seconds=0.1, mp_context=None,
+         show_progress=True, refresh_seconds=0.5, tqdm_kwargs=None, executor="process"):
+    """
+    Same as imap_unordered(), but returns the list of the results in the order of the items.
+    """
+    chunks = sorted(_imap_chunks(func, iterable, max_workers, chunksize, target_chunk_seconds, mp_context,
+                                 show_progress, refresh_seconds, tqdm_kwargs, executor), key=lambda chunk: chunk[0])
+    return [result for _, results in chunks for result in results]
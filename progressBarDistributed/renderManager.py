@@ -0,0 +1,339 @@
+"""
+Rendering of progress bars with tqdm.
+
+BarRenderer draws one SharedMemoryProgressBar: it waits until the workers are ready, then follows the steps, the total
+and the postfix until the work is done or the bar is closed. It only redraws the bar when something changed, and
+spaces out its refreshes when the steps come slowly. When the output is a regular file or a pipe (e.g. the stderr of a
+batch job redirected to a log), it writes plain log lines every few percent or minutes instead of redrawing a bar with
+carriage returns (see LogLineBar). SharedMemoryProgressBar.progress_bar_thread() drives one renderer from its own
+thread. RenderManager drives the renderers of many progress bars from a single thread, on a single schedule, each bar
+on its own row of the terminal, so that a driver running dozens of concurrent jobs does not run dozens of polling
+threads fighting over the terminal.
+"""
+import math
+import os
+import stat
+import sys
+import threading
+import time
+
+from tqdm import tqdm
+
+from progressBarDistributed.shmLayout import STEPS_FIELD
+
+
+OUTPUT_MODES = ("auto", "bar", "log")
+
+
+class LogLineBar:
+    def __init__(self, iterable=None, desc=None, total=None, leave=True, file=None, *args, unit="it",
+                 unit_scale=False, log_percent=10., log_seconds=60., **kwargs):
+        """
+        Stand-in for tqdm for outputs that are not terminals: writes a line, formatted like the tqdm bar, each time the
+        progress crosses a multiple of log_percent of the current total or the total becomes known, and every
+        log_seconds if the progress changed. Totals that keep growing (growable bars, iterables without len()) do not
+        write more lines. Takes the arguments of tqdm, and ignores those about drawing (ncols, position...).
+
+        :param log_percent: Write a line every log_percent percent of the total
+        :param log_seconds: Write a line at least every log_seconds seconds while the progress changes
+        """
+        self.total = total
+        self.n = 0
+        self.desc = desc
+        self.file = file if file is not None else sys.stderr
+        self.unit = unit
+        self.unit_scale = unit_scale
+        self.log_percent = log_percent
+        self.log_seconds = log_seconds
+        self.postfix = None
+        self._start = time.monotonic()
+        self._last_line = None  # (n, total) of the last line written
+        self._last_line_time = None
+        self._next_percent = 0.
+        self._percent_total = None  # The total _next_percent was computed for
+
+    def set_postfix_str(self, s="", refresh=True):
+        self.postfix = s or None
+        if refresh:
+            self.refresh()
+
+    def _percent(self):
+        return 100. * self.n / self.total if self.total else None
+
+    def refresh(self):
+        now = time.monotonic()
+        if self._last_line == (self.n, self.total):
+            return
+        if self._last_line is None or (self.total and not self._last_line[1]):
+            self._write_line(now)  # The first line, or the total became known
+            return
+        if self.total != self._percent_total and self.total:
+            # Relative to the new total, but never lowered: a total that keeps growing does not write more lines
+            self._set_next_percent(100. * self._last_line[0] / self.total, self._next_percent)
+        percent = self._percent()
+        if (percent is not None and percent >= self._next_percent) or now - self._last_line_time >= self.log_seconds:
+            self._write_line(now)
+
+    def _write_line(self, now):
+        line = tqdm.format_meter(self.n, self.total, now - self._start, prefix=self.desc or "", unit=self.unit,
+                                 unit_scale=self.unit_scale, postfix=self.postfix)
+        self.file.write(line + "\n")
+        self.file.flush()
+        self._last_line = (self.n, self.total)
+        self._last_line_time = now
+        percent = self._percent()
+        if percent is not None:
+            self._set_next_percent(percent)
+
+    def _set_next_percent(self, percent, at_least=0.):
+        self._next_percent = max((math.floor(percent / self.log_percent) + 1) * self.log_percent, at_least)
+        self._percent_total = self.total
+
+    def close(self):
+        if self._last_line != (self.n, self.total):
+            self._write_line(time.monotonic())  # The final progress
+
+
+def is_log_file(file):
+    """
+    Whether output="auto" writes log lines to `file`: only when it is a regular file or a pipe, e.g. the stderr of a
+    batch job redirected to a log. Terminals, file objects without a file descriptor (io.StringIO...) and the outputs of
+    IPython kernels, which are pipes but render the carriage returns of tqdm, keep the bar.
+    """
+    if "ipykernel" in sys.modules:
+        return False
+    try:
+        mode = os.fstat(file.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):  # No file descriptor, or a closed file
+        return False
+    return stat.S_ISREG(mode) or stat.S_ISFIFO(mode)
+
+
+class BarRenderer:
+    def __init__(self, pbar, *args, refresh_seconds=0.5, max_refresh_seconds=10., output="auto", log_percent=10.,
+                 log_seconds=60., **kwargs):
+        """
+
+        :param pbar: The SharedMemoryProgressBar to draw
+        :param args: The positional arguments of tqdm
+        :param refresh_seconds: The shortest interval between two refreshes
+        :param max_refresh_seconds: The longest interval between two refreshes. The interval grows from
+                                    refresh_seconds up to it while the steps come slower than one per interval. An
+                                    unchanged bar is redrawn every max_refresh_seconds, so that its elapsed time moves
+        :param output: "bar" draws a tqdm bar, "log" writes log lines (see LogLineBar), "auto" writes log lines when the
+                       output file is a regular file or a pipe (see is_log_file()), and draws a bar otherwise
+        :param log_percent, log_seconds: The frequency of the log lines, see LogLineBar
+        :param kwargs: The keyword arguments of tqdm (desc, file, position...)
+        """
+        if output not in OUTPUT_MODES:
+            raise ValueError("Invalid output %r. Valid outputs: %s" % (output, list(OUTPUT_MODES)))
+        self.pbar = pbar
+        self.args = args
+        self.kwargs = kwargs
+        self.tqdm = None
+        self.refresh_seconds = refresh_seconds
+        self.max_refresh_seconds = max(refresh_seconds, max_refresh_seconds)
+        self.interval = refresh_seconds  # The current interval between two refreshes
+        self.log_percent = log_percent
+        self.log_seconds = log_seconds
+        if output == "auto":
+            output = "log" if is_log_file(kwargs.get("file") or sys.stderr) else "bar"
+        self.output = output
+        self._drawn = None  # (steps, total, postfix) of the last redraw
+        self._drawn_time = None
+        self._last_steps = None
+        self._last_steps_time = None
+        self._next_update_time = 0.
+        self.n_redraws = 0
+        self.fixed_total = pbar.total_mode == "fixed"
+        self.known_total = pbar.total_mode != "unknown"
+        # Dead and stale workers are only noticed by sampling the slots at each refresh
+        self.track_status = pbar.heartbeat_timeout is not None or pbar._status_tracker.stale_timeout_ns is not None
+
+    def poll_ready(self):
+        """Whether the bar can be drawn: its total is known (or unknown by design), or it was closed"""
+        pbar = self.pbar
+        if not self.known_total or pbar.stop_event.is_set() or pbar.are_workers_ready():
+            return True
+        pbar._serve_grow_requests()
+        return False
+
+    def open(self):
+        """Creates the tqdm bar"""
+        total_steps = int(self.pbar.get_total_steps()) if self.known_total else None
+        if self.output == "log":
+            self.tqdm = LogLineBar(total=total_steps, *self.args, log_percent=self.log_percent,
+                                   log_seconds=self.log_seconds, **self.kwargs)
+        else:
+            self.tqdm = tqdm(total=total_steps, dynamic_ncols=True, *self.args, **self.kwargs)
+
+    def update(self, now=None):
+        """
+        Draws the current progress if it changed and a refresh is due. Returns True, without drawing, once the work is
+        done or the bar is closed. Completion is checked at every call, even when no refresh is due.
+        """
+        pbar, bar = self.pbar, self.tqdm
+        now = time.monotonic() if now is None else now
+        if self.known_total:
+            total_steps = int(pbar.get_total_steps())
+            if total_steps != bar.total:
+                bar.total = total_steps  # The bar keeps its progress, only the total changes
+        if pbar.stop_event.is_set() or (self.fixed_total and pbar.get_cum_steps() >= bar.total):
+            return True
+        if pbar.heartbeat_timeout is not None and self.fixed_total and pbar._live_workers_done():
+            return True  # The remaining steps belong to dead workers
+        pbar._serve_grow_requests()
+        pbar._checkpoint_if_due()
+        if now < self._next_update_time:
+            return False
+        postfix = []
+        if pbar.show_slowest:
+            postfix.append("slowest: " + pbar._slowest_workers_postfix())
+        elif pbar.track_workers:
+            pbar._rate_tracker.sample(pbar._gather(STEPS_FIELD))
+        if pbar.show_phases:
+            postfix.append(pbar._dominant_phase_postfix())
+        if pbar.show_counters:
+            postfix.append(pbar._counters_postfix())
+        if self.track_status:
+            postfix.append(pbar._worker_status_postfix())
+        postfix = " | ".join(part for part in postfix if part)
+        steps = int(pbar.get_cum_steps())
+        self._adapt_interval(steps, now)
+        self._next_update_time = now + self.interval
+        drawn = (steps, bar.total, postfix)
+        if drawn == self._drawn and now - self._drawn_time < self.max_refresh_seconds:
+            return False  # Nothing to redraw
+        if pbar.show_slowest or pbar.show_phases or pbar.show_counters or self.track_status:
+            bar.set_postfix_str(postfix, refresh=False)
+        bar.n = steps
+        bar.refresh()
+        self._drawn, self._drawn_time = drawn, now
+        self.n_redraws += 1
+        return False
+
+    def _adapt_interval(self, steps, now):
+        """Refreshes about once per step when the steps come slower than one per refresh_seconds"""
+        if self._last_steps is None or steps < self._last_steps:
+            self._last_steps, self._last_steps_time = steps, now
+            return
+        if steps > self._last_steps:
+            seconds_per_step = (now - self._last_steps_time) / (steps - self._last_steps)
+            self.interval = min(max(seconds_per_step, self.refresh_seconds), self.max_refresh_seconds)
+            self._last_steps, self._last_steps_time = steps, now
+        else:
+            self.interval = min(2 * self.interval, self.max_refresh_seconds)  # Back off while nothing happens
+
+    def close(self):
+        """Draws the final progress and closes the tqdm bar. Must be called before the segments are released"""
+        if self.tqdm is None:
+            self.open()  # Closed before the workers were ready
+        if self.known_total:
+            self.tqdm.total = int(self.pbar.get_total_steps())
+        self.tqdm.n = self.pbar.get_cum_steps()
+        self.tqdm.refresh()
+        self.tqdm.close()
+        self.tqdm = None
+
+
+class RenderManager:
+    def __init__(self, refresh_seconds=0.5, tqdm_kwargs=None):
+        """
+        Draws many progress bars from a single thread, each on its own row. The thread only runs while some bar is
+        registered, and reads the counters of all the bars once per refresh_seconds.
+
+        :param refresh_seconds: The refresh interval of all the bars
+        :param tqdm_kwargs: Default arguments of tqdm for all the bars (file...)
+        """
+        self.refresh_seconds = refresh_seconds
+        self.tqdm_kwargs = dict(tqdm_kwargs or {})
+        self._renderers = {}  # id(pbar) -> BarRenderer, in registration order
+        self._lock = threading.Lock()  # Held while a bar is drawn, so that unregister() never races with drawing
+        self._wake = threading.Event()
+        self._thread = None
+        self._positions = {}  # id(pbar) -> the row given to the bar by register()
+        self._free_positions = set()  # Rows below _next_position whose bar is finished
+        self._next_position = 0
+
+    def register(self, pbar, *args, **kwargs):
+        """
+        Draws `pbar` until its work is done or it is closed. The bar gets the lowest free row, unless `position` is
+        given, so that the bars of short jobs reuse the rows of the finished ones. Closing the progress bar unregisters
+        it.
+
+        :param args, kwargs: The arguments of BarRenderer (output, max_refresh_seconds...) and of tqdm (desc, file...)
+        """
+        kwargs = dict(self.tqdm_kwargs, **kwargs)
+        with self._lock:
+            if id(pbar) in self._renderers:
+                return
+            if "position" not in kwargs:
+                if self._free_positions:
+                    kwargs["position"] = min(self._free_positions)
+                    self._free_positions.remove(kwargs["position"])
+                else:
+                    kwargs["position"] = self._next_position
+                    self._next_position += 1
+                self._positions[id(pbar)] = kwargs["position"]
+            kwargs.setdefault("refresh_seconds", self.refresh_seconds)
+            self._renderers[id(pbar)] = BarRenderer(pbar, *args, **kwargs)
+            pbar.render_manager = self
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unregister(self, pbar):
+        """Stops drawing `pbar`, after drawing its final progress. Called by pbar.close()"""
+        with self._lock:
+            renderer = self._renderers.pop(id(pbar), None)
+            if renderer is not None:
+                renderer.close()
+                self._release_row(id(pbar))
+
+    def _release_row(self, key):
+        """Frees the row of a finished bar, for the next bar to register"""
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        self._free_positions.add(position)
+        while self._next_position - 1 in self._free_positions:  # Keep the free rows below the rows in use
+            self._next_position -= 1
+            self._free_positions.remove(self._next_position)
+
+    @property
+    def n_bars(self):
+        """The number of registered progress bars"""
+        with self._lock:
+            return len(self._renderers)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._renderers:
+                    self._thread = None
+                    return
+                for key, renderer in list(self._renderers.items()):
+                    if renderer.tqdm is None:
+                        if not renderer.poll_ready():
+                            continue
+                        renderer.open()
+                    if renderer.update():
+                        renderer.close()
+                        del self._renderers[key]
+                        self._release_row(key)
+            self._wake.wait(self.refresh_seconds)
+            self._wake.clear()
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_render_manager():
+    """The RenderManager shared by the whole process (see SharedMemoryProgressBar render_manager=True)"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = RenderManager()
+        return _default_manager
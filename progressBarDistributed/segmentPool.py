@@ -0,0 +1,124 @@
+"""
+Recycling of the segments of short-lived progress bars.
+
+A SharedMemoryProgressBar created with a SegmentPool takes an idle segment of a suitable size from the pool instead of
+creating one, and gives it back on close() instead of unlinking it: a job opening thousands of small bars, e.g. one per
+micro-batch, does not pay the shm_open/ftruncate/mmap/munmap/unlink syscalls of every bar. The counters of a recycled
+segment are reset when it is acquired. Releasing a segment increments the generation counter in its header
+(GENERATION_IDX): workers read it when they attach, and stop writing to the segment once it changed, so that a worker
+still attached to a closed bar never writes into the bar that reuses the segment. A worker may have checked the
+generation just before it changed, so the workers also count their writes in progress in the header (WRITERS_IDX), and
+the release waits for them to end.
+
+This module only depends on the standard library.
+"""
+import atexit
+import threading
+import time
+
+from progressBarDistributed.atomicOps import AtomicInt64Array, interprocess_lock, remove_lock
+from progressBarDistributed.shmLayout import GENERATION_IDX, WRITERS_IDX
+
+WRITES_TIMEOUT = 1.  # Seconds a release waits for the writes in progress before unlinking the segment instead
+
+
+class SegmentPool:
+    def __init__(self, max_segments=16, max_waste=4.):
+        """
+
+        :param max_segments: The maximum number of idle segments kept by the pool. Segments released while the pool
+                             is full are unlinked
+        :param max_waste: An idle segment is only given to a bar needing at least 1 / max_waste of its size, so that
+                          small bars do not pin large segments
+        """
+        self.max_segments = max_segments
+        self.max_waste = max_waste
+        self._idle = []  # (key, segment), the most recently released last
+        self._lock = threading.Lock()
+        self._closed = False
+        self.n_reused = 0
+        self.n_missed = 0
+        atexit.register(self.close)
+
+    @property
+    def n_idle(self):
+        """The number of idle segments"""
+        with self._lock:
+            return len(self._idle)
+
+    def acquire(self, size, key=None):
+        """
+        Takes the smallest idle segment of at least `size` bytes out of the pool.
+
+        :param size: The number of bytes needed
+        :param key: Segments are only given back to bars of the same key (e.g. the backend and its directory)
+        :return: The segment, or None if no idle segment fits: the caller then creates one
+        """
+        with self._lock:
+            fitting = [(segment.size, i) for i, (segment_key, segment) in enumerate(self._idle)
+                       if segment_key == key and size <= segment.size <= size * self.max_waste]
+            if not fitting:
+                self.n_missed += 1
+                return None
+            self.n_reused += 1
+            return self._idle.pop(min(fitting)[1])[1]
+
+    def release(self, segment, key=None):
+        """
+        Gives a segment back to the pool once its progress bar is closed. Its generation is incremented first, so that
+        the workers still attached to it stop writing to it, then the writes they started before are waited for. A
+        segment whose writes do not end in WRITES_TIMEOUT seconds, e.g. because a worker was killed mid-write, is
+        unlinked instead.
+        """
+        lock = interprocess_lock(segment.name)
+        atomic = AtomicInt64Array(segment.buf, lock)
+        atomic.fetch_add(GENERATION_IDX, 1)
+        deadline = time.monotonic() + WRITES_TIMEOUT
+        while atomic.load(WRITERS_IDX) > 0 and time.monotonic() < deadline:
+            time.sleep(0.0001)
+        reusable = atomic.load(WRITERS_IDX) <= 0
+        atomic.release()
+        if lock is not None:
+            lock.close()
+        with self._lock:
+            if reusable and not self._closed and len(self._idle) < self.max_segments:
+                self._idle.append((key, segment))
+                return
+        _unlink(segment)
+
+    def close(self):
+        """Unlinks the idle segments. Segments released later are unlinked right away. Called at exit"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for _, segment in idle:
+            _unlink(segment)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def _unlink(segment):
+    try:
+        segment.close()
+        segment.unlink()
+    except IOError:
+        pass  # The segment might already be unlinked
+    remove_lock(segment.name)  # Without native atomics, see SharedMemoryProgressBar
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_segment_pool():
+    """The SegmentPool shared by the whole process (see SharedMemoryProgressBar pool=True)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SegmentPool()
+        return _default_pool
@@ -0,0 +1,265 @@
+"""
+Layout of the int64 counters stored in the shared memory block.
+
+The block starts with a header of HEADER_WORDS int64 words. The first cache line is written only at creation time
+(or very rarely):
+    word 0: n_workers
+    word 1: layout version (LAYOUT_PACKED or LAYOUT_PADDED)
+    word 2: number of header words (so that workers can locate the per-worker counters)
+    word 3: index of this segment in the chain of segments of a growable bar (0 for the first one)
+    word 4: global slot id of the first worker slot of this segment
+    word 5: number of segments in the chain (only maintained in the first segment)
+    word 6: number of pending requests from workers to grow the chain (only maintained in the first segment)
+    word 7: flags (FLAG_*)
+The second cache line holds the aggregates of all the slots of the chain, maintained incrementally by the workers when
+the bar is created with FLAG_AGGREGATES (only in the first segment):
+    word 8: sum of the steps done
+    word 9: sum of the totals that were set (i.e. of max(total, 0))
+    word 10: number of slots whose total was not set yet (negative)
+    word 11: number of slots whose total is not positive (i.e. not ready)
+    word 12: number of claimed slots whose total was not set yet
+    word 13: wakeup sequence counter, incremented by workers to wake up the progress thread (see wakeup.py)
+    word 14: number of named phases declared by the progress bar
+    word 15: interval in milliseconds between the heartbeats of the workers, when FLAG_HEARTBEATS is set
+The third cache line holds:
+    word 16: generation of the segment, incremented each time a SegmentPool recycles it for another progress bar (see
+             segmentPool.py). It is kept when the header is rewritten
+    word 17: number of named counters declared by the progress bar
+    word 18: number of writes of workers in progress on a pooled segment, that SegmentPool.release() waits for. Kept
+             when the header is rewritten
+and reserved words, followed by the per-worker counters (steps done, total steps, owner of the slot,
+time.monotonic_ns() of the last heartbeat of the worker, number of steps the progress bar asks the worker to hand over
+to its peers, the steps done and nanoseconds spent in each phase, and the value of each named counter):
+    packed: all the step counters contiguously, then all the totals, then all the owners. Compact, but up to 8
+            workers share a cache line.
+    padded: one cache line per worker, holding all its counters. Avoids false sharing between workers updating their
+            counters from different cores.
+and by the tables of the phase names and of the counter names, PHASE_NAME_BYTES of NUL-padded UTF-8 per name.
+"""
+import sys
+
+CACHE_LINE_BYTES = 64
+WORD_BYTES = 8
+WORDS_PER_CACHE_LINE = CACHE_LINE_BYTES // WORD_BYTES
+
+LAYOUT_PACKED = 1
+LAYOUT_PADDED = 2
+LAYOUT_NAMES = {"packed": LAYOUT_PACKED, "padded": LAYOUT_PADDED}
+
+N_WORKERS_IDX = 0
+LAYOUT_IDX = 1
+HEADER_WORDS_IDX = 2
+SEGMENT_INDEX_IDX = 3
+SLOT_OFFSET_IDX = 4
+N_SEGMENTS_IDX = 5
+GROW_REQUESTS_IDX = 6
+FLAGS_IDX = 7
+AGG_STEPS_IDX = 8
+AGG_TOTAL_IDX = 9
+AGG_N_UNSET_IDX = 10
+AGG_N_UNREADY_IDX = 11
+AGG_N_CLAIMED_UNSET_IDX = 12
+WAKEUP_IDX = 13
+N_PHASES_IDX = 14
+HEARTBEAT_INTERVAL_MS_IDX = 15
+GENERATION_IDX = 16
+N_COUNTERS_IDX = 17
+WRITERS_IDX = 18
+HEADER_WORDS = 3 * WORDS_PER_CACHE_LINE
+
+FLAG_AGGREGATES = 1
+FLAG_HEARTBEATS = 2
+FLAG_CLOSED = 4  # Set when the progress bar is closed, so that workers kept alive by a pool can detach
+FLAG_UNITS = 8  # The bar tracks the work units that are done, in a bitmap segment (see unitBitmap.py)
+FLAG_GROWABLE = 16  # Workers claim their slots, and the chain of segments grows on demand
+FLAG_GROWING_TOTAL = 32  # total_mode="growing"
+FLAG_UNKNOWN_TOTAL = 64  # total_mode="unknown"
+FLAG_POOLED = 128  # The segment belongs to a SegmentPool: workers check its generation before writing to it
+
+WORKER_FIELDS = ("steps", "total", "owner", "heartbeat", "shed")
+STEPS_FIELD, TOTAL_FIELD, OWNER_FIELD, HEARTBEAT_FIELD, SHED_FIELD = range(len(WORKER_FIELDS))
+FREE_SLOT = 0  # Value of the owner field of slots that have not been claimed
+PHASE_FIELDS = ("phase_steps", "phase_time_ns")  # Fields repeated for each phase, after WORKER_FIELDS
+PHASE_NAME_WORDS = 4
+PHASE_NAME_BYTES = PHASE_NAME_WORDS * 8
+
+
+def _round_up_to_cache_line(n_words):
+    return -(-n_words // WORDS_PER_CACHE_LINE) * WORDS_PER_CACHE_LINE
+
+
+class ShmLayout:
+    """Computes the index (in int64 words) of every counter in the shared memory block"""
+
+    def __init__(self, n_workers, layout="packed", header_words=HEADER_WORDS, n_phases=0, n_counters=0):
+        """
+
+        :param n_workers: The number of worker slots
+        :param layout: "packed" or "padded" (or the corresponding LAYOUT_* version number)
+        :param header_words: The number of int64 words before the per-worker counters
+        :param n_phases: The number of named phases, each adding PHASE_FIELDS to the counters of every worker
+        :param n_counters: The number of named counters, each adding one word to the counters of every worker
+        """
+        if n_workers < 1:
+            raise ValueError("n_workers must be >= 1, got %s" % n_workers)
+        version = LAYOUT_NAMES.get(layout, layout)
+        if version not in LAYOUT_NAMES.values():
+            raise ValueError("Unsupported shared memory layout %r. Valid layouts: %s" % (layout, list(LAYOUT_NAMES)))
+        self.n_workers = int(n_workers)
+        self.version = version
+        self.header_words = int(header_words)
+        self.n_phases = int(n_phases)
+        self.n_counters = int(n_counters)
+        self.n_fields = len(WORKER_FIELDS) + len(PHASE_FIELDS) * self.n_phases + self.n_counters
+        if version == LAYOUT_PADDED:
+            self.record_words = _round_up_to_cache_line(self.n_fields)
+        else:
+            self.record_words = self.n_fields
+        self.phase_names_index = self.header_words + self.n_workers * self.record_words
+        self.counter_names_index = self.phase_names_index + self.n_phases * PHASE_NAME_WORDS
+        self.n_words = self.counter_names_index + self.n_counters * PHASE_NAME_WORDS
+
+    @property
+    def name(self):
+        return "padded" if self.version == LAYOUT_PADDED else "packed"
+
+    @property
+    def n_bytes(self):
+        return self.n_words * WORD_BYTES
+
+    def index(self, field, worker_id):
+        """The word index of the counter `field` (position in WORKER_FIELDS) of worker `worker_id`"""
+        if self.version == LAYOUT_PADDED:
+            return self.header_words + worker_id * self.record_words + field
+        return self.header_words + field * self.n_workers + worker_id
+
+    def field_slice(self, field):
+        """A slice selecting the counter `field` of all the workers, in worker order"""
+        start = self.index(field, 0)
+        if self.version == LAYOUT_PADDED:
+            return slice(start, start + self.n_workers * self.record_words, self.record_words)
+        return slice(start, start + self.n_workers)
+
+    def step_index(self, worker_id):
+        return self.index(STEPS_FIELD, worker_id)
+
+    def total_index(self, worker_id):
+        return self.index(TOTAL_FIELD, worker_id)
+
+    def owner_index(self, worker_id):
+        return self.index(OWNER_FIELD, worker_id)
+
+    def heartbeat_index(self, worker_id):
+        return self.index(HEARTBEAT_FIELD, worker_id)
+
+    def shed_index(self, worker_id):
+        return self.index(SHED_FIELD, worker_id)
+
+    @staticmethod
+    def phase_steps_field(phase_id):
+        return len(WORKER_FIELDS) + len(PHASE_FIELDS) * phase_id
+
+    @staticmethod
+    def phase_time_field(phase_id):
+        return len(WORKER_FIELDS) + len(PHASE_FIELDS) * phase_id + 1
+
+    def phase_steps_index(self, worker_id, phase_id):
+        return self.index(self.phase_steps_field(phase_id), worker_id)
+
+    def phase_time_index(self, worker_id, phase_id):
+        return self.index(self.phase_time_field(phase_id), worker_id)
+
+    def counter_field(self, counter_id):
+        return len(WORKER_FIELDS) + len(PHASE_FIELDS) * self.n_phases + counter_id
+
+    def counter_index(self, worker_id, counter_id):
+        return self.index(self.counter_field(counter_id), worker_id)
+
+    @property
+    def steps_slice(self):
+        return self.field_slice(STEPS_FIELD)
+
+    @property
+    def totals_slice(self):
+        return self.field_slice(TOTAL_FIELD)
+
+    @property
+    def owners_slice(self):
+        return self.field_slice(OWNER_FIELD)
+
+    def write_header(self, words, segment_index=0, slot_offset=0, flags=0, heartbeat_interval_ms=0):
+        """Writes the header into `words`, an indexable int64 view of the shared memory block"""
+        words[N_WORKERS_IDX] = self.n_workers
+        words[LAYOUT_IDX] = self.version
+        words[HEADER_WORDS_IDX] = self.header_words
+        words[SEGMENT_INDEX_IDX] = segment_index
+        words[SLOT_OFFSET_IDX] = slot_offset
+        words[N_SEGMENTS_IDX] = 1
+        words[GROW_REQUESTS_IDX] = 0
+        words[FLAGS_IDX] = flags
+        words[AGG_STEPS_IDX] = 0
+        words[AGG_TOTAL_IDX] = 0
+        words[AGG_N_UNSET_IDX] = self.n_workers
+        words[AGG_N_UNREADY_IDX] = self.n_workers
+        words[AGG_N_CLAIMED_UNSET_IDX] = 0
+        words[N_PHASES_IDX] = self.n_phases
+        words[HEARTBEAT_INTERVAL_MS_IDX] = heartbeat_interval_ms
+        words[N_COUNTERS_IDX] = self.n_counters
+
+    def write_phase_names(self, words, names):
+        """Writes the table of the phase names into `words`, an indexable int64 view of the shared memory block"""
+        _write_names(words, self.phase_names_index, self.n_phases, names, "phase")
+
+    def read_phase_names(self, load):
+        """Reads the table of the phase names. `load(index)` must return the int64 word at index"""
+        return _read_names(load, self.phase_names_index, self.n_phases)
+
+    def write_counter_names(self, words, names):
+        """Writes the table of the counter names into `words`, an indexable int64 view of the shared memory block"""
+        _write_names(words, self.counter_names_index, self.n_counters, names, "counter")
+
+    def read_counter_names(self, load):
+        """Reads the table of the counter names. `load(index)` must return the int64 word at index"""
+        return _read_names(load, self.counter_names_index, self.n_counters)
+
+    @classmethod
+    def from_header(cls, load):
+        """Builds the layout of an existing block. `load(index)` must return the int64 word at index"""
+        n_workers = load(N_WORKERS_IDX)
+        version = load(LAYOUT_IDX)
+        header_words = load(HEADER_WORDS_IDX)
+        if version not in LAYOUT_NAMES.values():
+            raise ValueError("Unsupported shared memory layout version %s. Was the block created by an "
+                             "incompatible version of progressBarDistributed?" % version)
+        return cls(n_workers, version, header_words, load(N_PHASES_IDX), load(N_COUNTERS_IDX))
+
+
+def _write_names(words, start, count, names, kind):
+    if len(names) != count:
+        raise ValueError("Expected %d %s names, got %d" % (count, kind, len(names)))
+    for k, name in enumerate(names):
+        encoded = name.encode("utf-8")
+        if not encoded or len(encoded) > PHASE_NAME_BYTES:
+            raise ValueError("%s names must have between 1 and %d bytes once encoded in UTF-8, got %r"
+                             % (kind.capitalize(), PHASE_NAME_BYTES, name))
+        encoded = encoded.ljust(PHASE_NAME_BYTES, b"\0")
+        index = start + k * PHASE_NAME_WORDS
+        for i in range(PHASE_NAME_WORDS):
+            words[index + i] = int.from_bytes(encoded[8 * i:8 * (i + 1)], sys.byteorder, signed=True)
+
+
+def _read_names(load, start, count):
+    names = []
+    for k in range(count):
+        index = start + k * PHASE_NAME_WORDS
+        encoded = b"".join(int(load(index + i)).to_bytes(8, sys.byteorder, signed=True)
+                           for i in range(PHASE_NAME_WORDS))
+        names.append(encoded.rstrip(b"\0").decode("utf-8"))
+    return tuple(names)
+
+
+def segment_name(base_name, segment_index):
+    """The name of the segment number `segment_index` of the chain starting at the segment `base_name`"""
+    if segment_index == 0:
+        return base_name
+    return "%s_%d" % (base_name, segment_index)
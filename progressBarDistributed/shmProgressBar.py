@@ -1,139 +1,800 @@
+import asyncio
+import os
 import threading
 import time
-from multiprocessing import shared_memory, resource_tracker
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional, List, Sequence
 
 import numpy as np
 from tqdm import tqdm
 
-from progressBarDistributed.base import AbstractProgressBarWorker, AbstractProgressBar
+from progressBarDistributed.atomicOps import AtomicInt64Array, interprocess_lock, remove_lock
+from progressBarDistributed.base import AbstractProgressBar
+from progressBarDistributed.renderManager import BarRenderer, get_render_manager
+from progressBarDistributed.checkpoint import Checkpoint, write_checkpoint, load_checkpoint
+from progressBarDistributed.shmLayout import ShmLayout, segment_name, FREE_SLOT, N_SEGMENTS_IDX, GROW_REQUESTS_IDX, \
+    FLAGS_IDX, FLAG_AGGREGATES, AGG_STEPS_IDX, AGG_TOTAL_IDX, AGG_N_UNSET_IDX, AGG_N_UNREADY_IDX, \
+    AGG_N_CLAIMED_UNSET_IDX, WAKEUP_IDX, STEPS_FIELD, TOTAL_FIELD, OWNER_FIELD, HEARTBEAT_FIELD, SHED_FIELD, \
+    FLAG_HEARTBEATS, FLAG_CLOSED, FLAG_UNITS, FLAG_GROWABLE, FLAG_GROWING_TOTAL, FLAG_UNKNOWN_TOTAL, FLAG_POOLED, \
+    GENERATION_IDX, HEARTBEAT_INTERVAL_MS_IDX, WRITERS_IDX
+from progressBarDistributed.segmentPool import get_segment_pool
+from progressBarDistributed.shmWorker import SharedMemoryProgressBarWorker, _update_total_aggregates, get_worker, \
+    _attach_untracked
+from progressBarDistributed.unitBitmap import UnitBitmap, units_segment_name, iter_set_bits, N_UNITS_IDX
+from progressBarDistributed.wakeup import SharedWakeup
+from progressBarDistributed.workerStats import WorkerRateTracker, WorkerStatusTracker, WorkerStats, CounterStats, \
+    phase_stats, rebalance_hints, WAITING, DONE, DEAD, FREE, STALE
+
+TOTAL_MODES = ("fixed", "growing", "unknown")
+
+
+class ProgressSnapshot(NamedTuple):
+    steps: int  # Cumulated steps of all the workers
+    total: int  # Total number of steps. Only meaningful once ready
+    ready: bool  # Whether all the workers reported their totals
+    done: bool  # Whether the workers are ready and all the steps are done (or left to dead workers)
+    time: float  # time.monotonic() when the snapshot was taken
+
+
+class ProgressMetrics(NamedTuple):
+    time: float  # time.time() when the metrics were read
+    steps: int  # Cumulated steps of all the workers
+    total: Optional[int]  # Total number of steps, None with total_mode="unknown"
+    rate: float  # Steps per second of all the workers (sum of the per-worker moving averages)
+    eta: Optional[float]  # Seconds to finish at the current rate. None if unknown
+    ready: bool
+    done: bool
+    workers: List[WorkerStats]  # The slots that were used (some steps done or a total set)
+    counters: Sequence[CounterStats] = ()  # The named counters declared with `counters`
 
 
-class SharedMemoryProgressBarWorker(AbstractProgressBarWorker):
-    def __init__(self, worker_id, shm_name):
-        self.worker_id = worker_id
-        self.shm_name = shm_name
-        _remove_shm_from_resource_tracker()
-        self.shm = shared_memory.SharedMemory(name=self.shm_name)
-        self._progress = None
-        self._n_workers = None
+class SharedMemoryProgressBar(AbstractProgressBar):
+    _segment_class = shared_memory.SharedMemory  # Backend storing the counters
+    read_only = False  # True for the views of progress bars created by other processes, see attach()
+    _pool = None  # The SegmentPool the first segment was taken from
+
+    def __init__(self, n_workers, shm_name=None, layout="packed", growable=False, aggregates=False,
+                 track_workers=False, rate_window=10., straggler_ratio=0.25, show_slowest=0, phases=None,
+                 show_phases=False, heartbeat_timeout=None, stale_timeout=None, total_mode=None, n_units=None,
+                 checkpoint_path=None, checkpoint_interval=60., resume=True, render_manager=None, pool=None,
+                 counters=None, counter_units=None, show_counters=False):
+        """
 
-    @property
-    def progress(self):
-        if self._progress is None:
-            self._progress = np.ndarray((1 + 2 * self.n_workers,), dtype=np.int64, buffer=self.shm.buf)
-        return self._progress
+        :param n_workers: The number of worker slots. For growable progress bars, the initial number of slots.
+        :param shm_name: The name of a pre-exisiting share_memory block
+        :param layout: "packed" stores the counters contiguously. "padded" places the counters of each worker on
+                       its own cache line, which avoids false sharing when many workers update at a high rate.
+        :param growable: Set it to True when workers claim their slot (worker_id=None). New segments of slots are
+                         added when workers find all the slots taken, by a thread of the bar that serves their
+                         requests until close(), and slots that were never claimed are ignored.
+                         The number of tasks, and thus the total number of steps, is not known in advance, so the
+                         bar keeps tracking the total until it is closed.
+        :param aggregates: If True, workers also maintain the sums of steps and totals in the header, so that
+                           reading the progress costs O(1) instead of O(n_workers), at the price of one extra atomic
+                           operation per published update. Recommended for very large numbers of slots.
+        :param track_workers: If True, the progress thread samples the counters of every slot at each refresh to
+                              estimate per-worker rates (see worker_stats()). Otherwise, rates are only sampled when
+                              worker_stats() is called.
+        :param rate_window: Time constant, in seconds, of the moving average of the per-worker rates
+        :param straggler_ratio: Workers whose rate is below straggler_ratio times the median rate of the active
+                                workers are flagged as stragglers
+        :param show_slowest: If > 0, the slowest `show_slowest` active workers are shown in the bar postfix.
+                             Implies track_workers=True
+        :param phases: Names of the phases of the work (e.g. ["load", "compute", "write"]). Workers attribute their
+                       steps and wall time to them with `with worker.phase(name):`, see phase_stats()
+        :param show_phases: If True, the dominant phase (the one where the workers spend the most time) and its share
+                            of the time are shown in the bar postfix
+        :param heartbeat_timeout: If set, workers write a heartbeat into their slot on every update and every
+                                  heartbeat_timeout / 4 seconds, and the workers without heartbeat for
+                                  heartbeat_timeout seconds (or that never attached, heartbeat_timeout seconds after
+                                  the creation of the bar) are dead: they no longer hold back the readiness of the bar
+                                  and its completion. See worker_status()
+        :param stale_timeout: If set, running workers that published no step for stale_timeout seconds are stale.
+                              Progress is sampled at each refresh of the progress thread and each call to
+                              worker_status()
+        :param total_mode: How the progress thread handles the total number of steps:
+                           "fixed": workers report their totals with set_total_steps() before starting, and the bar
+                           completes once all the steps are done. Later changes of the totals are still displayed.
+                           "growing": workers may add to their totals at any time (add_total_steps()), so reaching
+                           the current total does not end the bar, which keeps tracking the total until closed.
+                           "unknown": workers do not report totals, and the bar only shows the steps and throughput.
+                           Defaults to "growing" for growable bars, "fixed" otherwise.
+        :param n_units: If set, the bar also tracks which of the work units 0..n_units-1 are done, in a shared bitmap
+                        that workers update with worker.mark_done(unit). See is_unit_done() and done_units()
+        :param checkpoint_path: If set, the counters of the slots and the bitmap of the work units are saved to this
+                                file every checkpoint_interval seconds (by the progress thread or watch()) and on
+                                close(). The file is replaced atomically. See checkpoint()
+        :param checkpoint_interval: The interval in seconds between two checkpoints
+        :param resume: If True and checkpoint_path exists, the steps, the totals and the done work units are restored
+                       from it, in the same slots, so that a restarted job resumes its progress. Workers with a fixed
+                       id overwrite the total of their slot, so they report their whole total; claimed slots add to the
+                       totals, so their workers only report the remaining work.
+        :param render_manager: A RenderManager that draws the bar from its thread, shared with other bars, instead of a
+                               progress thread of its own when the bar is used as a context manager. True for the
+                               RenderManager of the process (see get_render_manager())
+        :param pool: A SegmentPool to take the first segment from, and to give it back to on close() instead of
+                     unlinking it, for jobs creating many short-lived bars. True for the SegmentPool of the process
+                     (see get_segment_pool()). The name of the segment is then chosen by the pool (shm_name must be
+                     None), and may be reused by later bars: workers of a closed bar that are still attached see
+                     progress_bar_closed, and their writes are dropped
+        :param counters: Names of int64 counters kept by every worker next to its steps (e.g. ["bytes", "retries",
+                         "errors"]), that workers add to with worker.increment(name, n). See counter_stats()
+        :param counter_units: The units of the counters shown in the bar postfix, e.g. {"bytes": "B"}
+        :param show_counters: If True, the rate of every counter is shown in the bar postfix, e.g. "bytes: 12.3MB/s",
+                              next to the steps per second of the bar
+        """
+        self.total_mode = total_mode or ("growing" if growable else "fixed")
+        if self.total_mode not in TOTAL_MODES or (growable and self.total_mode == "fixed"):
+            raise ValueError("Invalid total_mode %r. Valid modes: %s (not 'fixed' for growable bars)"
+                             % (total_mode, list(TOTAL_MODES)))
+        self.n_workers = n_workers
+        self.growable = growable
+        self.aggregates = aggregates
+        self.phase_names = tuple(phases or ())
+        self.counter_names = tuple(counters or ())
+        checkpoint = None
+        if checkpoint_path is not None and resume and os.path.exists(checkpoint_path):
+            checkpoint = load_checkpoint(checkpoint_path)  # Fails early, before any segment is created
+            if checkpoint.n_units != (n_units or 0):
+                raise ValueError("The checkpoint %s tracks %d work units, not %d"
+                                 % (checkpoint_path, checkpoint.n_units, n_units or 0))
+            if len(checkpoint.steps) > n_workers and not growable:
+                raise ValueError("The checkpoint %s holds %d slots, more than the %d slots of the progress bar"
+                                 % (checkpoint_path, len(checkpoint.steps), n_workers))
+        self.layout = ShmLayout(n_workers, layout, n_phases=len(self.phase_names), n_counters=len(self.counter_names))
+        pool = get_segment_pool() if pool is True else pool
+        if pool is not None and shm_name is not None:
+            raise ValueError("A pooled progress bar cannot use the pre-existing segment %s" % shm_name)
+        self.shm = pool.acquire(self.layout.n_bytes, self._pool_key()) if pool is not None else None
+        if self.shm is None:
+            self.shm = self._open_segment(shm_name, create=shm_name is None, size=self.layout.n_bytes)
+        self._pool = pool
+        self.shm_name = self.shm.name
 
+        flags = (FLAG_AGGREGATES if aggregates else 0) | (FLAG_HEARTBEATS if heartbeat_timeout is not None else 0) \
+            | (FLAG_UNITS if n_units else 0) | (FLAG_GROWABLE if growable else 0) \
+            | {"fixed": 0, "growing": FLAG_GROWING_TOTAL, "unknown": FLAG_UNKNOWN_TOTAL}[self.total_mode] \
+            | (FLAG_POOLED if pool is not None else 0)
+        heartbeat_interval_ms = 0 if heartbeat_timeout is None else max(1, int(heartbeat_timeout * 1000 / 4))
+        self.progress = self._init_segment(self.shm, self.layout, flags=flags, phase_names=self.phase_names,
+                                           heartbeat_interval_ms=heartbeat_interval_ms,
+                                           counter_names=self.counter_names)
+        self._init_monitoring(heartbeat_timeout, stale_timeout, track_workers, rate_window, straggler_ratio,
+                              show_slowest, show_phases, show_counters, counter_units)
+
+        self.n_units = n_units or 0
+        if self.n_units:
+            self._units_shm = self._open_segment(units_segment_name(self.shm_name), create=True,
+                                                 size=UnitBitmap.n_bytes(self.n_units))
+            self._units_shm.buf[:] = bytes(len(self._units_shm.buf))
+            self._units_atomic = AtomicInt64Array(self._units_shm.buf, self._lock)
+            self._units_atomic.store(N_UNITS_IDX, self.n_units)
+            self._units = UnitBitmap(self._units_atomic)
+
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        if checkpoint is not None:
+            self._restore(checkpoint)
+        self._next_checkpoint_time = time.monotonic() + checkpoint_interval
+        self.render_manager = get_render_manager() if render_manager is True else render_manager
+        if growable:
+            # Workers wait for their grow requests to be served, whether or not the bar is drawn or watched
+            self._grow_thread = threading.Thread(target=self._grow_thread_loop, daemon=True)
+            self._grow_thread.start()
+
+    def _init_monitoring(self, heartbeat_timeout, stale_timeout, track_workers, rate_window, straggler_ratio,
+                         show_slowest, show_phases, show_counters, counter_units):
+        """The state of the parent side that does not depend on how the first segment was obtained"""
+        self.steps = self.progress[self.layout.steps_slice]
+        self.totals = self.progress[self.layout.totals_slice]
+        self._lock = None if self.read_only else self._open_lock()  # Views never write
+        self._atomic = AtomicInt64Array(self.shm.buf, self._lock)
+        self._wakeup = SharedWakeup(self._atomic, WAKEUP_IDX)
+        self.stop_event = threading.Event()
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self._extra_segments = []  # (shm, layout, progress) of the segments added by grow()
+        self._grow_lock = threading.RLock()
+        self._n_grow_requests_served = 0
+        self._grow_thread = None
+
+        self.show_slowest = show_slowest
+        self.show_phases = show_phases
+        self.track_workers = track_workers or show_slowest > 0
+        self._rate_tracker = WorkerRateTracker(rate_window, straggler_ratio)
+        self._status_tracker = WorkerStatusTracker(heartbeat_timeout, stale_timeout, self.growable)
+        self.show_counters = show_counters
+        self.counter_units = dict(counter_units or {})
+        self._counter_trackers = [WorkerRateTracker(rate_window) for _ in self.counter_names]
+
+        self.n_units = 0
+        self.checkpoint_path = None
+        self._checkpoint_lock = threading.Lock()  # Serializes the writes of the checkpoints, see watch()
+        self._exporters = []
+        self.render_manager = None
+        self.progress_thread = None
+
+    @classmethod
+    def attach(cls, shm_name, track_workers=False, rate_window=10., straggler_ratio=0.25, show_slowest=0,
+               show_phases=False, stale_timeout=None, show_counters=False, counter_units=None):
+        """
+        Read-only view of a progress bar created by another process, e.g. to display it from another terminal with
+        progress_bar_thread(). The options of the progress bar (slots, aggregates, total mode, phases, heartbeats...)
+        are read from the header of its segment. The view never writes to the counters, and close() only detaches
+        from the segments: they are never unlinked. See progress_bar_closed to know when the owner closed the bar.
+
+        :param shm_name: The name of the shared memory block (or the path of the file of a MmapProgressBar)
+        :param track_workers, rate_window, straggler_ratio, show_slowest, show_phases, stale_timeout, show_counters,
+               counter_units: The display options of SharedMemoryProgressBar
+        """
+        self = cls.__new__(cls)
+        self.read_only = True
+        self.shm = _attach_untracked(self._segment_class, shm_name)  # Otherwise this process would unlink it on exit
+        self.shm_name = self.shm.name
+        try:
+            self.progress, self.layout = self._map_segment(self.shm)
+            flags = int(self.progress[FLAGS_IDX])
+        except BaseException:
+            self.cleanup()
+            raise
+        self.n_workers = self.layout.n_workers
+        self.growable = bool(flags & FLAG_GROWABLE)
+        self.aggregates = bool(flags & FLAG_AGGREGATES)
+        self.total_mode = "growing" if flags & FLAG_GROWING_TOTAL else "unknown" if flags & FLAG_UNKNOWN_TOTAL \
+            else "fixed"
+        self.phase_names = self.layout.read_phase_names(self.progress.__getitem__)
+        self.counter_names = self.layout.read_counter_names(self.progress.__getitem__)
+        heartbeat_timeout = None
+        if flags & FLAG_HEARTBEATS:
+            heartbeat_timeout = 4 * int(self.progress[HEARTBEAT_INTERVAL_MS_IDX]) / 1000.
+        self._init_monitoring(heartbeat_timeout, stale_timeout, track_workers, rate_window, straggler_ratio,
+                              show_slowest, show_phases, show_counters, counter_units)
+        if flags & FLAG_UNITS:
+            self._units_shm = _attach_untracked(self._segment_class, units_segment_name(self.shm_name))
+            self._units_atomic = AtomicInt64Array(self._units_shm.buf)
+            self._units = UnitBitmap(self._units_atomic)
+            self.n_units = self._units.n_units
+        self._attach_new_segments()
+        return self
+
+    def _map_segment(self, shm):
+        """The int64 words and the layout of an existing segment, read from its header"""
+        words = np.ndarray((shm.size // 8,), dtype=np.int64, buffer=shm.buf)
+        layout = ShmLayout.from_header(lambda index: int(words[index]))
+        return words[:layout.n_words], layout
+
+    def _attach_new_segments(self):
+        """Read-only views: attaches the segments added to the chain by the owner of the progress bar"""
+        with self._grow_lock:
+            for segment_index in range(1 + len(self._extra_segments), self._atomic.load(N_SEGMENTS_IDX)):
+                shm = _attach_untracked(self._segment_class, segment_name(self.shm_name, segment_index))
+                self._extra_segments.append((shm, None, None))  # Detached by cleanup() even if mapping fails
+                progress, layout = self._map_segment(shm)
+                self._extra_segments[-1] = (shm, layout, progress)
 
     @property
-    def n_workers(self):
-        if self._n_workers is None:
-            self._n_workers = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)[0] #First elelemt of the array
-        return self._n_workers
+    def progress_bar_closed(self):
+        """
+        Whether the owner of the progress bar closed it. Read-only views (see attach()) use it to know when to stop
+        """
+        return bool(self._atomic.load(FLAGS_IDX) & FLAG_CLOSED)
 
+    def _open_segment(self, name, create, size):
+        return self._segment_class(name=name, create=create, size=size)
 
-    def update(self, n=1):
-        self.progress[1 + self.worker_id] += n
+    def _open_lock(self):
+        """The lock file shared with the workers when native atomics are not available, see shmWorker"""
+        return interprocess_lock(self.shm_name)
 
-    def set_total_steps(self, n):
-        self.progress[1 + self.n_workers + self.worker_id] = n
+    def _pool_key(self):
+        """Segments of a SegmentPool are only reused by bars with the same key"""
+        return self._segment_class
 
-    def get_total_steps(self):
-        return self.progress[1 + self.n_workers + self.worker_id]
+    @staticmethod
+    def _init_segment(shm, layout, segment_index=0, slot_offset=0, flags=0, phase_names=(), heartbeat_interval_ms=0,
+                      counter_names=()):
+        progress = np.ndarray((layout.n_words,), dtype=np.int64, buffer=shm.buf)
+        generation, writers = progress[GENERATION_IDX], progress[WRITERS_IDX]  # Kept on reset, see SegmentPool
+        progress[:] = 0  # Initialize step counters all to 0 and all the slots as free
+        layout.write_header(progress, segment_index, slot_offset, flags, heartbeat_interval_ms)  # n_workers, layout...
+        progress[GENERATION_IDX] = generation
+        progress[WRITERS_IDX] = writers
+        progress[layout.totals_slice] = -1  # Initialize totals to -1
+        layout.write_phase_names(progress, phase_names)
+        layout.write_counter_names(progress, counter_names)
+        return progress
+
+    def _iter_segments(self):
+        yield self.layout, self.progress
+        for _, layout, progress in self._extra_segments:
+            yield layout, progress
 
-    def __enter__(self):
-        return self
+    @property
+    def capacity(self):
+        """The total number of worker slots, including those added by grow()"""
+        return sum(layout.n_workers for layout, _ in self._iter_segments())
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
-        return False
+    def _gather(self, field):
+        """The values of the counter `field` of all the slots of the chain, as a new array indexed by worker id"""
+        return np.concatenate([progress[layout.field_slice(field)] for layout, progress in self._iter_segments()])
 
-    def close(self):
-        try:
-            self.shm.close()
-        except IOError:
-            pass
+    def get_cum_steps(self):
+        if self.aggregates:
+            return self.progress[AGG_STEPS_IDX]
+        if not self._extra_segments:
+            return np.sum(self.steps)
+        return sum(np.sum(progress[layout.steps_slice]) for layout, progress in self._iter_segments())
 
-def _remove_shm_from_resource_tracker():
-    """Monkey-patch multiprocessing.resource_tracker so SharedMemory won't be tracked.
-    See: https://bugs.python.org/issue38119
-    """
+    def get_total_steps(self):
+        # Unset totals count as -1 with fixed totals, unless dead workers are detected (heartbeat_timeout)
+        unset_count = self.total_mode == "fixed" and self.heartbeat_timeout is None
+        if self.aggregates:
+            if not unset_count:
+                return self.progress[AGG_TOTAL_IDX]
+            return self.progress[AGG_TOTAL_IDX] - self.progress[AGG_N_UNSET_IDX]
+        if unset_count:
+            return np.sum(self.totals)
+        return sum(np.sum(np.maximum(progress[layout.totals_slice], 0)) for layout, progress in self._iter_segments())
 
-    # Keep originals so we can delegate for non-shm resources
-    _orig_register = resource_tracker.register
-    _orig_unregister = resource_tracker.unregister
+    def are_workers_ready(self):
+        if self.heartbeat_timeout is not None:
+            # Dead workers, e.g. workers that crashed before reporting their total, do not hold back the others
+            statuses = self._statuses()
+            if (statuses == WAITING).any():
+                return False
+            return not self.growable or (self._gather(TOTAL_FIELD) > 0).any()
+        if self.aggregates:
+            if self.growable:
+                return self.progress[AGG_TOTAL_IDX] > 0 and self.progress[AGG_N_CLAIMED_UNSET_IDX] == 0
+            return self.progress[AGG_N_UNREADY_IDX] == 0
+        if not self.growable:
+            return (self.totals > 0).all()
+        # Ready once some total was reported, and no claimed slot is still waiting for its total
+        any_total = False
+        for layout, progress in self._iter_segments():
+            totals = progress[layout.totals_slice]
+            if ((progress[layout.owners_slice] != FREE_SLOT) & (totals < 0)).any():
+                return False
+            any_total = any_total or (totals > 0).any()
+        return any_total
+
+    def _statuses(self):
+        return self._status_tracker.statuses(self._gather(STEPS_FIELD), self._gather(TOTAL_FIELD),
+                                             self._gather(OWNER_FIELD), self._gather(HEARTBEAT_FIELD))
+
+    def worker_status(self):
+        """
+        The status of every slot: "waiting" (total not reported yet), "running", "stale" (no step published for
+        stale_timeout seconds), "done", "dead" (no heartbeat for heartbeat_timeout seconds) or, for growable bars,
+        "free" (no worker holds the slot). Workers are only dead when the bar was created with heartbeat_timeout.
 
-    def fix_register(name, rtype):
-        # Skip tracking for shared_memory; delegate otherwise
-        if rtype == "shared_memory":
-            return
-        return _orig_register(name, rtype)
+        :return: A list of statuses, indexed by worker id
+        """
+        return self._statuses().tolist()
 
-    def fix_unregister(name, rtype):
-        if rtype == "shared_memory":
-            return
-        return _orig_unregister(name, rtype)
+    def _live_workers_done(self):
+        """Whether every worker is either done or dead"""
+        statuses = self._statuses()
+        return bool(((statuses == DONE) | (statuses == DEAD) | (statuses == FREE)).all())
 
-    resource_tracker.register = fix_register
-    resource_tracker.unregister = fix_unregister
+    def _worker_status_postfix(self):
+        statuses = self._statuses()
+        counts = ["%s: %d" % (status, np.count_nonzero(statuses == status)) for status in (DEAD, STALE)]
+        return ", ".join(count for count in counts if not count.endswith(": 0"))
 
-    # Also prevent cleanup attempts for shared_memory
-    if "shared_memory" in resource_tracker._CLEANUP_FUNCS:
-        del resource_tracker._CLEANUP_FUNCS["shared_memory"]
-        
+    def worker_stats(self):
+        """
+        Per-worker statistics: steps, total, rate (EWMA of steps/s), ETA and whether the worker is a straggler.
 
-class SharedMemoryProgressBar(AbstractProgressBar):
-    def __init__(self, n_workers, shm_name=None):
+        :return: A list of WorkerStats, indexed by worker id
         """
+        steps = self._gather(STEPS_FIELD)
+        self._rate_tracker.sample(steps)
+        return self._rate_tracker.stats(steps, self._gather(TOTAL_FIELD))
 
-        :param n_workers:
-        :param shm_name: The name of a pre-exisiting share_memory block
+    def stragglers(self):
+        """The ids of the active workers whose rate is far below the median rate"""
+        return [stats.worker_id for stats in self.worker_stats() if stats.straggler]
+
+    def rebalance(self, late_ratio=1.5, min_shed=1, publish=True):
         """
-        self.n_workers = n_workers
-        self.shm = shared_memory.SharedMemory(create=shm_name is None,
-                                              size=(1 + 2 * n_workers) * 8, name=shm_name)
-        self.shm_name = self.shm.name
-        self.stop_event = threading.Event()
+        Predicts when each worker finishes from its remaining steps and its rate, and finds the workers expected to
+        finish far behind the others (see workerStats.rebalance_hints()). Each of them is asked to hand over the steps
+        it cannot do in time to its peers: the request is written into its slot, where the worker polls it with
+        worker.shed_request(), and is cleared once the worker is no longer late or reports the steps handed over with
+        worker.shed(n). Call it periodically, e.g. from the loop of watch(): rates are sampled at each call.
+
+        :param late_ratio: How much later than the balanced finish time a worker must be expected to finish to be late
+        :param min_shed: The smallest number of steps worth handing over
+        :param publish: Whether to write the requests into the slots. Read-only views never write them
+        :return: A list of RebalanceHint, one per late worker
+        """
+        sampled = self._gather(SHED_FIELD)  # Before the totals, see _publish_shed_requests()
+        stats = self.worker_stats()
+        if self.growable:
+            owners = self._gather(OWNER_FIELD)
+            stats = [worker for worker in stats if owners[worker.worker_id] != FREE_SLOT]
+        hints = rebalance_hints(stats, late_ratio, min_shed)
+        if publish and not self.read_only:
+            self._publish_shed_requests(hints, stats, sampled)
+        return hints
+
+    def _publish_shed_requests(self, hints, stats, sampled):
+        """
+        Writes the requests of `hints` into the slots, and clears the requests of the other slots. A worker may run
+        shed() after the slots were sampled: each request only replaces the sampled one (compare-and-exchange), and
+        the request of a worker whose total changed since it was sampled is not written, so that the steps a worker
+        handed over are never requested again.
+        """
+        requests = {hint.worker_id: hint.shed for hint in hints}
+        totals = {worker.worker_id: worker.total for worker in stats}
+        start = 0
+        for layout, atomic in self._segment_atomics():
+            for local_id in range(layout.n_workers):
+                worker_id = start + local_id
+                request, previous = requests.get(worker_id, 0), int(sampled[worker_id])
+                if request == previous:
+                    continue
+                if request and atomic.load(layout.total_index(local_id)) != totals[worker_id]:
+                    continue
+                atomic.compare_exchange(layout.shed_index(local_id), previous, request)
+            start += layout.n_workers
+
+    def _segment_atomics(self):
+        """Yields the layout and an atomic view of each segment of the chain"""
+        yield self.layout, self._atomic
+        for shm, layout, _ in self._extra_segments:
+            atomic = AtomicInt64Array(shm.buf, self._lock)
+            try:
+                yield layout, atomic
+            finally:
+                atomic.release()
+
+    def _slowest_workers_postfix(self):
+        active = [stats for stats in self.worker_stats() if stats.total > 0 and stats.steps < stats.total]
+        slowest = sorted(active, key=lambda stats: stats.rate)[:self.show_slowest]
+        return ", ".join("w%d%s %.3g/s" % (stats.worker_id, "!" if stats.straggler else "", stats.rate)
+                         for stats in slowest)
+
+    def metrics(self):
+        """The progress, throughput and per-worker counters, as a ProgressMetrics (see export_metrics())"""
+        snapshot = self.snapshot()
+        workers = [stats for stats in self.worker_stats() if stats.steps > 0 or stats.total >= 0]
+        rate = sum(stats.rate for stats in workers)
+        total = snapshot.total if self.total_mode != "unknown" else None
+        if total is None or not snapshot.ready:
+            eta = None
+        elif snapshot.done or snapshot.steps >= total:
+            eta = 0.
+        else:
+            eta = (total - snapshot.steps) / rate if rate > 0 else None
+        return ProgressMetrics(time.time(), snapshot.steps, total, rate, eta, snapshot.ready, snapshot.done, workers,
+                               self.counter_stats())
+
+    def export_metrics(self, port=None, host="127.0.0.1", path=None, interval=10., labels=None):
+        """
+        Exports metrics() for dashboards, alongside the progress thread or instead of it: serves them in the
+        Prometheus text format at http://host:port/metrics, and/or appends them as JSON lines to `path` every
+        `interval` seconds. The export stops when the progress bar is closed.
+
+        :param port: The port of the HTTP endpoint. 0 picks a free port. None to not serve the metrics
+        :param host: The address the HTTP endpoint listens on
+        :param path: The JSON-lines file. None to not write the metrics to a file
+        :param interval: The interval in seconds between two JSON lines
+        :param labels: Labels added to every metric, e.g. {"job": "ingest"}, to tell concurrent jobs apart
+        :return: The MetricsExporter (see its port attribute)
+        """
+        from progressBarDistributed.metricsExport import MetricsExporter
+        exporter = MetricsExporter(self.metrics, port, host, path, interval, labels)
+        self._exporters.append(exporter)
+        return exporter
 
-        self.progress = np.ndarray((1 + 2 * n_workers,), dtype=np.int64, buffer=self.shm.buf)
-        self.progress[0] = n_workers  # Store n_workers in the first element
-        self.progress[1:1+n_workers] = 0  # Initialize step counters all to 0
-        self.progress[1+n_workers:] = -1  # Initialize totals to -1
+    def phase_stats(self):
+        """
+        Steps done and wall time spent in each of the phases declared with `phases`, summed over all the workers.
 
-        self.progress_thread = None
+        :return: A list of PhaseStats, in the order of the declaration of the phases
+        """
+        steps = [int(np.sum(self._gather(self.layout.phase_steps_field(phase_id))))
+                 for phase_id in range(self.layout.n_phases)]
+        times_ns = [int(np.sum(self._gather(self.layout.phase_time_field(phase_id))))
+                    for phase_id in range(self.layout.n_phases)]
+        return phase_stats(self.phase_names, steps, times_ns)
 
-    def get_cum_steps(self):
-        return np.sum(self.progress[1:1+self.n_workers])
+    def counter_stats(self):
+        """
+        Value and rate of each of the counters declared with `counters`, summed over all the workers. The rates are
+        moving averages over rate_window, sampled at each call and each refresh of the bar when show_counters is set.
 
-    def get_total_steps(self):
-        return np.sum(self.progress[1+self.n_workers:])
+        :return: A list of CounterStats, in the order of the declaration of the counters
+        """
+        stats = []
+        for counter_id, (name, tracker) in enumerate(zip(self.counter_names, self._counter_trackers)):
+            values = self._gather(self.layout.counter_field(counter_id))
+            tracker.sample(values)
+            stats.append(CounterStats(name, int(np.sum(values)), float(np.sum(tracker.rates))))
+        return stats
+
+    def _counters_postfix(self):
+        return ", ".join("%s: %s%s/s" % (stats.name, tqdm.format_sizeof(stats.rate),
+                                         self.counter_units.get(stats.name, ""))
+                         for stats in self.counter_stats())
+
+    def dominant_phase(self):
+        """The name of the phase where the workers spent the most time so far, or None if no time was recorded"""
+        stats = max(self.phase_stats(), key=lambda stats: stats.seconds, default=None)
+        return stats.name if stats is not None and stats.seconds > 0 else None
+
+    def _dominant_phase_postfix(self):
+        stats = max(self.phase_stats(), key=lambda stats: stats.seconds, default=None)
+        if stats is None or stats.seconds <= 0:
+            return "phase: -"
+        return "phase: %s %.0f%%" % (stats.name, 100 * stats.time_fraction)
+
+    def grow(self, n_slots=None):
+        """
+        Adds a new segment of worker slots to the chain of segments.
 
-    def are_workers_ready(self):
-        return (self.progress[1+self.n_workers:] > 0).all()
+        :param n_slots: The number of slots of the new segment. By default, the current capacity (i.e. doubling it)
+        """
+        with self._grow_lock:
+            segment_index = 1 + len(self._extra_segments)
+            layout = ShmLayout(n_slots or self.capacity, self.layout.version, n_phases=self.layout.n_phases,
+                               n_counters=self.layout.n_counters)
+            shm = self._open_segment(segment_name(self.shm_name, segment_index), create=True, size=layout.n_bytes)
+            progress = self._init_segment(shm, layout, segment_index, slot_offset=self.capacity,
+                                          phase_names=self.phase_names, counter_names=self.counter_names)
+            if self.aggregates:
+                self._atomic.fetch_add(AGG_N_UNSET_IDX, layout.n_workers)
+                self._atomic.fetch_add(AGG_N_UNREADY_IDX, layout.n_workers)
+            self._extra_segments.append((shm, layout, progress))
+            self._atomic.store(N_SEGMENTS_IDX, segment_index + 1)  # Publish the segment once it is initialized
+
+    def _serve_grow_requests(self):
+        if not self.growable:
+            return
+        if self.read_only:
+            self._attach_new_segments()  # Only the owner of the progress bar grows it
+            return
+        with self._grow_lock:  # The progress thread and watch() may both serve requests
+            n_requests = self._atomic.load(GROW_REQUESTS_IDX)
+            if n_requests > self._n_grow_requests_served:
+                self._n_grow_requests_served = n_requests
+                self.grow()
+
+    def _grow_thread_loop(self):
+        # Claiming workers signal their requests, so without futexes only a short poll keeps them from waiting long
+        timeout = 1. if self._wakeup.native else 0.02
+        while True:
+            sequence = self._wakeup.sequence()  # Before checking stop_event, so that the notify() of close() is seen
+            if self.stop_event.is_set():
+                return
+            self._serve_grow_requests()
+            self._wakeup.wait(sequence, timeout, self.stop_event)
+
+    def is_unit_done(self, unit):
+        """Whether the work unit `unit` was marked as done, in this run or in the run restored from the checkpoint"""
+        return self._unit_bitmap().is_set(unit)
+
+    def done_units(self):
+        """The work units marked as done so far, in increasing order"""
+        return list(iter_set_bits(self._unit_bitmap().to_bytes()))
+
+    def _unit_bitmap(self):
+        if not self.n_units:
+            raise RuntimeError("This progress bar does not track work units. Create it with n_units")
+        return self._units
+
+    def checkpoint(self, path=None):
+        """
+        Saves the steps and the totals of all the slots and the bitmap of the done work units to `path` (by default,
+        checkpoint_path), atomically. Called periodically by the progress thread and watch() when checkpoint_path is
+        set, and by close().
+
+        :return: The Checkpoint that was written
+        """
+        path = path if path is not None else self.checkpoint_path
+        if path is None:
+            raise ValueError("No checkpoint path: pass one, or create the progress bar with checkpoint_path")
+        # The bitmap is read before the counters, and workers publish the steps of a unit before marking it: a unit
+        # saved as done always has its steps saved too
+        checkpoint = self._read_checkpoint()
+        with self._checkpoint_lock:
+            write_checkpoint(path, checkpoint)
+        return checkpoint
+
+    def _read_checkpoint(self):
+        """The Checkpoint of the current counters, read from the segments without writing it"""
+        done = self._units.to_bytes() if self.n_units else b""
+        return Checkpoint(time.time(), self._gather(STEPS_FIELD).tolist(), self._gather(TOTAL_FIELD).tolist(),
+                          self.n_units, done)
+
+    def _checkpoint_due(self):
+        return self.checkpoint_path is not None and time.monotonic() >= self._next_checkpoint_time
+
+    def _checkpoint_if_due(self):
+        if self._checkpoint_due():
+            self.checkpoint()
+            self._next_checkpoint_time = time.monotonic() + self.checkpoint_interval
+
+    def _write_periodic_checkpoint(self, checkpoint):
+        """
+        Writes a checkpoint read earlier, from a thread of the executor of watch(). Skipped once the progress bar is
+        closed: close() writes the final checkpoint, which an older one must not replace.
+        """
+        with self._checkpoint_lock:
+            if not self.stop_event.is_set():
+                write_checkpoint(self.checkpoint_path, checkpoint)
+
+    def _restore(self, checkpoint):
+        """Writes the counters and the done work units of `checkpoint` back, before any worker attaches"""
+        if len(checkpoint.steps) > self.capacity:
+            self.grow(len(checkpoint.steps) - self.capacity)
+        worker_id = 0
+        for layout, progress in self._iter_segments():
+            n = min(layout.n_workers, len(checkpoint.steps) - worker_id)
+            if n <= 0:
+                break
+            progress[layout.steps_slice][:n] = checkpoint.steps[worker_id:worker_id + n]
+            progress[layout.totals_slice][:n] = checkpoint.totals[worker_id:worker_id + n]
+            worker_id += n
+        if self.aggregates:
+            self._atomic.fetch_add(AGG_STEPS_IDX, sum(checkpoint.steps))
+            for total in checkpoint.totals:
+                _update_total_aggregates(self._atomic, -1, total)
+        if self.n_units:
+            self._units.load_bytes(checkpoint.done)
 
     def set_total_steps(self, n, worker_id):
-        self.progress[1 + self.n_workers + worker_id] = n
-        
-    def progress_bar_thread(self, refresh_seconds=0.5, *args, **kwargs):
-        def _progress_bar_thread():
-            while not self.stop_event.is_set() and not self.are_workers_ready():
-                time.sleep(0.1 * refresh_seconds)
-            total_steps = self.get_total_steps()
+        if not self.aggregates:
+            self.totals[worker_id] = n
+            return
+        old = self._atomic.exchange(self.layout.total_index(worker_id), n)
+        _update_total_aggregates(self._atomic, old, n)
+        self._wakeup.notify()
+
+    def add_total_steps(self, n, worker_id):
+        """Adds n steps to the total of the slot worker_id of the first segment, e.g. a slot of reserve_slot()"""
+        self._add_to_total(worker_id, n)
+        self._wakeup.notify()
+
+    def reserve_slot(self):
+        """
+        Claims a free slot of the first segment for the owner of the progress bar, e.g. to hold the total number of
+        steps when the workers claim their slots (worker_id=None) without knowing it. Unlike attaching a worker in
+        this process, it maps nothing. The total of the slot starts from 0 (or from the total restored from a
+        checkpoint): report it with set_total_steps(n, worker_id) or add_total_steps(n, worker_id). The slot is held
+        until the progress bar is closed.
+
+        :return: The worker id of the slot
+        """
+        if self.read_only:
+            raise RuntimeError("Read-only views of a progress bar cannot reserve slots")
+        token = os.getpid()
+        for worker_id in range(self.layout.n_workers):
+            owner_idx = self.layout.owner_index(worker_id)
+            if self._atomic.load(owner_idx) == FREE_SLOT and \
+                    self._atomic.compare_exchange(owner_idx, FREE_SLOT, token)[0]:
+                self._add_to_total(worker_id, 0)  # Set, so that the slot does not wait for a total
+                return worker_id
+        raise RuntimeError("No free worker slot in the first segment of %s to reserve" % self.shm_name)
+
+    def _add_to_total(self, worker_id, delta):
+        index = self.layout.total_index(worker_id)
+        while True:
+            old = self._atomic.load(index)
+            new = max(old, 0) + delta  # A negative total means that it was not set yet
+            if self._atomic.compare_exchange(index, old, new)[0]:
+                break
+        if self.aggregates:
+            _update_total_aggregates(self._atomic, old, new)
+
+    def _wait_for_workers(self, sequence, timeout):
+        """
+        Sleeps until a worker (or close()) signals a change after `sequence` was read, or `timeout` seconds pass
+        """
+        if not self.read_only:
+            self._wakeup.wait(sequence, timeout, self.stop_event)
+            return
+        # The close() of a view cannot signal the futex without writing to the segment: wait in short slices instead
+        deadline = time.monotonic() + timeout
+        while not self.stop_event.is_set() and self._wakeup.sequence() == sequence:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._wakeup.wait(sequence, min(remaining, 0.1), self.stop_event)
 
-            with tqdm(total=total_steps, dynamic_ncols=True, *args, **kwargs) as pbar:
-                while not self.stop_event.is_set() and self.get_cum_steps() < total_steps:
-                    pbar.n = self.get_cum_steps()
-                    pbar.refresh()
-                    time.sleep(refresh_seconds)
+    def progress_bar_thread(self, refresh_seconds=0.5, *args, **kwargs):
+        """
+        Starts a thread drawing the progress until the work is done or the bar is closed.
+
+        :param refresh_seconds: The shortest interval between two refreshes. Refreshes are spaced out up to
+                                max_refresh_seconds while the steps come slowly, and skipped when nothing changed
+        :param args: The positional arguments of tqdm
+        :param kwargs: The options of BarRenderer (max_refresh_seconds=10., output="auto", log_percent=10.,
+                       log_seconds=60.) and the keyword arguments of tqdm. When the output is a regular file or a pipe,
+                       log lines are written every log_percent percent of the total or log_seconds seconds instead of a
+                       bar
+        """
+        # Workers signal when they report their totals and when they finish. Without futexes, or if some updates
+        # do not go through workers, changes are only seen by polling, so poll the readiness more often
+        ready_timeout = refresh_seconds if self._wakeup.native else 0.1 * refresh_seconds
+        renderer = BarRenderer(self, *args, refresh_seconds=refresh_seconds, **kwargs)
 
-                pbar.n = self.get_cum_steps()
-                pbar.refresh()
+        def _progress_bar_thread():
+            while True:
+                sequence = self._wakeup.sequence()
+                if renderer.poll_ready():
+                    break
+                self._wait_for_workers(sequence, ready_timeout)
+            renderer.open()
+            try:
+                while True:
+                    sequence = self._wakeup.sequence()
+                    if renderer.update():
+                        break
+                    self._wait_for_workers(sequence, renderer.interval)
+            finally:
+                renderer.close()
 
         t = threading.Thread(target=_progress_bar_thread)
         t.start()
         return t
 
+    def snapshot(self):
+        """The current progress, as a ProgressSnapshot"""
+        steps, total = int(self.get_cum_steps()), int(self.get_total_steps())
+        if self.total_mode == "unknown":
+            return ProgressSnapshot(steps, total, True, False, time.monotonic())  # Only closing the bar ends it
+        ready = bool(self.are_workers_ready())
+        done = ready and (steps >= total or (self.heartbeat_timeout is not None and self._live_workers_done()))
+        return ProgressSnapshot(steps, total, ready, done, time.monotonic())
+
+    async def watch(self, interval=0.5):
+        """
+        Asynchronous alternative to progress_bar_thread(): yields a ProgressSnapshot every `interval` seconds, until
+        the workers are done (the last snapshot has done=True) or the progress bar is closed. Reading the counters
+        does not block, so a single event loop can watch many progress bars:
+
+            async for snapshot in pbar.watch(1.):
+                print(snapshot.steps, "/", snapshot.total)
+
+        Growable progress bars are done as soon as all the workers that claimed a slot so far are done. The segments
+        are added by the grow thread of the progress bar, and the periodic checkpoints are written by the default
+        executor of the event loop, so that the loop never waits for a syscall creating a segment or for an fsync.
+        """
+        loop = asyncio.get_running_loop()
+        while not self.stop_event.is_set():
+            if self.read_only:
+                self._serve_grow_requests()  # Maps the segments added by the owner, if any
+            if self._checkpoint_due():
+                self._next_checkpoint_time = time.monotonic() + self.checkpoint_interval
+                # Read on the loop, so that close() cannot release the segments meanwhile
+                await loop.run_in_executor(None, self._write_periodic_checkpoint, self._read_checkpoint())
+            if self.track_workers:
+                self._rate_tracker.sample(self._gather(STEPS_FIELD))
+            snapshot = self.snapshot()
+            yield snapshot
+            if snapshot.done:
+                return
+            await asyncio.sleep(interval)
+
+    async def wait_done(self, interval=0.1):
+        """
+        Waits until the workers are done or the progress bar is closed.
+
+        :return: The last ProgressSnapshot, or None if the progress bar was closed first
+        """
+        async for snapshot in self.watch(interval):
+            if snapshot.done:
+                return snapshot
+        return None
+
     def __enter__(self):
-        self.progress_thread = self.progress_bar_thread()
+        if self.render_manager is not None:
+            self.render_manager.register(self)
+        else:
+            self.progress_thread = self.progress_bar_thread()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -143,21 +804,71 @@ class SharedMemoryProgressBar(AbstractProgressBar):
 
     def close(self):
         self.stop_event.set()
+        if hasattr(self, '_wakeup') and not self.read_only:
+            self._wakeup.notify()  # Wake up the progress thread right away. Views never write, see _wait_for_workers()
         if self.progress_thread and self.progress_thread.is_alive():
             self.progress_thread.join()
+        if getattr(self, '_grow_thread', None) is not None:
+            self._grow_thread.join()  # Before the segments are released
+            self._grow_thread = None
+        if getattr(self, 'render_manager', None) is not None:
+            self.render_manager.unregister(self)  # Draws the final progress, before the segments are released
+        for exporter in getattr(self, '_exporters', []):
+            exporter.stop()  # Before the segments are released
+        if getattr(self, 'checkpoint_path', None) is not None and hasattr(self, '_wakeup') and not self.read_only:
+            self.checkpoint()  # The final state, so that a rerun of a finished job skips all its work
         self.cleanup()
 
     def cleanup(self):
+        if hasattr(self, '_wakeup'):  # Not cleaned up yet
+            if not self.read_only:
+                self._atomic.store(FLAGS_IDX, self._atomic.load(FLAGS_IDX) | FLAG_CLOSED)  # Only the owner writes flags
+            del self._wakeup
+        if hasattr(self, '_atomic'):
+            self._atomic.release()
+        if hasattr(self, '_units_atomic'):
+            self._units_atomic.release()
+        if hasattr(self, '_units_shm'):
+            self._release_segment(self._units_shm)
+        for shm, _, _ in getattr(self, '_extra_segments', []):
+            self._release_segment(shm)
         if hasattr(self, 'shm'):
-            try:
-                self.shm.close()
-                self.shm.unlink()
-            except IOError:
-                pass  # The shared memory might already be unlinked
+            if self._pool is not None:
+                self._pool.release(self.shm, self._pool_key())  # Recycled instead of unlinked
+                del self.shm  # The segment belongs to the pool now, and a second cleanup() must not unlink it
+            else:
+                self._release_segment(self.shm)
+        if getattr(self, '_lock', None) is not None:
+            self._lock.close()
+            if self._pool is None:
+                remove_lock(self.shm_name)  # Pooled segments keep their lock file until the pool unlinks them
+            self._lock = None
+
+    def _release_segment(self, shm):
+        """Closes a segment, and unlinks it unless this is a read-only view"""
+        try:
+            shm.close()
+            if not self.read_only:
+                shm.unlink()
+        except IOError:
+            pass  # The shared memory might already be unlinked
+
+    def __del__(self):
+        # Bars that were never closed must not keep the buffer exported, or SharedMemory.__del__ would fail
+        if hasattr(self, '_atomic'):
+            self._atomic.release()
+        if hasattr(self, '_units_atomic'):
+            self._units_atomic.release()
 
     @staticmethod
-    def get_worker(worker_id, shm_name):
-        return SharedMemoryProgressBarWorker(worker_id, shm_name)
+    def get_worker(worker_id, shm_name, **kwargs):
+        """
+        Attaches a worker to an existing progress bar. If shm_name is a file path, the worker of the memory-mapped
+        file backend (MmapProgressBarWorker) is returned, and if it names a ThreadProgressBar of this process, a
+        ThreadProgressBarWorker. Worker processes can also use
+        progressBarDistributed.get_worker, which does not import numpy nor tqdm.
+        """
+        return get_worker(worker_id, shm_name, **kwargs)
 
 
 def _test():
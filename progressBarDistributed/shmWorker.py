@@ -0,0 +1,617 @@
+"""
+Worker side of the shared memory progress bar.
+
+This module only depends on the standard library, so that worker processes attach to a progress bar without
+importing numpy, tqdm or joblib.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+from progressBarDistributed.atomicOps import AtomicInt64Array, interprocess_lock
+from progressBarDistributed.base import AbstractProgressBarWorker
+from progressBarDistributed.shmLayout import ShmLayout, segment_name, FREE_SLOT, SLOT_OFFSET_IDX, N_SEGMENTS_IDX, \
+    GROW_REQUESTS_IDX, FLAGS_IDX, FLAG_AGGREGATES, FLAG_HEARTBEATS, FLAG_CLOSED, FLAG_UNITS, FLAG_POOLED, \
+    FLAG_GROWABLE, GENERATION_IDX, HEARTBEAT_INTERVAL_MS_IDX, AGG_STEPS_IDX, AGG_TOTAL_IDX, AGG_N_UNSET_IDX, \
+    AGG_N_UNREADY_IDX, AGG_N_CLAIMED_UNSET_IDX, WAKEUP_IDX, WRITERS_IDX
+from progressBarDistributed.unitBitmap import UnitBitmap, units_segment_name
+from progressBarDistributed.wakeup import SharedWakeup
+
+PHASE_PUBLISH_INTERVAL_NS = 500_000_000  # The time of the running phase is published at least this often by update()
+
+
+class SharedMemoryProgressBarWorker(AbstractProgressBarWorker):
+    _segment_class = shared_memory.SharedMemory  # Backend storing the counters
+
+    def __init__(self, worker_id, shm_name, flush_every=None, flush_interval_ms=None, claim_timeout=30):
+        """
+
+        :param worker_id: The slot of this worker in the shared memory block. If None, a free slot is claimed
+                          atomically and released on close(), so tasks do not need to know their id in advance.
+        :param shm_name: The name of the shared memory block created by SharedMemoryProgressBar
+        :param flush_every: If set, updates are accumulated locally and published to shared memory only every
+                            `flush_every` calls to update()
+        :param flush_interval_ms: If set, updates are accumulated locally and published to shared memory at most
+                                  every `flush_interval_ms` milliseconds. Can be combined with flush_every.
+        :param claim_timeout: When claiming a slot (worker_id=None) and all the slots are taken, the number of seconds
+                              to wait for slots to be released or for a growable progress bar to add more slots.
+
+        Unbuffered updates are atomic, so several threads (or processes) can share the same worker slot. Without
+        native atomics (see atomicOps.HAS_NATIVE_ATOMICS), they are serialized by a lock file shared by the processes.
+        In buffered mode, the local accumulator is not shared across threads: use one worker object per thread.
+        """
+        self.shm_name = shm_name
+        self.shm = _attach_untracked(self._segment_class, self.shm_name)
+        self._lock = self._open_lock()
+        self._atomic = AtomicInt64Array(self.shm.buf, self._lock)
+        self.layout = ShmLayout.from_header(self._atomic.load)
+        # Pooled segments are recycled for other progress bars: writes stop once the generation changes, see _is_stale()
+        self._generation = self._atomic.load(GENERATION_IDX)
+        flags = self._atomic.load(FLAGS_IDX)
+        self._pooled = bool(flags & FLAG_POOLED)
+        self._stale = self._pooled and bool(flags & FLAG_CLOSED)  # Idle in the pool
+        self._aggregates = bool(flags & FLAG_AGGREGATES)
+        self._heartbeats = bool(flags & FLAG_HEARTBEATS)
+        self._has_units = bool(flags & FLAG_UNITS)
+        self._units = None  # (segment, atomic, UnitBitmap) of the work units, attached on first use
+        self._wakeup = SharedWakeup(self._atomic, WAKEUP_IDX)
+
+        # The slot may live in a segment of the chain other than the first one (growable progress bars)
+        self._claimed = worker_id is None
+        self._owns_slot = self._claimed
+        if self._claimed:
+            try:
+                self._slot_shm, self._slot_atomic, self._slot_layout, local_id = self._claim_slot(claim_timeout)
+            except RuntimeError:
+                self._atomic.release()
+                self.shm.close()
+                if self._lock is not None:
+                    self._lock.close()
+                raise
+            worker_id = self._slot_atomic.load(SLOT_OFFSET_IDX) + local_id
+        else:
+            self._slot_shm, self._slot_atomic, self._slot_layout, local_id = self.shm, self._atomic, self.layout, \
+                                                                             worker_id
+        self.worker_id = worker_id
+        self._step_idx = self._slot_layout.step_index(local_id)
+        self._add_step = self._slot_atomic.adder(self._step_idx)
+        self._total_idx = self._slot_layout.total_index(local_id)
+        self._owner_idx = self._slot_layout.owner_index(local_id)
+        self._shed_idx = self._slot_layout.shed_index(local_id)
+        self._reported_total = 0
+        self._notify_at = float("inf")  # Value of the slot step counter at which the progress thread is woken up
+        if self._claimed and self._aggregates and self._begin_write():
+            try:
+                if self._slot_atomic.load(self._total_idx) < 0:
+                    self._atomic.fetch_add(AGG_N_CLAIMED_UNSET_IDX, 1)
+            finally:
+                self._end_write()
+        self._progress = None
+
+        self.flush_every = flush_every
+        self.flush_interval = None if flush_interval_ms is None else flush_interval_ms / 1000.
+        self._buffered = flush_every is not None or flush_interval_ms is not None
+        self._pending_steps = 0
+        self._pending_calls = 0
+        self._pending_counts = {}  # Word index of a named counter -> amount not published yet
+        self._next_flush_time = None if self.flush_interval is None else time.monotonic() + self.flush_interval
+
+        # Named phases declared by the progress bar, see phase()
+        self.phase_names = self.layout.read_phase_names(self._atomic.load)
+        self._phase_ids = {name: phase_id for phase_id, name in enumerate(self.phase_names)}
+        self._local_id = local_id
+        self._phase = None
+        self._phase_start = None
+        self._phase_step_idx = None
+        self._next_phase_publish = None  # perf_counter_ns() at which update() publishes the time of the running phase
+        self._phase_lock = threading.RLock()  # The heartbeat thread also publishes the time of the running phase
+        self._closed = False
+
+        # Named counters declared by the progress bar, see increment()
+        self.counter_names = self.layout.read_counter_names(self._atomic.load)
+        self._counter_idx = {name: self._slot_layout.counter_index(local_id, counter_id)
+                             for counter_id, name in enumerate(self.counter_names)}
+
+        # Heartbeats, when the progress bar watches for dead workers: written on every publication to the slot, and
+        # every heartbeat interval by a daemon thread, so that workers in long steps are not taken for dead ones
+        self._heartbeat_idx = self._slot_layout.heartbeat_index(local_id)
+        self._heartbeat_thread = None
+        if self._heartbeats:
+            self._beat()
+            self._heartbeat_stop = threading.Event()
+            interval = self._atomic.load(HEARTBEAT_INTERVAL_MS_IDX) / 1000.
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, args=(interval,), daemon=True)
+            self._heartbeat_thread.start()
+        self._bind_update()
+
+    @property
+    def progress(self):
+        """The int64 words of the segment holding the slot of this worker, as a memoryview"""
+        if self._progress is None:
+            self._progress = self._slot_shm.buf.cast('q')
+        return self._progress
+
+    @property
+    def n_workers(self):
+        return self.layout.n_workers  # Read from the header of the shared memory block
+
+    @property
+    def progress_bar_closed(self):
+        """Whether the progress bar this worker is attached to was closed, or its segment recycled for another one"""
+        return bool(self._atomic.load(FLAGS_IDX) & FLAG_CLOSED) or self._is_stale()
+
+    def _is_stale(self):
+        """
+        Whether a SegmentPool recycled the segment for another progress bar since this worker attached. The writes of
+        stale workers are dropped, so that they never corrupt the counters of the next progress bar.
+        """
+        if self._pooled and not self._stale:
+            self._stale = self._atomic.load(GENERATION_IDX) != self._generation
+        return self._stale
+
+    def _begin_write(self):
+        """
+        Starts a write to the segment, unless it was recycled for another progress bar: the write must then be dropped.
+        Checking the generation alone leaves a window between the check and the write, so the writes to pooled segments
+        are counted in the header (WRITERS_IDX) before the check: SegmentPool.release() increments the generation, then
+        waits for the counted writes to end before the segment can be reused. Each call returning True is followed by
+        _end_write().
+        """
+        if not self._pooled:
+            return True
+        if self._stale:
+            return False
+        self._atomic.fetch_add(WRITERS_IDX, 1)
+        if self._is_stale():
+            self._atomic.fetch_add(WRITERS_IDX, -1)
+            return False
+        return True
+
+    def _end_write(self):
+        if self._pooled:
+            self._atomic.fetch_add(WRITERS_IDX, -1)
+
+    def _open_lock(self):
+        """
+        The lock of the atomic operations on the segments when native atomics are not available: a lock file shared
+        with the other processes (see atomicOps.InterProcessLock). None with native atomics
+        """
+        return interprocess_lock(self.shm_name)
+
+    def _attach_segment(self, segment_index):
+        if segment_index == 0:
+            return self.shm, self._atomic, self.layout
+        shm = _attach_untracked(self._segment_class, segment_name(self.shm_name, segment_index))
+        atomic = AtomicInt64Array(shm.buf, self._lock)
+        return shm, atomic, ShmLayout.from_header(atomic.load)
+
+    def _claim_slot(self, timeout):
+        """Scans the chain of segments for a free slot and claims it. Asks the progress bar to grow if none is free"""
+        token = os.getpid()
+        deadline = time.monotonic() + timeout
+        requested_at_n_segments = None
+        while True:
+            if not self._begin_write():
+                return self.shm, self._atomic, self.layout, 0  # Recycled: the writes of this worker are dropped
+            try:
+                n_segments = self._atomic.load(N_SEGMENTS_IDX)
+                for segment_index in range(n_segments):
+                    shm, atomic, layout = self._attach_segment(segment_index)
+                    for local_id in range(layout.n_workers):
+                        owner_idx = layout.owner_index(local_id)
+                        if atomic.load(owner_idx) == FREE_SLOT and \
+                                atomic.compare_exchange(owner_idx, FREE_SLOT, token)[0]:
+                            return shm, atomic, layout, local_id
+                    if segment_index > 0:
+                        atomic.release()
+                        shm.close()
+            finally:
+                self._end_write()
+            if requested_at_n_segments != n_segments:
+                self._atomic.fetch_add(GROW_REQUESTS_IDX, 1)
+                self._wakeup.notify()
+                requested_at_n_segments = n_segments
+            if time.monotonic() > deadline:
+                if self._atomic.load(FLAGS_IDX) & FLAG_GROWABLE:
+                    raise RuntimeError("No free worker slot in %s after %s seconds: the growable progress bar did "
+                                       "not add slots. Was it closed, or is its owner blocked?"
+                                       % (self.shm_name, timeout))
+                raise RuntimeError("No free worker slot in %s after %s seconds. Create the SharedMemoryProgressBar "
+                                   "with growable=True to add slots on demand" % (self.shm_name, timeout))
+            time.sleep(0.01)
+
+
+    def _bind_update(self):
+        """
+        Binds update() to _update_fast() while this worker needs nothing but the addition to its slot and the check of
+        its completion: no buffering, pooled segment, aggregates, heartbeats or running phase. Called when they change
+        """
+        if self._buffered or self._pooled or self._aggregates or self._heartbeats or self._phase_step_idx is not None \
+                or self._closed:
+            self.__dict__.pop("update", None)
+        else:
+            self.update = self._update_fast
+
+    def _update_fast(self, n=1):
+        old = self._add_step(n)
+        if old + n >= self._notify_at > old:
+            self._wakeup.notify()  # This worker is done
+
+    def update(self, n=1):
+        if not self._buffered:
+            if self._pooled and not self._begin_write():
+                return
+            try:
+                old = self._slot_atomic.fetch_add(self._step_idx, n)
+                if self._aggregates:
+                    self._atomic.fetch_add(AGG_STEPS_IDX, n)
+                if self._phase_step_idx is not None:
+                    self._slot_atomic.fetch_add(self._phase_step_idx, n)
+                    if time.perf_counter_ns() >= self._next_phase_publish:
+                        self._publish_phase_time()  # So that a long phase is not reported only once it ends
+                if self._heartbeats:
+                    self._beat()
+            finally:
+                self._end_write()
+            if old + n >= self._notify_at > old:
+                self._wakeup.notify()  # This worker is done
+            return
+        self._pending_steps += n
+        self._pending_calls += 1
+        if self.flush_every is not None and self._pending_calls >= self.flush_every:
+            self.flush()
+        elif self._next_flush_time is not None and time.monotonic() >= self._next_flush_time:
+            self.flush()
+
+    def increment(self, name, n=1):
+        """
+        Adds n to the counter `name` of this worker, which must be one of the counters declared by the progress bar
+        (see counter_names), e.g. worker.increment("bytes", len(data)). Like update(), it is a single atomic addition,
+        and buffered workers publish it at their next flush.
+        """
+        try:
+            index = self._counter_idx[name]
+        except KeyError:
+            raise ValueError("Unknown counter %r. The counters declared by the progress bar are %s"
+                             % (name, list(self.counter_names))) from None
+        if self._buffered:
+            self._pending_counts[index] = self._pending_counts.get(index, 0) + n
+        elif self._begin_write():
+            try:
+                self._slot_atomic.fetch_add(index, n)
+            finally:
+                self._end_write()
+
+    def flush(self):
+        """Publish the locally accumulated steps and counters (buffered mode) to the shared memory block."""
+        if self._pending_counts:
+            if self._begin_write():
+                try:
+                    for index, n in self._pending_counts.items():
+                        self._slot_atomic.fetch_add(index, n)
+                finally:
+                    self._end_write()
+            self._pending_counts.clear()
+        if self._pending_steps and self._begin_write():
+            try:
+                old = self._slot_atomic.fetch_add(self._step_idx, self._pending_steps)
+                if self._aggregates:
+                    self._atomic.fetch_add(AGG_STEPS_IDX, self._pending_steps)
+                if self._phase_step_idx is not None:
+                    self._slot_atomic.fetch_add(self._phase_step_idx, self._pending_steps)
+                    self._publish_phase_time()
+                if self._heartbeats:
+                    self._beat()
+            finally:
+                self._end_write()
+            if old + self._pending_steps >= self._notify_at > old:
+                self._wakeup.notify()
+        self._pending_steps = 0
+        self._pending_calls = 0
+        if self.flush_interval is not None:
+            self._next_flush_time = time.monotonic() + self.flush_interval
+
+    def set_total_steps(self, n):
+        if not self._begin_write():
+            return
+        try:
+            if not self._claimed:
+                old = self._slot_atomic.exchange(self._total_idx, n)
+                new = n
+            else:
+                # Claimed slots are reused by successive workers, so each one only adds its contribution to the total
+                old, new = self._add_to_total(n - self._reported_total)
+                self._reported_total = n
+            self._total_changed(old, new)
+        finally:
+            self._end_write()
+
+    def add_total_steps(self, n):
+        """
+        Adds n steps to the total of this worker. Can be called at any time, e.g. by workers that discover their work
+        as they go. The total of a worker that never set it starts from 0.
+        """
+        if not self._begin_write():
+            return
+        try:
+            old, new = self._add_to_total(n)
+            self._reported_total += n
+            self._total_changed(old, new)
+        finally:
+            self._end_write()
+
+    def _total_changed(self, old, new):
+        if self._aggregates:
+            _update_total_aggregates(self._atomic, old, new, self._claimed)
+        self._notify_at = new if new > 0 else float("inf")
+        if self._heartbeats:
+            self._beat()
+        self._wakeup.notify()  # The workers may be ready now
+
+    def shed_request(self):
+        """
+        The number of steps that the progress bar asks this worker to hand over to its peers, because it is expected
+        to finish far behind them (see SharedMemoryProgressBar.rebalance()). 0 if none. A single load from the slot,
+        cheap enough to poll between two work units:
+
+            n = worker.shed_request()
+            if n:
+                handed = [my_units.pop() for _ in range(min(n, len(my_units)))]
+                queue.extend(handed)  # For idle peers to pick up
+                worker.shed(len(handed))
+        """
+        if self._pooled and self._is_stale():
+            return 0
+        return self._slot_atomic.load(self._shed_idx)
+
+    def shed(self, n):
+        """
+        Reports that n steps of the work of this worker were handed over to its peers: they are removed from its total,
+        and the request of the progress bar is cleared. The peers add the steps they take over to their own totals
+        with add_total_steps(n).
+        """
+        if not self._begin_write():
+            return
+        try:
+            self._slot_atomic.store(self._shed_idx, 0)
+            if n:
+                old, new = self._add_to_total(-n)
+                self._reported_total -= n
+                self._total_changed(old, new)
+        finally:
+            self._end_write()
+
+    def _add_to_total(self, delta):
+        while True:
+            old = self._slot_atomic.load(self._total_idx)
+            new = max(old, 0) + delta  # A negative total means that it was not set yet
+            if self._slot_atomic.compare_exchange(self._total_idx, old, new)[0]:
+                return old, new
+
+    def _beat(self):
+        if self._pooled and not self._begin_write():
+            return
+        try:
+            self._slot_atomic.store(self._heartbeat_idx, time.monotonic_ns())
+        finally:
+            self._end_write()
+
+    def _heartbeat_loop(self, interval):
+        while not self._heartbeat_stop.wait(interval):
+            self._beat()
+            self._publish_phase_time()  # Of the running phase, even if the worker does no step in it
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Attributes the steps done and the wall time spent in the block to the phase `name`, which must be one of the
+        phases declared by the progress bar (see phase_names). Phases can be nested: the time spent in the inner
+        phase is not counted in the outer one. The time is published when the block exits, at each flush(), at least
+        every PHASE_PUBLISH_INTERVAL_NS by update(), and at each heartbeat when the progress bar watches for dead
+        workers, so that the phase_stats() of the progress bar include the phase that is still running.
+
+            with pbar.phase("load"):
+                data = load()
+        """
+        try:
+            phase_id = self._phase_ids[name]
+        except KeyError:
+            raise ValueError("Unknown phase %r. The phases declared by the progress bar are %s"
+                             % (name, list(self.phase_names))) from None
+        outer = self._phase
+        self._switch_phase(phase_id)
+        try:
+            yield self
+        finally:
+            self._switch_phase(outer)
+
+    def _switch_phase(self, phase_id):
+        """Publishes the steps and the time of the current phase, then enters `phase_id` (None for no phase)"""
+        if self._closed:
+            return
+        if self._pending_steps:
+            self.flush()  # Buffered steps belong to the phase that is ending
+        with self._phase_lock:
+            now = self._publish_phase_time()
+            self._phase = phase_id
+            self._phase_start = now
+            self._next_phase_publish = now + PHASE_PUBLISH_INTERVAL_NS
+            if phase_id is None:
+                self._phase_step_idx = None
+            else:
+                self._phase_step_idx = self._slot_layout.phase_steps_index(self._local_id, phase_id)
+        self._bind_update()
+
+    def _publish_phase_time(self):
+        """Adds the time spent in the running phase since its last publication to its counter. Returns the time"""
+        with self._phase_lock:
+            now = time.perf_counter_ns()
+            if self._phase is not None and self._begin_write():
+                try:
+                    self._slot_atomic.fetch_add(self._slot_layout.phase_time_index(self._local_id, self._phase),
+                                                now - self._phase_start)
+                finally:
+                    self._end_write()
+                self._phase_start = now
+                self._next_phase_publish = now + PHASE_PUBLISH_INTERVAL_NS
+            return now
+
+    def get_total_steps(self):
+        return self._slot_atomic.load(self._total_idx)
+
+    def _unit_bitmap(self):
+        if self._units is None:
+            if not self._has_units:
+                raise RuntimeError("The progress bar %s does not track work units. Create it with n_units"
+                                   % self.shm_name)
+            shm = _attach_untracked(self._segment_class, units_segment_name(self.shm_name))
+            atomic = AtomicInt64Array(shm.buf, self._lock)
+            self._units = shm, atomic, UnitBitmap(atomic)
+        return self._units[2]
+
+    def mark_done(self, unit):
+        """
+        Marks the work unit `unit` (in [0, n_units) of the progress bar) as done, so that a job resumed from a
+        checkpoint skips it. Call it after update() for the steps of the unit: pending buffered steps are published
+        first, so that a checkpoint never holds a done unit without its steps.
+
+        :return: False if the unit was already marked as done, or if the segment was recycled for another progress bar
+        """
+        if self._pending_steps:
+            self.flush()
+        if not self._begin_write():
+            return False
+        try:
+            return self._unit_bitmap().mark(unit)
+        finally:
+            self._end_write()
+
+    def is_unit_done(self, unit):
+        """Whether the work unit `unit` was marked as done, in this run or in the run the progress bar resumed"""
+        return self._unit_bitmap().is_set(unit)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self._closed:
+            return
+        self._switch_phase(None)
+        if self._pending_steps or self._pending_counts:
+            self.flush()
+        self._closed = True
+        self._bind_update()  # The slot is released below: later updates raise instead of writing to unmapped memory
+        if self._heartbeat_thread is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        if self._owns_slot and self._begin_write():
+            try:
+                if self._aggregates and self._slot_atomic.load(self._total_idx) < 0:
+                    self._atomic.fetch_add(AGG_N_CLAIMED_UNSET_IDX, -1)
+                self._slot_atomic.store(self._owner_idx, FREE_SLOT)
+            finally:
+                self._end_write()
+            self._owns_slot = False
+            self._wakeup.notify()
+        if self._progress is not None:
+            self._progress.release()
+            self._progress = None
+        if self._units is not None:
+            units_shm, units_atomic, _ = self._units
+            units_atomic.release()
+            try:
+                units_shm.close()
+            except IOError:
+                pass
+            self._units = None
+        if self._slot_shm is not self.shm:
+            self._slot_atomic.release()
+            try:
+                self._slot_shm.close()
+            except IOError:
+                pass
+        self._atomic.release()
+        try:
+            self.shm.close()
+        except IOError:
+            pass
+        if self._lock is not None:
+            self._lock.close()
+
+def _update_total_aggregates(atomic, old, new, claimed=False):
+    """Updates the aggregates in the header of the first segment when the total of a slot changes from old to new"""
+    total_delta = max(new, 0) - max(old, 0)
+    if total_delta:
+        atomic.fetch_add(AGG_TOTAL_IDX, total_delta)
+    unset_delta = (new < 0) - (old < 0)
+    if unset_delta:
+        atomic.fetch_add(AGG_N_UNSET_IDX, unset_delta)
+        if claimed:
+            atomic.fetch_add(AGG_N_CLAIMED_UNSET_IDX, unset_delta)
+    unready_delta = (new <= 0) - (old <= 0)
+    if unready_delta:
+        atomic.fetch_add(AGG_N_UNREADY_IDX, unready_delta)
+
+
+_untracked = threading.local()  # Set while a thread attaches to a segment, see _attach_untracked()
+_tracker_patched = False
+_tracker_lock = threading.Lock()
+
+
+def _attach_untracked(segment_class, name):
+    """
+    Attaches to the existing segment `name`. Shared memory blocks are not registered with
+    multiprocessing.resource_tracker, which would unlink them when this process exits, under the feet of the owner of
+    the progress bar (see https://bugs.python.org/issue38119). The blocks created by this process are still tracked,
+    and unregistered when they are unlinked.
+    """
+    if segment_class is not shared_memory.SharedMemory:
+        return segment_class(name=name)
+    if sys.version_info >= (3, 13):
+        return segment_class(name=name, track=False)
+    _patch_resource_tracker()
+    _untracked.active = True
+    try:
+        return segment_class(name=name)
+    finally:
+        _untracked.active = False
+
+
+def _patch_resource_tracker():
+    """Makes resource_tracker.register() skip the blocks attached by _attach_untracked(). Installed once"""
+    global _tracker_patched
+    with _tracker_lock:
+        if _tracker_patched:
+            return
+        register = resource_tracker.register
+
+        def register_tracked(name, rtype):
+            if rtype == "shared_memory" and getattr(_untracked, "active", False):
+                return None
+            return register(name, rtype)
+
+        resource_tracker.register = register_tracked
+        _tracker_patched = True
+
+
+def get_worker(worker_id, shm_name, **kwargs):
+    """
+    Attaches a worker to an existing progress bar. If shm_name is a file path, the worker of the memory-mapped file
+    backend (MmapProgressBarWorker) is returned, and if it names an in-process progress bar of this process, the worker
+    of the in-process backend (ThreadProgressBarWorker).
+    """
+    from progressBarDistributed.mmapWorker import MmapProgressBarWorker, is_path_like
+    from progressBarDistributed.threadWorker import ThreadProgressBarWorker, is_local_name
+    if is_path_like(shm_name):
+        return MmapProgressBarWorker(worker_id, shm_name, **kwargs)
+    if is_local_name(shm_name):
+        return ThreadProgressBarWorker(worker_id, shm_name, **kwargs)
+    return SharedMemoryProgressBarWorker(worker_id, shm_name, **kwargs)
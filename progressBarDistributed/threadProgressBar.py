@@ -0,0 +1,59 @@
+"""
+Progress bar backend for workers that are threads of the process of the progress bar.
+
+The counters live in an anonymous mapping of the process instead of a POSIX shared memory block (see threadWorker.py),
+with the same layout as SharedMemoryProgressBar: every thread updates its own slot with atomic operations, and the
+aggregates in the header are maintained with atomic additions, without any lock. The progress thread, the
+RenderManager, watch(), the statistics and the metrics export are those of SharedMemoryProgressBar. Only threads of
+this process can attach workers to it.
+"""
+import os
+
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar
+from progressBarDistributed.threadWorker import LocalSegment, ThreadProgressBarWorker, thread_worker, \
+    close_thread_workers
+
+
+class ThreadProgressBar(SharedMemoryProgressBar):
+    _segment_class = LocalSegment
+
+    def __init__(self, n_workers=None, growable=True, aggregates=True, **kwargs):
+        """
+
+        :param n_workers: The number of worker slots, one per thread. By default, the number of CPUs plus one for the
+                          thread reporting the total
+        :param growable: Whether slots are added when more threads than slots claim one (see worker())
+        :param aggregates: Whether the sums of the steps and totals are maintained in the header, so that reading the
+                           progress costs O(1)
+        :param kwargs: The other options of SharedMemoryProgressBar (phases, counters, render_manager...)
+        """
+        super().__init__(n_workers or (os.cpu_count() or 1) + 1, growable=growable, aggregates=aggregates, **kwargs)
+
+    def worker(self):
+        """
+        The worker of the calling thread, which claims a slot on first use and keeps it until the progress bar is
+        closed. It starts with a total of 0, see threadWorker.thread_worker():
+
+            def task(item):
+                process(item)
+                pbar.worker().update(1)
+
+            with ThreadProgressBar() as pbar:
+                pbar.worker().set_total_steps(len(items))
+                with ThreadPoolExecutor(8) as executor:
+                    list(executor.map(task, items))
+        """
+        return thread_worker(self.shm_name)
+
+    def _open_lock(self):
+        return None  # Only threads of this process share the segment: the lock of the process is enough
+
+    def close(self):
+        if not self.read_only:
+            close_thread_workers(self.shm_name)  # So that the threads stop using the workers of a closed bar
+        super().close()
+
+    @staticmethod
+    def get_worker(worker_id, shm_name, **kwargs):
+        """Attaches a worker with a fixed slot, or claims one if worker_id is None (see also worker())"""
+        return ThreadProgressBarWorker(worker_id, shm_name, **kwargs)
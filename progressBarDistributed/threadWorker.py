@@ -0,0 +1,112 @@
+"""
+Worker side of the in-process backend, for workers that are threads of the process of the progress bar (thread pools,
+I/O-bound stages, free-threaded Python). The counters live in an anonymous mapping of the process, registered under the
+name of the progress bar, so attaching a worker costs no shm_open nor mmap, and nothing is seen by the resource
+tracker. Updates are the same atomic operations as with shared memory. Like shmWorker, it only depends on the
+standard library.
+"""
+import mmap
+import threading
+import uuid
+
+from progressBarDistributed.shmWorker import SharedMemoryProgressBarWorker
+
+_segments = {}  # name -> anonymous mapping holding the counters of an in-process progress bar
+_segments_lock = threading.Lock()
+
+
+def is_local_name(name):
+    """Whether `name` designates an in-process progress bar (see ThreadProgressBar) of this process"""
+    return isinstance(name, str) and name in _segments
+
+
+class LocalSegment:
+    """Anonymous memory of this process with the interface of multiprocessing.shared_memory.SharedMemory"""
+
+    def __init__(self, name=None, create=False, size=0):
+        """
+
+        :param name: The name of the segment. If None, a new name is generated
+        :param create: Whether to create the segment. Otherwise, the segment created under `name` is attached: all the
+                       attachments share the mapping of the creator, which is unmapped once none of them uses it
+        :param size: The size in bytes of the segment when it is created
+        """
+        if create:
+            name = name or "pbd_thread_%s" % uuid.uuid4().hex[:16]
+            memory = mmap.mmap(-1, size)
+            with _segments_lock:
+                if name in _segments:
+                    raise FileExistsError("An in-process progress bar named %r already exists" % name)
+                _segments[name] = memory
+        else:
+            with _segments_lock:
+                memory = _segments.get(name)
+            if memory is None:
+                raise FileNotFoundError("No in-process progress bar named %r" % name)
+        self._name = name
+        self._size = len(memory)
+        self._memory = memory
+        self._buf = memoryview(memory)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def buf(self):
+        return self._buf
+
+    def close(self):
+        if self._buf is not None:
+            self._buf.release()
+            self._buf = None
+        self._memory = None
+
+    def unlink(self):
+        with _segments_lock:
+            _segments.pop(self._name, None)
+
+
+class ThreadProgressBarWorker(SharedMemoryProgressBarWorker):
+    _segment_class = LocalSegment
+
+    def _open_lock(self):
+        return None  # Only threads of this process share the segment: the lock of the process is enough
+
+
+_local = threading.local()
+_thread_workers = {}  # name -> the workers attached by thread_worker(), closed with their progress bar
+_thread_workers_lock = threading.Lock()
+
+
+def thread_worker(shm_name):
+    """
+    The worker of the calling thread for the in-process progress bar `shm_name`. It claims a free slot on first use
+    (so the progress bar must have a slot per thread, or be growable) and starts with a total of 0: the total is
+    usually reported by the thread that creates the tasks, and threads discovering their own work add to it with
+    add_total_steps(). It is unbuffered, and closed with the progress bar.
+    """
+    workers = getattr(_local, "workers", None)
+    if workers is None:
+        workers = _local.workers = {}
+    worker = workers.get(shm_name)
+    if worker is None or worker._closed:
+        for name in [name for name, cached in workers.items() if cached._closed]:
+            del workers[name]  # Progress bars closed since the last call of this thread
+        worker = workers[shm_name] = ThreadProgressBarWorker(None, shm_name)
+        worker.set_total_steps(0)
+        with _thread_workers_lock:
+            _thread_workers.setdefault(shm_name, []).append(worker)
+    return worker
+
+
+def close_thread_workers(shm_name):
+    """Closes the workers attached to `shm_name` by thread_worker(), from any thread"""
+    with _thread_workers_lock:
+        workers = _thread_workers.pop(shm_name, [])
+    for worker in workers:
+        worker.close()
@@ -0,0 +1,95 @@
+"""
+Bitmap of the work units that are done, shared by a progress bar and its workers.
+
+Work units are numbered from 0 to n_units - 1 by the application (e.g. the index of a file or of a chunk of input).
+The bitmap lives in its own segment, named after the first segment of the chain (see units_segment_name()):
+    word 0: number of units
+    word 1: number of units marked as done
+    words UNITS_HEADER_WORDS...: one bit per unit, 64 units per word
+Like shmWorker, this module only depends on the standard library.
+"""
+N_UNITS_IDX = 0
+N_DONE_IDX = 1
+UNITS_HEADER_WORDS = 8  # One cache line
+BITS_PER_WORD = 64
+
+
+def units_segment_name(base_name):
+    """The name of the segment holding the bitmap of the work units of the progress bar `base_name`"""
+    return "%s_units" % base_name
+
+
+def _bit_mask(bit):
+    """The int64 word with only `bit` set (bit 63 is the sign bit)"""
+    return -(1 << 63) if bit == BITS_PER_WORD - 1 else 1 << bit
+
+
+class UnitBitmap:
+    """Atomic view of the bitmap of the work units, on an AtomicInt64Array of the units segment"""
+
+    def __init__(self, atomic):
+        self._atomic = atomic
+        self.n_units = atomic.load(N_UNITS_IDX)
+
+    @staticmethod
+    def n_words(n_units):
+        return UNITS_HEADER_WORDS + -(-n_units // BITS_PER_WORD)
+
+    @classmethod
+    def n_bytes(cls, n_units):
+        return 8 * cls.n_words(n_units)
+
+    def _locate(self, unit):
+        if not 0 <= unit < self.n_units:
+            raise IndexError("Work unit %d out of range [0, %d)" % (unit, self.n_units))
+        return UNITS_HEADER_WORDS + unit // BITS_PER_WORD, _bit_mask(unit % BITS_PER_WORD)
+
+    def mark(self, unit):
+        """Marks `unit` as done. Returns False if it was already marked"""
+        index, mask = self._locate(unit)
+        if self._atomic.fetch_or(index, mask) & mask:
+            return False
+        self._atomic.fetch_add(N_DONE_IDX, 1)
+        return True
+
+    def is_set(self, unit):
+        index, mask = self._locate(unit)
+        return bool(self._atomic.load(index) & mask)
+
+    @property
+    def n_done(self):
+        return self._atomic.load(N_DONE_IDX)
+
+    def to_bytes(self):
+        """The bitmap, unit u being bit u % 8 of byte u // 8"""
+        return b"".join(self._atomic.load(index).to_bytes(8, "little", signed=True)
+                        for index in range(UNITS_HEADER_WORDS, self.n_words(self.n_units)))
+
+    def load_bytes(self, data):
+        """Marks the units set in `data` (see to_bytes()) as done. Units already marked are kept"""
+        data = bytes(data).ljust(self.n_bytes(self.n_units) - 8 * UNITS_HEADER_WORDS, b"\0")
+        for k, index in enumerate(range(UNITS_HEADER_WORDS, self.n_words(self.n_units))):
+            word = int.from_bytes(data[8 * k:8 * k + 8], "little", signed=True)
+            if word:
+                old = self._atomic.fetch_or(index, word)
+                self._atomic.fetch_add(N_DONE_IDX, _popcount(word & ~old))
+
+
+def _popcount(word):
+    return bin(word & (2 ** 64 - 1)).count("1")
+
+
+def is_bit_set(data, unit):
+    """Whether `unit` is set in a bitmap returned by UnitBitmap.to_bytes()"""
+    byte = unit >> 3
+    return byte < len(data) and bool(data[byte] >> (unit & 7) & 1)
+
+
+def iter_set_bits(data):
+    """The units set in a bitmap returned by UnitBitmap.to_bytes(), in increasing order"""
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield 8 * byte_index + low.bit_length() - 1
+            byte ^= low
+
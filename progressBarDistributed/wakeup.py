@@ -0,0 +1,85 @@
+"""
+Cross-process wait/notify on a sequence counter stored in a shared buffer.
+
+Notifiers increment the counter and wake up the waiters. Waiters read the counter, check their condition, and then
+wait until the counter changes (or a timeout expires), so no notification can be missed in between.
+On Linux, waiting uses the futex syscall on the shared memory word, so a sleeping monitor thread costs nothing and
+reacts immediately. Elsewhere, waiting falls back to a timed wait on a threading.Event (or a sleep).
+"""
+import ctypes
+import ctypes.util
+import platform
+import sys
+import time
+
+_FUTEX_WAIT = 0
+_FUTEX_WAKE = 1
+_INT_MAX = 2 ** 31 - 1
+_SYS_FUTEX = {"x86_64": 202, "amd64": 202, "aarch64": 98, "arm64": 98, "riscv64": 98,
+              "i386": 240, "i686": 240, "ppc64le": 221, "ppc64": 221, "s390x": 238}
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def _load_futex():
+    if not sys.platform.startswith("linux"):
+        return None
+    syscall_number = _SYS_FUTEX.get(platform.machine().lower())
+    if syscall_number is None:
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        syscall = libc.syscall
+    except (OSError, AttributeError):
+        return None
+    syscall.restype = ctypes.c_long
+
+    def futex(address, op, value, timeout=None):
+        return syscall(ctypes.c_long(syscall_number), ctypes.c_void_p(address), ctypes.c_int(op),
+                       ctypes.c_int(value), timeout, None, ctypes.c_int(0))
+    return futex
+
+
+_FUTEX = _load_futex()
+
+
+class SharedWakeup:
+    """Wait/notify on the int64 word at `index` of an AtomicInt64Array"""
+
+    def __init__(self, atomic, index):
+        self.atomic = atomic
+        self.index = index
+        self.native = _FUTEX is not None and atomic.native
+        if self.native:
+            # The futex is the 32-bit half of the word holding its least significant bits
+            self._address = atomic.address(index) + (4 if sys.byteorder == "big" else 0)
+
+    def sequence(self):
+        return self.atomic.load(self.index) & 0xFFFFFFFF
+
+    def notify(self):
+        self.atomic.fetch_add(self.index, 1)
+        if self.native:
+            _FUTEX(self._address, _FUTEX_WAKE, _INT_MAX)
+
+    def wait(self, sequence, timeout, event=None):
+        """
+        Waits until the counter differs from `sequence` or `timeout` seconds have passed. Spurious wakeups can happen.
+
+        :param event: A threading.Event that also interrupts the wait when it is set. Only needed when the futex is
+                      not available, since whoever sets it is expected to call notify() too.
+        """
+        if self.native:
+            if self.sequence() != sequence:
+                return
+            seconds = int(timeout)
+            timespec = _Timespec(seconds, int((timeout - seconds) * 1e9))
+            if sequence >= 2 ** 31:
+                sequence -= 2 ** 32  # The futex compares signed 32-bit values
+            _FUTEX(self._address, _FUTEX_WAIT, sequence, ctypes.byref(timespec))
+        elif event is not None:
+            event.wait(timeout)
+        else:
+            time.sleep(timeout)
@@ -0,0 +1,194 @@
+"""
+Per-worker throughput estimation and liveness from periodic samples of the counters of the slots.
+"""
+import math
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class WorkerStats(NamedTuple):
+    worker_id: int
+    steps: int
+    total: int
+    rate: float  # Steps per second (exponentially weighted moving average)
+    eta: Optional[float]  # Seconds to finish at the current rate. None if unknown
+    straggler: bool  # Whether the rate is far below the median rate of the active workers
+
+
+class PhaseStats(NamedTuple):
+    name: str
+    steps: int  # Steps done in this phase by all the workers
+    seconds: float  # Wall time spent in this phase, summed over all the workers
+    time_fraction: float  # Share of the time spent in all the phases
+
+
+class CounterStats(NamedTuple):
+    name: str
+    value: int  # Value of the counter summed over all the workers
+    rate: float  # Increase per second of the counter, summed over all the workers
+
+
+def phase_stats(names, steps, times_ns):
+    """Builds the PhaseStats of every phase from the per-phase steps and nanoseconds summed over the workers"""
+    total_ns = sum(times_ns)
+    return [PhaseStats(name, int(n_steps), time_ns / 1e9, time_ns / total_ns if total_ns else 0.)
+            for name, n_steps, time_ns in zip(names, steps, times_ns)]
+
+
+class WorkerRateTracker:
+    def __init__(self, rate_window=10., straggler_ratio=0.25):
+        """
+
+        :param rate_window: Time constant, in seconds, of the exponentially weighted moving average of the rates
+        :param straggler_ratio: Active workers whose rate is below straggler_ratio * median rate are stragglers
+        """
+        self.rate_window = rate_window
+        self.straggler_ratio = straggler_ratio
+        self._last_steps = None
+        self._last_time = None
+        self._rates = None
+        self._seeded = None  # Whether some progress was already measured for each slot
+        self._lock = threading.Lock()
+
+    def sample(self, steps, now=None):
+        """Updates the rate estimates with the current step counters of all the slots"""
+        now = time.monotonic() if now is None else now
+        steps = np.array(steps, dtype=np.int64)
+        with self._lock:
+            if self._last_steps is None:
+                self._last_steps, self._last_time = steps, now
+                self._rates = np.zeros(len(steps))
+                self._seeded = np.zeros(len(steps), dtype=bool)
+                return
+            dt = now - self._last_time
+            if dt <= 1e-3:
+                return
+            if len(steps) > len(self._last_steps):  # The progress bar grew
+                n_new = len(steps) - len(self._last_steps)
+                self._last_steps = np.concatenate([self._last_steps, steps[-n_new:]])
+                self._rates = np.concatenate([self._rates, np.zeros(n_new)])
+                self._seeded = np.concatenate([self._seeded, np.zeros(n_new, dtype=bool)])
+            instant_rates = (steps - self._last_steps) / dt
+            alpha = 1. - math.exp(-dt / self.rate_window)
+            # The first progress measured for a slot replaces the initial zero rate instead of being averaged with it
+            self._rates = np.where(self._seeded, alpha * instant_rates + (1. - alpha) * self._rates, instant_rates)
+            self._seeded |= instant_rates > 0
+            self._last_steps, self._last_time = steps, now
+
+    @property
+    def rates(self):
+        with self._lock:
+            return None if self._rates is None else self._rates.copy()
+
+    def stats(self, steps, totals):
+        """Builds the WorkerStats of every slot from the latest rate estimates"""
+        rates = self.rates
+        if rates is None:
+            rates = np.zeros(len(steps))
+        steps = np.asarray(steps)
+        totals = np.asarray(totals)
+        rates = rates[:len(steps)]
+        active = (totals > 0) & (steps < totals)
+        median_rate = float(np.median(rates[active])) if active.any() else 0.
+        stats = []
+        for worker_id in range(len(steps)):
+            rate = float(rates[worker_id])
+            remaining = int(totals[worker_id]) - int(steps[worker_id])
+            if totals[worker_id] <= 0:
+                eta = None
+            elif remaining <= 0:
+                eta = 0.
+            else:
+                eta = remaining / rate if rate > 0 else None
+            straggler = bool(active[worker_id] and median_rate > 0 and rate < self.straggler_ratio * median_rate)
+            stats.append(WorkerStats(worker_id, int(steps[worker_id]), int(totals[worker_id]), rate, eta, straggler))
+        return stats
+
+
+class RebalanceHint(NamedTuple):
+    worker_id: int
+    eta: float  # Seconds for the worker to finish its remaining steps at its current rate
+    target_eta: float  # Seconds for all the active workers to finish if their remaining steps were balanced
+    shed: int  # Steps the worker should hand over to its peers to finish around target_eta
+
+
+def rebalance_hints(stats, late_ratio=1.5, min_shed=1):
+    """
+    Finds the workers expected to finish far behind the others. If the remaining steps of the active workers were
+    spread in proportion to their rates, they would all finish after target_eta = sum(remaining) / sum(rates). Workers
+    whose ETA is above late_ratio * target_eta are late, and should hand over the steps they cannot do by target_eta.
+    Workers without a measured rate are ignored.
+
+    :param stats: The WorkerStats of the slots
+    :param late_ratio: How much later than target_eta a worker must be expected to finish to be late
+    :param min_shed: The smallest number of steps worth handing over
+    :return: A list of RebalanceHint, one per late worker, in worker order
+    """
+    active = [worker for worker in stats if worker.total > 0 and worker.steps < worker.total and worker.rate > 0]
+    if len(active) < 2:
+        return []
+    target_eta = sum(worker.total - worker.steps for worker in active) / sum(worker.rate for worker in active)
+    hints = []
+    for worker in active:
+        if worker.eta > late_ratio * target_eta:
+            shed = int(worker.total - worker.steps - worker.rate * target_eta)
+            if shed >= min_shed:
+                hints.append(RebalanceHint(worker.worker_id, worker.eta, target_eta, shed))
+    return hints
+
+
+# Statuses of the slots, see WorkerStatusTracker.statuses()
+FREE = "free"  # Slot of a growable bar that no worker holds
+WAITING = "waiting"  # The worker did not report its total yet
+RUNNING = "running"
+STALE = "stale"  # Alive, but no step was published for stale_timeout seconds
+DONE = "done"
+DEAD = "dead"  # No heartbeat for heartbeat_timeout seconds (or never attached, heartbeat_timeout after the creation)
+
+
+class WorkerStatusTracker:
+    def __init__(self, heartbeat_timeout, stale_timeout=None, growable=False):
+        """
+
+        :param heartbeat_timeout: Workers whose last heartbeat is older than this, in seconds, are dead. If None,
+                                  workers are never dead
+        :param stale_timeout: Running workers that published no step for this number of seconds are stale.
+                              If None, workers are never stale
+        :param growable: Whether slots without owner are free (claimed slots) rather than waiting for their worker
+        """
+        self.heartbeat_timeout_ns = None if heartbeat_timeout is None else int(heartbeat_timeout * 1e9)
+        self.stale_timeout_ns = None if stale_timeout is None else int(stale_timeout * 1e9)
+        self.growable = growable
+        self._start_ns = time.monotonic_ns()
+        self._last_steps = np.zeros(0, dtype=np.int64)
+        self._last_change_ns = np.zeros(0, dtype=np.int64)  # When the steps of each slot last changed
+        self._lock = threading.Lock()
+
+    def statuses(self, steps, totals, owners, heartbeats, now_ns=None):
+        """The status of every slot (FREE, WAITING, RUNNING, STALE, DONE or DEAD), as an array of strings"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        steps, totals, owners, heartbeats = (np.asarray(a, dtype=np.int64) for a in (steps, totals, owners, heartbeats))
+        with self._lock:
+            n_new = len(steps) - len(self._last_steps)
+            if n_new > 0:  # The progress bar grew
+                self._last_steps = np.concatenate([self._last_steps, steps[-n_new:]])
+                self._last_change_ns = np.concatenate([self._last_change_ns, np.full(n_new, now_ns, dtype=np.int64)])
+            self._last_change_ns[steps != self._last_steps] = now_ns
+            self._last_steps = steps.copy()
+            last_change_ns = self._last_change_ns.copy()
+
+        statuses = np.full(len(steps), RUNNING, dtype=object)
+        if self.stale_timeout_ns is not None:
+            statuses[now_ns - last_change_ns > self.stale_timeout_ns] = STALE
+        statuses[totals <= 0] = WAITING
+        if self.heartbeat_timeout_ns is not None:
+            # Slots that never received a heartbeat are given heartbeat_timeout from the creation of the tracker
+            last_beat_ns = np.where(heartbeats > 0, heartbeats, self._start_ns)
+            statuses[now_ns - last_beat_ns > self.heartbeat_timeout_ns] = DEAD
+        statuses[(totals > 0) & (steps >= totals)] = DONE
+        if self.growable:
+            statuses[owners == 0] = FREE
+        return statuses
@@ -0,0 +1,96 @@
+"""Tests for the incrementally maintained aggregates of the header (aggregates=True)."""
+import multiprocessing
+import random
+
+import numpy as np
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+def _scan(pbar):
+    """The values the aggregates must match, computed by scanning all the slots."""
+    steps = np.concatenate([p[l.steps_slice] for l, p in pbar._iter_segments()])
+    totals = np.concatenate([p[l.totals_slice] for l, p in pbar._iter_segments()])
+    owners = np.concatenate([p[l.owners_slice] for l, p in pbar._iter_segments()])
+    if pbar.growable:
+        ready = (totals > 0).any() and not ((owners != 0) & (totals < 0)).any()
+        return steps.sum(), np.maximum(totals, 0).sum(), ready
+    return steps.sum(), totals.sum(), (totals > 0).all()
+
+
+def _aggregated(pbar):
+    return pbar.get_cum_steps(), pbar.get_total_steps(), pbar.are_workers_ready()
+
+
+def _worker(shm_name, worker_id, steps):
+    with SharedMemoryProgressBarWorker(worker_id, shm_name, flush_every=3) as pbar:
+        pbar.set_total_steps(steps)
+        for _ in range(steps):
+            pbar.update(1)
+
+
+class TestAggregates:
+    """The O(1) aggregated reads must always agree with the O(n) scans."""
+
+    def test_initial_state(self):
+        with SharedMemoryProgressBar(4, aggregates=True) as pbar:
+            assert _aggregated(pbar) == (0, -4, False)
+            assert _aggregated(pbar) == _scan(pbar)
+
+    def test_fixed_workers(self):
+        n_workers = 6
+        with SharedMemoryProgressBar(n_workers, aggregates=True) as pbar:
+            workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(n_workers)]
+            rng = random.Random(0)
+            for _ in range(200):
+                worker = rng.choice(workers)
+                if rng.random() < 0.2:
+                    worker.set_total_steps(rng.randint(-1, 20))
+                else:
+                    worker.update(rng.randint(0, 3))
+                assert _aggregated(pbar) == _scan(pbar)
+            pbar.set_total_steps(7, 0)  # Totals set by the parent are accounted for too
+            assert _aggregated(pbar) == _scan(pbar)
+            for worker in workers:
+                worker.close()
+
+    def test_claimed_slots_and_growth(self):
+        with SharedMemoryProgressBar(2, growable=True, aggregates=True) as pbar:
+            assert _aggregated(pbar) == _scan(pbar)
+            worker0 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            worker1 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            worker0.set_total_steps(5)
+            assert _aggregated(pbar) == _scan(pbar)
+            assert not pbar.are_workers_ready()
+            worker1.set_total_steps(3)
+            pbar.grow()
+            worker2 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            assert not pbar.are_workers_ready()
+            worker2.close()  # Released without setting a total
+            assert pbar.are_workers_ready()
+            worker0.update(5)
+            worker1.update(2)
+            assert _aggregated(pbar) == _scan(pbar)
+            worker0.close()
+            worker1.close()
+            assert _aggregated(pbar) == _scan(pbar) == (7, 8, True)
+
+    def test_multiprocessing(self):
+        n_workers = 4
+        steps = [10, 20, 30, 40]
+        with SharedMemoryProgressBar(n_workers, aggregates=True) as pbar:
+            processes = [multiprocessing.Process(target=_worker, args=(pbar.shm_name, i, steps[i]))
+                         for i in range(n_workers)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+            assert _aggregated(pbar) == _scan(pbar) == (100, 100, True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,156 @@
+"""Tests for the asyncio monitoring API."""
+import asyncio
+import multiprocessing
+import threading
+
+import pytest
+
+from progressBarDistributed import shmProgressBar
+from progressBarDistributed.checkpoint import load_checkpoint
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+def _worker(worker_id, steps, shm_name):
+    with SharedMemoryProgressBarWorker(worker_id, shm_name) as pbar:
+        pbar.set_total_steps(steps)
+        for _ in range(steps):
+            pbar.update(1)
+
+
+class TestSnapshot:
+    """Test the synchronous snapshot."""
+
+    def test_snapshot(self):
+        pbar = SharedMemoryProgressBar(2)
+        workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(2)]
+        assert not pbar.snapshot().ready
+        workers[0].set_total_steps(5)
+        workers[1].set_total_steps(5)
+        workers[0].update(5)
+        snapshot = pbar.snapshot()
+        assert (snapshot.steps, snapshot.total, snapshot.ready, snapshot.done) == (5, 10, True, False)
+        workers[1].update(5)
+        assert pbar.snapshot().done
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+
+class TestWatch:
+    """Test watch() and wait_done()."""
+
+    def test_watch_until_done(self):
+        pbar = SharedMemoryProgressBar(1)
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        worker.set_total_steps(3)
+
+        async def work():
+            for _ in range(3):
+                await asyncio.sleep(0.02)
+                worker.update(1)
+
+        async def monitor():
+            return [snapshot async for snapshot in pbar.watch(0.01)]
+
+        async def main():
+            snapshots, _ = await asyncio.gather(monitor(), work())
+            return snapshots
+
+        snapshots = asyncio.run(main())
+        assert snapshots[-1].done and snapshots[-1].steps == 3
+        assert not any(snapshot.done for snapshot in snapshots[:-1])
+        assert [s.steps for s in snapshots] == sorted(s.steps for s in snapshots)
+        worker.close()
+        pbar.close()
+
+    def test_watch_stops_on_close(self):
+        pbar = SharedMemoryProgressBar(1)
+
+        async def main():
+            async def close_later():
+                await asyncio.sleep(0.05)
+                pbar.close()
+            closer = asyncio.ensure_future(close_later())
+            snapshots = [snapshot async for snapshot in pbar.watch(0.01)]
+            await closer
+            return snapshots
+
+        snapshots = asyncio.run(main())
+        assert snapshots and not any(snapshot.ready for snapshot in snapshots)
+
+    def test_wait_done_many_bars(self):
+        n_bars = 3
+        pbars = [SharedMemoryProgressBar(2, aggregates=True) for _ in range(n_bars)]
+        processes = [multiprocessing.Process(target=_worker, args=(i, 50, pbar.shm_name))
+                     for pbar in pbars for i in range(2)]
+        for process in processes:
+            process.start()
+
+        async def main():
+            return await asyncio.wait_for(asyncio.gather(*(pbar.wait_done(0.01) for pbar in pbars)), 60)
+
+        snapshots = asyncio.run(main())
+        for process in processes:
+            process.join()
+        assert all(snapshot.done and snapshot.steps == snapshot.total == 100 for snapshot in snapshots)
+        for pbar in pbars:
+            pbar.close()
+
+    def test_wait_done_growable(self, monkeypatch):
+        pbar = SharedMemoryProgressBar(1, growable=True)
+        grown_in = []
+        grow = pbar.grow
+        monkeypatch.setattr(pbar, "grow", lambda *args: grown_in.append(threading.current_thread()) or grow(*args))
+
+        async def main():
+            task = asyncio.ensure_future(pbar.wait_done(0.01))
+            loop = asyncio.get_running_loop()
+            workers = []
+            for _ in range(2):  # The second claim needs a new segment, added by the grow thread
+                workers.append(await loop.run_in_executor(None, SharedMemoryProgressBarWorker, None, pbar.shm_name))
+                workers[-1].set_total_steps(2)
+            for worker in workers:
+                worker.update(2)
+                worker.close()
+            return await asyncio.wait_for(task, 10)
+
+        snapshot = asyncio.run(main())
+        assert snapshot.done and snapshot.steps == 4
+        assert pbar.capacity == 2
+        assert grown_in and threading.main_thread() not in grown_in  # Not on the event loop
+        pbar.close()
+
+    def test_checkpoints_off_the_loop(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "job.ckpt")
+        pbar = SharedMemoryProgressBar(1, checkpoint_path=path, checkpoint_interval=0.01)
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        worker.set_total_steps(3)
+        written_in = []
+        write_checkpoint = shmProgressBar.write_checkpoint
+
+        def record_write(*args):
+            written_in.append(threading.current_thread())
+            write_checkpoint(*args)
+
+        monkeypatch.setattr(shmProgressBar, "write_checkpoint", record_write)
+
+        async def work():
+            for _ in range(3):
+                await asyncio.sleep(0.03)
+                worker.update(1)
+
+        async def main():
+            await asyncio.gather(pbar.wait_done(0.01), work())
+
+        asyncio.run(main())
+        assert written_in and threading.main_thread() not in written_in
+        worker.close()
+        pbar.close()  # The final checkpoint
+        assert load_checkpoint(path).steps == [3]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
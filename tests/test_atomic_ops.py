@@ -0,0 +1,179 @@
+"""Tests for the atomic shared memory counters."""
+import multiprocessing
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from progressBarDistributed import atomicOps
+from progressBarDistributed.atomicOps import AtomicInt64Array, lock_path
+from progressBarDistributed.shmLayout import OWNER_FIELD
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+N_THREADS = 8
+N_UPDATES = 5000
+
+
+def _hammer_slot(shm_name, worker_id, n_threads, n_updates):
+    """Many threads share a single worker object (and thus a single slot)."""
+    with SharedMemoryProgressBarWorker(worker_id, shm_name) as worker:
+        _hammer_worker(worker, n_threads, n_updates)
+
+
+def _hammer_worker(worker, n_threads, n_updates):
+    barrier = threading.Barrier(n_threads)
+
+    def _run():
+        barrier.wait()
+        for _ in range(n_updates):
+            worker.update(1)
+
+    threads = [threading.Thread(target=_run) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class TestAtomicInt64Array:
+    """Test the atomic primitives over a plain buffer."""
+
+    def test_basic_operations(self):
+        buf = bytearray(8 * 4)
+        arr = AtomicInt64Array(buf)
+        assert arr.fetch_add(1, 5) == 0
+        assert arr.fetch_add(1, -2) == 5
+        assert arr.load(1) == 3
+        arr.store(2, 42)
+        assert arr.exchange(2, 7) == 42
+        assert arr.load(2) == 7
+        assert arr.compare_exchange(3, 0, 9) == (True, 0)
+        assert arr.compare_exchange(3, 0, 11) == (False, 9)
+        assert arr.load(3) == 9
+        arr.release()
+
+    def test_out_of_range(self):
+        arr = AtomicInt64Array(bytearray(8 * 2))
+        with pytest.raises(IndexError):
+            arr.fetch_add(2, 1)
+        arr.release()
+
+    @pytest.mark.parametrize("native", [True, False])
+    def test_adder(self, native, monkeypatch):
+        if native and not atomicOps.HAS_NATIVE_ATOMICS:
+            pytest.skip("No native atomics")
+        monkeypatch.setattr(atomicOps, "HAS_NATIVE_ATOMICS", native)
+        arr = AtomicInt64Array(bytearray(8 * 2))
+        add = arr.adder(1)
+        assert add(5) == 0
+        assert add(-2) == 5
+        assert arr.load(1) == 3 and arr.load(0) == 0
+        with pytest.raises(IndexError):
+            arr.adder(2)
+        arr.release()
+
+    def test_import_without_libatomic(self):
+        """Without libatomic, as on Windows where ctypes.CDLL(None) raises TypeError, the import falls back"""
+        code = textwrap.dedent("""
+            import ctypes, ctypes.util
+            from unittest import mock
+
+            def cdll(name, *args, **kwargs):
+                if name is None:
+                    raise TypeError("expected str, bytes or os.PathLike object, not NoneType")
+                return real_cdll(name, *args, **kwargs)
+
+            def find_library(name):
+                return None if name == "atomic" else real_find_library(name)
+
+            real_cdll, real_find_library = ctypes.CDLL, ctypes.util.find_library
+            with mock.patch("ctypes.util.find_library", find_library), mock.patch("ctypes.CDLL", cdll):
+                from progressBarDistributed.atomicOps import AtomicInt64Array, HAS_NATIVE_ATOMICS
+                import progressBarDistributed.shmWorker
+            assert not HAS_NATIVE_ATOMICS
+            arr = AtomicInt64Array(bytearray(8))
+            assert not arr.native and arr.fetch_add(0, 2) == 0 and arr.load(0) == 2
+        """)
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+
+class TestAtomicUpdates:
+    """Stress tests: one slot hammered from many threads and processes must not lose increments."""
+
+    def test_many_threads_one_slot(self):
+        with SharedMemoryProgressBar(1) as pbar:
+            pbar.set_total_steps(N_THREADS * N_UPDATES, 0)
+            _hammer_slot(pbar.shm_name, 0, N_THREADS, N_UPDATES)
+            assert pbar.get_cum_steps() == N_THREADS * N_UPDATES
+
+    def test_many_threads_separate_workers_one_slot(self):
+        with SharedMemoryProgressBar(1) as pbar:
+            pbar.set_total_steps(N_THREADS * N_UPDATES, 0)
+            threads = [threading.Thread(target=_hammer_slot, args=(pbar.shm_name, 0, 1, N_UPDATES))
+                       for _ in range(N_THREADS)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert pbar.get_cum_steps() == N_THREADS * N_UPDATES
+
+    def test_many_processes_and_threads_one_slot(self):
+        n_processes = 4
+        n_threads = 4
+        with SharedMemoryProgressBar(1) as pbar:
+            pbar.set_total_steps(n_processes * n_threads * N_UPDATES, 0)
+            processes = [multiprocessing.Process(target=_hammer_slot,
+                                                 args=(pbar.shm_name, 0, n_threads, N_UPDATES))
+                         for _ in range(n_processes)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+                assert p.exitcode == 0
+            assert pbar.get_cum_steps() == n_processes * n_threads * N_UPDATES
+
+
+
+def _claim_and_mark(shm_name, units, n_threads, n_updates):
+    """Claims a slot, hammers it from many threads, then marks work units sharing bitmap words with other processes"""
+    with SharedMemoryProgressBarWorker(None, shm_name) as worker:
+        worker.set_total_steps(n_threads * n_updates)
+        _hammer_worker(worker, n_threads, n_updates)
+        for unit in units:
+            worker.mark_done(unit)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="The patched module is inherited by forked processes only")
+class TestWithoutNativeAtomics:
+    """Without native atomics, a lock file shared by the processes keeps the updates exact."""
+
+    def test_claims_aggregates_and_units(self, monkeypatch):
+        monkeypatch.setattr(atomicOps, "HAS_NATIVE_ATOMICS", False)
+        n_processes, n_threads, n_updates = 4, 2, 1000
+        context = multiprocessing.get_context("fork")
+        pbar = SharedMemoryProgressBar(n_processes, aggregates=True, n_units=64)
+        assert not pbar._atomic.native and os.path.exists(lock_path(pbar.shm_name))
+        processes = [context.Process(target=_claim_and_mark,
+                                     args=(pbar.shm_name, range(i, 64, n_processes), n_threads, n_updates))
+                     for i in range(n_processes)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+            assert p.exitcode == 0
+        assert sorted(pbar._gather(OWNER_FIELD).tolist()) == [0] * n_processes  # The claims were released
+        assert pbar.get_cum_steps() == n_processes * n_threads * n_updates
+        assert pbar.get_total_steps() == n_processes * n_threads * n_updates
+        assert pbar.done_units() == list(range(64))
+        pbar.close()
+        assert not os.path.exists(lock_path(pbar.shm_name))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+"""Tests for the buffered (coalesced) update mode of SharedMemoryProgressBarWorker."""
+import time
+
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class TestBufferedWorker:
+    """Test that buffered workers publish their steps lazily but never lose them."""
+
+    def test_flush_every(self):
+        """Steps are published only every `flush_every` updates."""
+        with SharedMemoryProgressBar(1) as pbar:
+            with SharedMemoryProgressBarWorker(0, pbar.shm_name, flush_every=10) as worker:
+                worker.set_total_steps(25)
+                for _ in range(9):
+                    worker.update(1)
+                assert pbar.get_cum_steps() == 0
+                worker.update(1)
+                assert pbar.get_cum_steps() == 10
+                for _ in range(15):
+                    worker.update(1)
+                assert pbar.get_cum_steps() == 20
+            # Remaining steps are flushed on __exit__
+            assert pbar.get_cum_steps() == 25
+
+    def test_flush_interval(self):
+        """Steps are published once the flush interval has elapsed."""
+        with SharedMemoryProgressBar(1) as pbar:
+            worker = SharedMemoryProgressBarWorker(0, pbar.shm_name, flush_interval_ms=50)
+            worker.set_total_steps(10)
+            worker.update(3)
+            assert pbar.get_cum_steps() == 0
+            time.sleep(0.1)
+            worker.update(1)
+            assert pbar.get_cum_steps() == 4
+            worker.update(6)
+            worker.close()
+            assert pbar.get_cum_steps() == 10
+
+    def test_explicit_flush(self):
+        """flush() publishes pending steps immediately."""
+        with SharedMemoryProgressBar(1) as pbar:
+            worker = SharedMemoryProgressBarWorker(0, pbar.shm_name, flush_every=1000)
+            worker.set_total_steps(5)
+            worker.update(5)
+            assert pbar.get_cum_steps() == 0
+            worker.flush()
+            assert pbar.get_cum_steps() == 5
+            worker.close()
+            assert pbar.get_cum_steps() == 5
+
+    @pytest.mark.parametrize("worker_kwargs", [{}, dict(flush_every=7), dict(flush_interval_ms=1)])
+    def test_close_flushes_everything(self, worker_kwargs):
+        """Whatever the buffering mode, all steps are visible after close()."""
+        n_steps = 1000
+        with SharedMemoryProgressBar(2) as pbar:
+            workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name, **worker_kwargs) for i in range(2)]
+            for worker in workers:
+                worker.set_total_steps(n_steps)
+                for _ in range(n_steps):
+                    worker.update(1)
+                worker.close()
+            assert pbar.get_cum_steps() == 2 * n_steps
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,208 @@
+"""Tests for the work unit bitmap and the checkpoint/resume of the progress."""
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from progressBarDistributed.atomicOps import AtomicInt64Array
+from progressBarDistributed.checkpoint import Checkpoint, load_checkpoint, write_checkpoint
+from progressBarDistributed.mmapProgressBar import MmapProgressBar
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+from progressBarDistributed.unitBitmap import UnitBitmap, N_UNITS_IDX
+
+N_UNITS = 200
+
+
+def _unit_worker(worker_id, shm_name, units):
+    with SharedMemoryProgressBarWorker(worker_id, shm_name) as pbar:
+        pbar.set_total_steps(len(units))
+        for unit in units:
+            if not pbar.is_unit_done(unit):
+                pbar.update(1)
+                pbar.mark_done(unit)
+
+
+def _bitmap(n_units):
+    buf = bytearray(UnitBitmap.n_bytes(n_units))
+    atomic = AtomicInt64Array(buf)
+    atomic.store(N_UNITS_IDX, n_units)
+    return UnitBitmap(atomic), atomic
+
+
+class TestUnitBitmap:
+    """Test the bitmap of the done work units."""
+
+    def test_mark_and_serialize(self):
+        bitmap, atomic = _bitmap(130)
+        units = [0, 7, 63, 64, 127, 129]
+        assert all(bitmap.mark(unit) for unit in units)
+        assert not bitmap.mark(63)
+        assert bitmap.n_done == len(units)
+        assert [unit for unit in range(130) if bitmap.is_set(unit)] == units
+        done = bitmap.to_bytes()
+        checkpoint = Checkpoint(0., [], [], 130, done)
+        assert checkpoint.done_units() == units
+        assert checkpoint.n_done == len(units)
+
+        restored, restored_atomic = _bitmap(130)
+        restored.mark(1)
+        restored.load_bytes(done)
+        assert restored.n_done == len(units) + 1
+        assert [unit for unit in range(130) if restored.is_set(unit)] == sorted(units + [1])
+        atomic.release()
+        restored_atomic.release()
+
+    def test_out_of_range(self):
+        bitmap, atomic = _bitmap(10)
+        with pytest.raises(IndexError):
+            bitmap.mark(10)
+        with pytest.raises(IndexError):
+            bitmap.is_set(-1)
+        atomic.release()
+
+
+class TestCheckpointFile:
+    """Test writing and reading checkpoint files."""
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "job.ckpt"
+        checkpoint = Checkpoint(12.5, [3, 0], [10, -1], 16, b"\x05\x80")
+        write_checkpoint(path, checkpoint)
+        assert load_checkpoint(path) == checkpoint
+        assert load_checkpoint(path).done_units() == [0, 2, 15]
+        assert os.listdir(tmp_path) == ["job.ckpt"]  # No temporary file left behind
+
+    def test_replace_keeps_previous_on_failure(self, tmp_path, monkeypatch):
+        path = tmp_path / "job.ckpt"
+        write_checkpoint(path, Checkpoint(1., [1], [2], 0, b""))
+
+        def _fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "replace", _fail)
+        with pytest.raises(OSError):
+            write_checkpoint(path, Checkpoint(2., [2], [2], 0, b""))
+        assert load_checkpoint(path).steps == [1]
+        assert os.listdir(tmp_path) == ["job.ckpt"]
+
+    def test_unsupported_version(self, tmp_path):
+        path = tmp_path / "job.ckpt"
+        path.write_text(json.dumps({"version": 99}))
+        with pytest.raises(ValueError):
+            load_checkpoint(path)
+
+
+class TestResume:
+    """Test resuming the progress of a progress bar from its checkpoint."""
+
+    @pytest.mark.parametrize("aggregates", [False, True])
+    def test_resume_skips_done_units(self, tmp_path, aggregates):
+        path = str(tmp_path / "job.ckpt")
+        shares = [list(range(w, N_UNITS, 2)) for w in range(2)]
+
+        # First run: preempted after the first half of each share
+        pbar = SharedMemoryProgressBar(2, n_units=N_UNITS, checkpoint_path=path, aggregates=aggregates)
+        for worker_id, units in enumerate(shares):
+            _unit_worker(worker_id, pbar.shm_name, units[:len(units) // 2])
+        pbar.close()
+        checkpoint = load_checkpoint(path)
+        assert checkpoint.n_done == N_UNITS // 2
+        assert sum(checkpoint.steps) == N_UNITS // 2
+
+        # Second run: the workers report their whole share, and skip the units that are done
+        pbar = SharedMemoryProgressBar(2, n_units=N_UNITS, checkpoint_path=path, aggregates=aggregates)
+        assert pbar.get_cum_steps() == N_UNITS // 2
+        assert pbar.done_units() == checkpoint.done_units()
+        processes = [multiprocessing.Process(target=_unit_worker, args=(w, pbar.shm_name, shares[w]))
+                     for w in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert pbar.get_cum_steps() == N_UNITS
+        assert pbar.get_total_steps() == N_UNITS
+        assert pbar.done_units() == list(range(N_UNITS))
+        pbar.close()
+        assert load_checkpoint(path).n_done == N_UNITS
+
+    def test_resume_claimed_slots(self, tmp_path):
+        path = str(tmp_path / "job.ckpt")
+        with SharedMemoryProgressBar(1, growable=True, aggregates=True, checkpoint_path=path) as pbar:
+            workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name, claim_timeout=5) for _ in range(3)]
+            for worker in workers:
+                worker.set_total_steps(4)
+                worker.update(4)
+            for worker in workers:
+                worker.close()
+        assert len(load_checkpoint(path).steps) >= 3
+
+        pbar = SharedMemoryProgressBar(1, growable=True, aggregates=True, checkpoint_path=path)
+        assert pbar.capacity >= 3
+        assert pbar.get_cum_steps() == 12
+        assert pbar.get_total_steps() == 12
+        with SharedMemoryProgressBarWorker(None, pbar.shm_name) as worker:
+            worker.set_total_steps(2)  # Claimed slots only add the remaining work
+            worker.update(2)
+        assert pbar.get_cum_steps() == pbar.get_total_steps() == 14
+        pbar.close()
+
+    def test_periodic_checkpoint(self, tmp_path):
+        path = str(tmp_path / "job.ckpt")
+        pbar = SharedMemoryProgressBar(1, n_units=4, checkpoint_path=path, checkpoint_interval=0.)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(2)
+            worker.update(1)
+            worker.mark_done(3)
+            pbar._checkpoint_if_due()
+            assert load_checkpoint(path).done_units() == [3]
+            worker.update(1)
+        pbar.close()
+        assert load_checkpoint(path).steps == [2]
+
+    def test_resume_false_starts_over(self, tmp_path):
+        path = str(tmp_path / "job.ckpt")
+        write_checkpoint(path, Checkpoint(0., [5], [5], 4, b"\x0f"))
+        pbar = SharedMemoryProgressBar(1, n_units=4, checkpoint_path=path, resume=False)
+        assert pbar.get_cum_steps() == 0
+        assert pbar.done_units() == []
+        pbar.close()
+
+    def test_mismatched_checkpoint(self, tmp_path):
+        path = str(tmp_path / "job.ckpt")
+        write_checkpoint(path, Checkpoint(0., [1, 1, 1], [1, 1, 1], 4, b"\x00"))
+        with pytest.raises(ValueError):
+            SharedMemoryProgressBar(3, n_units=8, checkpoint_path=path)
+        with pytest.raises(ValueError):
+            SharedMemoryProgressBar(2, n_units=4, checkpoint_path=path)
+
+    def test_no_units(self):
+        pbar = SharedMemoryProgressBar(1)
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        with pytest.raises(RuntimeError):
+            worker.mark_done(0)
+        with pytest.raises(RuntimeError):
+            pbar.done_units()
+        with pytest.raises(ValueError):
+            pbar.checkpoint()
+        worker.close()
+        pbar.close()
+
+    def test_mmap_backend(self, tmp_path):
+        path = str(tmp_path / "job.ckpt")
+        pbar = MmapProgressBar(1, dir=str(tmp_path), n_units=3, checkpoint_path=path)
+        with pbar.get_worker(0, pbar.path) as worker:
+            worker.set_total_steps(3)
+            worker.update(1)
+            worker.mark_done(1)
+        assert pbar.is_unit_done(1)
+        pbar.close()
+        assert not os.path.exists(pbar.path + "_units")
+        assert load_checkpoint(path).done_units() == [1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,107 @@
+"""Tests for the named counters kept by every worker next to its steps."""
+import time
+
+import pytest
+
+from progressBarDistributed.metricsExport import format_prometheus, metrics_to_json
+from progressBarDistributed.monitor import attach, describe
+from progressBarDistributed.shmLayout import ShmLayout
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class TestLayout:
+    """Test the place of the counters in the segment."""
+
+    @pytest.mark.parametrize("layout", ["packed", "padded"])
+    def test_counter_indices_are_distinct(self, layout):
+        layout = ShmLayout(3, layout, n_phases=2, n_counters=3)
+        indices = {layout.index(field, worker_id) for field in range(layout.n_fields) for worker_id in range(3)}
+        assert len(indices) == 3 * layout.n_fields
+        assert layout.counter_index(2, 2) in indices
+        assert layout.counter_names_index >= max(indices) + 1
+        assert layout.n_words == layout.counter_names_index + 3 * 4
+
+    def test_names_round_trip(self):
+        layout = ShmLayout(2, n_phases=1, n_counters=2)
+        words = [0] * layout.n_words
+        layout.write_header(words)
+        layout.write_phase_names(words, ["load"])
+        layout.write_counter_names(words, ["bytes", "errors"])
+        read = ShmLayout.from_header(words.__getitem__)
+        assert read.n_counters == 2
+        assert read.read_phase_names(words.__getitem__) == ("load",)
+        assert read.read_counter_names(words.__getitem__) == ("bytes", "errors")
+        with pytest.raises(ValueError):
+            layout.write_counter_names(words, ["bytes"])
+        with pytest.raises(ValueError):
+            layout.write_counter_names(words, ["bytes", "x" * 33])
+
+
+class TestCounters:
+    """Test updating and reading the counters."""
+
+    def test_increment(self):
+        pbar = SharedMemoryProgressBar(2, counters=["bytes", "errors"], phases=["load"])
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            assert worker.counter_names == ("bytes", "errors")
+            worker.set_total_steps(2)
+            with worker.phase("load"):
+                worker.update(1)
+                worker.increment("bytes", 4096)
+            worker.increment("errors")
+            with pytest.raises(ValueError):
+                worker.increment("retries")
+        with SharedMemoryProgressBarWorker(1, pbar.shm_name, flush_every=10) as worker:
+            worker.increment("bytes", 1000)
+            assert [stats.value for stats in pbar.counter_stats()] == [4096, 1]  # Not published yet
+        assert [(stats.name, stats.value) for stats in pbar.counter_stats()] == [("bytes", 5096), ("errors", 1)]
+        assert pbar.get_cum_steps() == 1
+        assert pbar.phase_stats()[0].steps == 1
+        pbar.close()
+
+    def test_rates_and_postfix(self):
+        pbar = SharedMemoryProgressBar(1, counters=["bytes", "errors"], counter_units={"bytes": "B"},
+                                       show_counters=True)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            pbar.counter_stats()
+            time.sleep(0.1)
+            worker.increment("bytes", 10 ** 6)
+            stats = pbar.counter_stats()
+            assert stats[0].rate > 10 ** 6
+            assert stats[1].rate == 0
+            postfix = pbar._counters_postfix()
+            assert postfix.startswith("bytes: ") and "MB/s" in postfix and postfix.endswith("errors: 0.00/s")
+        pbar.close()
+
+    def test_growable(self):
+        pbar = SharedMemoryProgressBar(1, growable=True, counters=["bytes"])
+        pbar.grow(1)
+        first = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+        with SharedMemoryProgressBarWorker(None, pbar.shm_name) as worker:
+            assert worker.worker_id == 1  # In the second segment
+            assert worker.counter_names == ("bytes",)
+            worker.increment("bytes", 7)
+        first.close()
+        assert pbar.counter_stats()[0].value == 7
+        pbar.close()
+
+    def test_view_and_export(self):
+        pbar = SharedMemoryProgressBar(1, counters=["bytes"])
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(1)
+            worker.increment("bytes", 12)
+        view = attach(pbar.shm_name, show_counters=True)
+        assert view.counter_names == ("bytes",)
+        assert describe(view).endswith("| bytes: 12")
+        view.close()
+        metrics = pbar.metrics()
+        assert 'progress_counter{counter="bytes"} 12' in format_prometheus(metrics).splitlines()
+        assert metrics_to_json(metrics)["counters"]["bytes"]["value"] == 12
+        pbar.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,164 @@
+"""Tests for workers claiming their slots dynamically and for growable progress bars."""
+import multiprocessing
+import time
+
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+def _task(shm_name, steps):
+    """A task that does not know its worker id."""
+    with SharedMemoryProgressBarWorker(None, shm_name) as pbar:
+        pbar.set_total_steps(steps)
+        for _ in range(steps):
+            pbar.update(1)
+    return steps
+
+
+class TestSlotClaiming:
+    """Test claiming and releasing slots."""
+
+    def test_claim_and_release(self):
+        with SharedMemoryProgressBar(2) as pbar:
+            worker0 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            worker1 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            assert {worker0.worker_id, worker1.worker_id} == {0, 1}
+            worker0.set_total_steps(3)
+            worker0.update(3)
+            released_id = worker0.worker_id
+            worker0.close()
+
+            # The released slot is reused, and the totals of successive tasks add up
+            worker2 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            assert worker2.worker_id == released_id
+            worker2.set_total_steps(4)
+            worker2.set_total_steps(5)  # Re-setting the total replaces this task's contribution
+            worker2.update(5)
+            assert worker2.get_total_steps() == 8
+            worker1.set_total_steps(1)
+            assert pbar.get_total_steps() == 9
+            assert pbar.get_cum_steps() == 8
+            worker1.close()
+            worker2.close()
+
+    def test_no_free_slot(self):
+        """Without growable=True, claiming fails once all the slots are taken."""
+        with SharedMemoryProgressBar(1) as pbar:
+            worker = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            with pytest.raises(RuntimeError):
+                SharedMemoryProgressBarWorker(None, pbar.shm_name, claim_timeout=0.1)
+            worker.close()
+
+    @pytest.mark.parametrize("aggregates", [False, True])
+    def test_reserve_slot(self, aggregates):
+        """The owner holds the total in a slot of its own, without attaching a worker."""
+        pbar = SharedMemoryProgressBar(2, growable=True, aggregates=aggregates)
+        parent = pbar.reserve_slot()
+        assert parent == 0 and pbar.totals[0] == 0
+        assert not pbar.are_workers_ready()
+        with SharedMemoryProgressBarWorker(None, pbar.shm_name) as worker:
+            assert worker.worker_id == 1
+            worker.set_total_steps(0)
+            pbar.add_total_steps(5, parent)
+            pbar.add_total_steps(3, parent)
+            assert pbar.are_workers_ready() and pbar.get_total_steps() == 8
+            worker.update(8)
+        assert pbar.snapshot().done
+        with pytest.raises(RuntimeError):
+            SharedMemoryProgressBar.attach(pbar.shm_name).reserve_slot()
+        pbar.close()
+
+    def test_pool_with_more_tasks_than_slots(self):
+        """Many tasks on a few reused processes, without precomputing worker ids."""
+        n_processes = 2
+        steps = list(range(1, 21))
+        with SharedMemoryProgressBar(n_processes, growable=True) as pbar:
+            with multiprocessing.Pool(n_processes) as pool:
+                results = pool.starmap(_task, [(pbar.shm_name, s) for s in steps])
+            assert sum(results) == pbar.get_cum_steps() == pbar.get_total_steps()
+            assert (pbar.progress[pbar.layout.owners_slice] == 0).all()
+
+
+class TestGrowable:
+    """Test progress bars that add slots on demand."""
+
+    def test_grow_explicitly(self):
+        pbar = SharedMemoryProgressBar(2, growable=True)
+        pbar.grow()
+        assert pbar.capacity == 4
+        workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name) for _ in range(4)]
+        assert sorted(w.worker_id for w in workers) == [0, 1, 2, 3]
+        for worker in workers:
+            worker.set_total_steps(2)
+            worker.update(2)
+        assert pbar.get_cum_steps() == 8
+        assert pbar.get_total_steps() == 8
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+    @pytest.mark.parametrize("layout", ["packed", "padded"])
+    def test_grow_on_demand(self, layout):
+        """The progress thread adds slots when workers run out of them."""
+        with SharedMemoryProgressBar(1, layout=layout, growable=True) as pbar:
+            workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name, claim_timeout=10) for _ in range(5)]
+            assert pbar.capacity >= 5
+            assert len({w.worker_id for w in workers}) == 5
+            for worker in workers:
+                worker.set_total_steps(10)
+                worker.update(10)
+            assert pbar.get_cum_steps() == 50
+            assert pbar.get_total_steps() == 50
+            for worker in workers:
+                worker.close()
+
+    def test_grow_without_rendering(self):
+        """Requests are served by the bar itself, even when nothing draws nor watches it."""
+        pbar = SharedMemoryProgressBar(1, growable=True)
+        workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name, claim_timeout=10) for _ in range(3)]
+        assert pbar.capacity >= 3 and pbar.progress_thread is None
+        for worker in workers:
+            worker.close()
+        pbar.close()
+        assert pbar._grow_thread is None  # Stopped by close()
+
+    def test_closed_growable_bar_message(self):
+        pbar = SharedMemoryProgressBar(1, growable=True)
+        worker = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+        pbar.stop_event.set()
+        pbar._grow_thread.join()  # As if the owner was blocked
+        with pytest.raises(RuntimeError, match="did not add slots"):
+            SharedMemoryProgressBarWorker(None, pbar.shm_name, claim_timeout=0.1)
+        worker.close()
+        pbar.close()
+
+    def test_readiness(self):
+        """Free slots never block readiness; claimed slots without a total do."""
+        with SharedMemoryProgressBar(4, growable=True) as pbar:
+            assert not pbar.are_workers_ready()
+            worker0 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            worker1 = SharedMemoryProgressBarWorker(None, pbar.shm_name)
+            worker0.set_total_steps(5)
+            assert not pbar.are_workers_ready()
+            worker1.set_total_steps(5)
+            assert pbar.are_workers_ready()
+            assert pbar.get_total_steps() == 10
+            worker0.close()
+            worker1.close()
+
+    def test_bar_keeps_tracking_new_workers(self):
+        """The progress thread does not stop when the first workers are done."""
+        with SharedMemoryProgressBar(1, growable=True) as pbar:
+            _task(pbar.shm_name, 3)
+            time.sleep(0.2)
+            assert pbar.progress_thread.is_alive()
+            _task(pbar.shm_name, 4)
+            assert pbar.get_cum_steps() == 7
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
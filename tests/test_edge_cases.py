@@ -156,7 +156,7 @@ class TestProgressBarThreading:
             # Update progress
             for i in range(n_workers):
                 for _ in range(10):
-                    pbar.progress[1 + i] += 1
+                    pbar.steps[i] += 1
 
             time.sleep(0.5)
 
@@ -0,0 +1,109 @@
+"""Tests for worker heartbeats, dead workers and stale workers."""
+import io
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+from progressBarDistributed.workerStats import WorkerStatusTracker
+
+TIMEOUT = 0.5
+
+
+def _crashing_worker(shm_name, steps_before_crash):
+    pbar = SharedMemoryProgressBarWorker(0, shm_name)
+    pbar.set_total_steps(100)
+    pbar.update(steps_before_crash)
+    os._exit(1)  # Dies without closing its worker
+
+
+class TestWorkerStatusTracker:
+    """Test the statuses with controlled timestamps."""
+
+    def test_statuses(self):
+        tracker = WorkerStatusTracker(heartbeat_timeout=1., stale_timeout=2.)
+        now = tracker._start_ns
+        steps, totals, owners = [0, 5, 10, 0], [-1, 10, 10, 10], [0, 0, 0, 0]
+        heartbeats = [0, now, now, now]
+        assert tracker.statuses(steps, totals, owners, heartbeats, now_ns=now).tolist() == \
+            ["waiting", "running", "done", "running"]
+        later = now + int(1.5e9)
+        heartbeats = [0, later, now, later]
+        assert tracker.statuses(steps, totals, owners, heartbeats, now_ns=later).tolist() == \
+            ["dead", "running", "done", "running"]
+        much_later = now + int(3e9)
+        heartbeats = [0, much_later, now, much_later]
+        assert tracker.statuses([0, 6, 10, 0], totals, owners, heartbeats, now_ns=much_later).tolist() == \
+            ["dead", "running", "done", "stale"]
+
+    def test_free_slots_of_growable_bars(self):
+        tracker = WorkerStatusTracker(heartbeat_timeout=None, growable=True)
+        assert tracker.statuses([0, 0], [-1, -1], [0, 123], [0, 0]).tolist() == ["free", "waiting"]
+
+
+class TestHeartbeats:
+    """Test dead-worker detection with real workers."""
+
+    def test_worker_that_never_attached(self):
+        pbar = SharedMemoryProgressBar(2, heartbeat_timeout=TIMEOUT)
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        worker.set_total_steps(5)
+        assert not pbar.are_workers_ready()
+        assert pbar.worker_status() == ["running", "waiting"]
+        time.sleep(TIMEOUT + 0.2)
+        assert pbar.worker_status() == ["running", "dead"]
+        assert pbar.are_workers_ready()
+        assert pbar.get_total_steps() == 5
+        thread = pbar.progress_bar_thread(refresh_seconds=0.05, file=io.StringIO())
+        worker.update(5)
+        worker.close()
+        thread.join(10)
+        assert not thread.is_alive()
+        pbar.close()
+
+    def test_crashed_worker(self):
+        pbar = SharedMemoryProgressBar(2, heartbeat_timeout=TIMEOUT, aggregates=True)
+        process = multiprocessing.Process(target=_crashing_worker, args=(pbar.shm_name, 10))
+        process.start()
+        process.join()
+        with SharedMemoryProgressBarWorker(1, pbar.shm_name) as worker:
+            worker.set_total_steps(10)
+            thread = pbar.progress_bar_thread(refresh_seconds=0.05, file=io.StringIO())
+            worker.update(10)
+        thread.join(10)
+        assert not thread.is_alive()  # The bar did not wait for the 90 steps of the dead worker
+        assert pbar.worker_status() == ["dead", "done"]
+        assert pbar.get_cum_steps() == 20
+        assert pbar.snapshot().done
+        pbar.close()
+
+    def test_heartbeat_thread_keeps_slow_workers_alive(self):
+        pbar = SharedMemoryProgressBar(1, heartbeat_timeout=TIMEOUT, stale_timeout=TIMEOUT)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(2)
+            worker.update(1)
+            assert pbar.worker_status() == ["running"]
+            time.sleep(2 * TIMEOUT)  # A long step, without any update
+            assert pbar.worker_status() == ["stale"]
+            worker.update(1)
+        assert pbar.worker_status() == ["done"]
+        pbar.close()
+
+    def test_status_without_heartbeats(self):
+        with SharedMemoryProgressBar(1, growable=True) as pbar:
+            assert pbar.worker_status() == ["free"]
+            with SharedMemoryProgressBarWorker(None, pbar.shm_name) as worker:
+                assert worker._heartbeat_thread is None
+                assert pbar.worker_status() == ["waiting"]
+                worker.set_total_steps(1)
+                assert pbar.worker_status() == ["running"]
+                worker.update(1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,90 @@
+"""Tests for the joblib integration."""
+import io
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+from joblib import delayed
+
+from progressBarDistributed import ProgressParallel, threadWorker
+
+
+def _double(x):
+    return 2 * x
+
+
+def _long_task(n, progress=None):
+    for _ in range(n):
+        time.sleep(0.001)
+        progress.update(1)
+    return n
+
+
+def _fail(x):
+    raise RuntimeError("task %d failed" % x)
+
+
+class TestProgressParallel:
+    """Test ProgressParallel with the common joblib backends."""
+
+    @pytest.mark.parametrize("backend", ["loky", "threading", "sequential"])
+    def test_counts_tasks(self, backend):
+        output = io.StringIO()
+        parallel = ProgressParallel(n_jobs=2, backend=backend, tqdm_kwargs=dict(file=output))
+        assert parallel(delayed(_double)(i) for i in range(30)) == [2 * i for i in range(30)]
+        assert "30/30" in output.getvalue()
+
+    def test_cost(self):
+        output = io.StringIO()
+        tasks = [delayed(_double)(i) for i in range(1, 6)]
+        results = ProgressParallel(n_jobs=2, cost=lambda x: x, tqdm_kwargs=dict(file=output))(tasks)
+        assert results == [2, 4, 6, 8, 10]
+        assert "15/15" in output.getvalue()
+
+    def test_injected_handle(self):
+        output = io.StringIO()
+        parallel = ProgressParallel(n_jobs=2, cost=lambda n: n, progress_arg="progress", tqdm_kwargs=dict(file=output))
+        assert parallel([delayed(_long_task)(n) for n in (10, 20)]) == [10, 20]
+        assert "30/30" in output.getvalue()
+
+    @pytest.mark.parametrize("backend", ["threading", "sequential"])
+    def test_back_to_back_in_process(self, backend):
+        for _ in range(2):
+            parallel = ProgressParallel(n_jobs=2, backend=backend, show_progress=False)
+            assert parallel(delayed(_double)(i) for i in range(20)) == [2 * i for i in range(20)]
+            pbar = parallel.progress_bar
+            assert pbar.stop_event.is_set()
+            assert pbar.shm_name not in threadWorker._thread_workers  # The slots of the threads were released
+            assert not threadWorker.is_local_name(pbar.shm_name)
+
+    def test_generator_output(self):
+        parallel = ProgressParallel(n_jobs=2, return_as="generator", show_progress=False)
+        output = parallel(delayed(_double)(i) for i in range(10))
+        assert list(output) == [2 * i for i in range(10)]
+        assert parallel.progress_bar.stop_event.is_set()  # Closed once exhausted
+
+    def test_pool_reuse_and_errors(self):
+        parallel = ProgressParallel(n_jobs=2, show_progress=False)
+        with pytest.raises(RuntimeError):
+            parallel(delayed(_fail)(i) for i in range(4))
+        for _ in range(3):  # The workers of the pool detach from the closed bars
+            assert parallel(delayed(_double)(i) for i in range(4)) == [0, 2, 4, 6]
+
+
+    def test_no_leaked_segment_warning(self):
+        """The parent does not attach a worker, so the resource tracker sees the segments unlinked"""
+        code = textwrap.dedent("""
+            from joblib import delayed
+            from progressBarDistributed import ProgressParallel, threadWorker
+
+            if __name__ == "__main__":
+                assert ProgressParallel(n_jobs=2, show_progress=False)(delayed(abs)(-i) for i in range(20))[-1] == 19
+        """)
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert "leaked" not in process.stderr and "No such file" not in process.stderr
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
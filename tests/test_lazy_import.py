@@ -0,0 +1,63 @@
+"""Tests for the import-light worker path."""
+import subprocess
+import sys
+
+import pytest
+
+import progressBarDistributed
+
+
+def _loaded_modules(statement):
+    """Runs `statement` in a fresh interpreter and returns which of numpy, tqdm and joblib it imported"""
+    script = (f"import sys\n{statement}\n"
+              "print(','.join(m for m in ('numpy', 'tqdm', 'joblib') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return set(filter(None, output.strip().split(",")))
+
+
+class TestLazyImport:
+    """Workers must not pay for importing numpy, tqdm or joblib."""
+
+    def test_package_import_is_light(self):
+        assert _loaded_modules("import progressBarDistributed") == set()
+
+    def test_worker_import_is_light(self):
+        statement = ("from progressBarDistributed import SharedMemoryProgressBarWorker, MmapProgressBarWorker, "
+                     "get_worker")
+        assert _loaded_modules(statement) == set()
+        assert _loaded_modules("from progressBarDistributed import ThreadProgressBarWorker") == set()
+
+    def test_progress_bar_import(self):
+        assert "numpy" in _loaded_modules("from progressBarDistributed import SharedMemoryProgressBar")
+
+    def test_public_names(self):
+        for name in progressBarDistributed.__all__:
+            assert getattr(progressBarDistributed, name) is not None
+        assert set(progressBarDistributed.__all__) <= set(dir(progressBarDistributed))
+        with pytest.raises(AttributeError):
+            progressBarDistributed.NotAClass
+
+    def test_same_classes(self):
+        from progressBarDistributed.shmProgressBar import SharedMemoryProgressBarWorker
+        assert progressBarDistributed.SharedMemoryProgressBarWorker is SharedMemoryProgressBarWorker
+
+
+class TestStdlibWorker:
+    """The worker works without numpy, through a memoryview of the segment."""
+
+    def test_worker_in_numpy_free_process(self):
+        pbar = progressBarDistributed.SharedMemoryProgressBar(1)
+        script = ("import sys\n"
+                  "from progressBarDistributed import get_worker\n"
+                  f"with get_worker(0, {pbar.shm_name!r}) as worker:\n"
+                  "    worker.set_total_steps(7)\n"
+                  "    worker.update(7)\n"
+                  "    assert worker.progress[worker._step_idx] == 7\n"
+                  "assert 'numpy' not in sys.modules\n")
+        subprocess.run([sys.executable, "-c", script], check=True)
+        assert pbar.get_cum_steps() == pbar.get_total_steps() == 7
+        pbar.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
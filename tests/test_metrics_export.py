@@ -0,0 +1,114 @@
+"""Tests for the Prometheus and JSON-lines metrics export."""
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from progressBarDistributed.metricsExport import format_prometheus, metrics_to_json
+from progressBarDistributed.shmProgressBar import (
+    ProgressMetrics,
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+from progressBarDistributed.workerStats import WorkerStats
+
+
+def _scrape(port, path="/metrics"):
+    with urllib.request.urlopen("http://127.0.0.1:%d%s" % (port, path), timeout=5) as response:
+        return response.headers["Content-Type"], response.read().decode("utf-8")
+
+
+def _samples(text):
+    """The samples of a Prometheus text exposition, as a dict"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+class TestFormat:
+    """Test the formatting of the metrics."""
+
+    def test_prometheus_format(self):
+        metrics = ProgressMetrics(0., 5, 10, 2.5, 2., True, False,
+                                  [WorkerStats(0, 5, 10, 2.5, 2., False), WorkerStats(3, 0, -1, 0., None, False)])
+        samples = _samples(format_prometheus(metrics, {"job": 'a"b'}))
+        assert samples['progress_steps{job="a\\"b"}'] == 5
+        assert samples['progress_total_steps{job="a\\"b"}'] == 10
+        assert samples['progress_eta_seconds{job="a\\"b"}'] == 2.
+        assert samples['progress_ready{job="a\\"b"}'] == 1
+        assert samples['progress_worker_rate_steps_per_second{job="a\\"b",worker="0"}'] == 2.5
+        assert samples['progress_worker_total_steps{job="a\\"b",worker="3"}'] == -1
+
+    def test_unknown_total(self):
+        metrics = ProgressMetrics(0., 5, None, 0., None, True, False, [])
+        text = format_prometheus(metrics)
+        assert "progress_total_steps" not in text
+        assert "progress_eta_seconds" not in text
+        assert _samples(text)["progress_steps"] == 5
+        assert metrics_to_json(metrics, {"job": "x"})["total"] is None
+
+
+class TestExport:
+    """Test exporting the metrics of a progress bar."""
+
+    def test_metrics(self):
+        pbar = SharedMemoryProgressBar(3)
+        workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(2)]
+        for worker in workers:
+            worker.set_total_steps(10)
+        pbar.metrics()
+        time.sleep(0.05)
+        for worker in workers:
+            worker.update(5)
+        metrics = pbar.metrics()
+        assert metrics.steps == 10
+        assert metrics.total == 19  # The total of the third slot is not set
+        assert not metrics.ready
+        assert metrics.eta is None
+        assert [stats.worker_id for stats in metrics.workers] == [0, 1]
+        assert metrics.rate > 0
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+    def test_http_endpoint(self):
+        pbar = SharedMemoryProgressBar(2, aggregates=True)
+        exporter = pbar.export_metrics(port=0, labels={"job": "test"})
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(4)
+            worker.update(3)
+            content_type, text = _scrape(exporter.port)
+        assert content_type.startswith("text/plain")
+        samples = _samples(text)
+        assert samples['progress_steps{job="test"}'] == 3
+        assert samples['progress_worker_steps{job="test",worker="0"}'] == 3
+        with pytest.raises(urllib.error.HTTPError):
+            _scrape(exporter.port, "/other")
+        pbar.close()
+        with pytest.raises(urllib.error.URLError):
+            _scrape(exporter.port)  # The endpoint is closed with the progress bar
+
+    def test_json_lines(self, tmp_path):
+        path = tmp_path / "metrics.jsonl"
+        pbar = SharedMemoryProgressBar(1, total_mode="growing")
+        pbar.export_metrics(path=str(path), interval=0.05, labels={"job": "test"})
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.add_total_steps(2)
+            worker.update(2)
+            time.sleep(0.3)
+        pbar.close()
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(lines) >= 2
+        assert all(line["job"] == "test" for line in lines)
+        assert lines[-1]["steps"] == 2 and lines[-1]["total"] == 2
+        assert lines[-1]["eta"] == 0.
+        assert lines[-1]["workers"][0]["id"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+"""Tests for the memory-mapped file backend."""
+import multiprocessing
+import os
+
+import pytest
+
+from progressBarDistributed.mmapProgressBar import MmapProgressBar
+from progressBarDistributed.mmapWorker import MmapProgressBarWorker, is_path_like
+from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar, SharedMemoryProgressBarWorker
+
+
+def _mmap_worker(worker_id, steps, path):
+    with SharedMemoryProgressBar.get_worker(worker_id, path) as pbar:
+        assert isinstance(pbar, MmapProgressBarWorker)
+        pbar.set_total_steps(steps)
+        for _ in range(steps):
+            pbar.update(1)
+    return steps
+
+
+class TestMmapProgressBar:
+    """Test the mmap backend."""
+
+    def test_is_path_like(self, tmp_path):
+        assert is_path_like(tmp_path / "counters.pbar")
+        assert is_path_like(str(tmp_path / "counters.pbar"))
+        assert not is_path_like("psm_12345")
+        assert not is_path_like("/psm_12345")
+
+    def test_basic_operations(self, tmp_path):
+        path = tmp_path / "counters.pbar"
+        with MmapProgressBar(2, path=path) as pbar:
+            assert os.path.exists(path)
+            assert pbar.path == str(path)
+            worker0 = MmapProgressBarWorker(0, pbar.path)
+            worker1 = SharedMemoryProgressBar.get_worker(1, path)
+            assert isinstance(worker1, MmapProgressBarWorker)
+            worker0.set_total_steps(10)
+            worker1.set_total_steps(20)
+            assert pbar.are_workers_ready()
+            worker0.update(4)
+            worker1.update(6)
+            assert pbar.get_cum_steps() == 10
+            assert pbar.get_total_steps() == 30
+            worker0.close()
+            worker1.close()
+        assert not os.path.exists(path)
+
+    def test_file_in_directory(self, tmp_path):
+        pbar = MmapProgressBar(1, dir=tmp_path, layout="padded", aggregates=True)
+        assert os.path.dirname(pbar.path) == str(tmp_path)
+        with MmapProgressBarWorker(0, pbar.path) as worker:
+            worker.set_total_steps(3)
+            worker.update(3)
+        assert pbar.get_cum_steps() == 3
+        pbar.close()
+        assert not os.listdir(tmp_path)
+
+    def test_multiprocessing(self, tmp_path):
+        n_jobs = 3
+        with MmapProgressBar(n_jobs, dir=tmp_path) as pbar:
+            with multiprocessing.Pool(n_jobs) as pool:
+                results = pool.starmap(_mmap_worker, [(i, 10 * (i + 1), pbar.path) for i in range(n_jobs)])
+            assert sum(results) == pbar.get_cum_steps() == pbar.get_total_steps()
+
+    def test_growable(self, tmp_path):
+        with MmapProgressBar(1, dir=tmp_path, growable=True) as pbar:
+            workers = [MmapProgressBarWorker(None, pbar.path, claim_timeout=10) for _ in range(3)]
+            for worker in workers:
+                worker.set_total_steps(2)
+                worker.update(2)
+                worker.close()
+            assert pbar.get_cum_steps() == 6
+        assert not os.listdir(tmp_path)
+
+    def test_shm_names_still_use_shared_memory(self):
+        with SharedMemoryProgressBar(1) as pbar:
+            worker = SharedMemoryProgressBar.get_worker(0, pbar.shm_name)
+            assert type(worker) is SharedMemoryProgressBarWorker
+            worker.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,150 @@
+"""Tests for the read-only views of progress bars and the monitor command line."""
+import io
+import threading
+
+import pytest
+
+from progressBarDistributed.__main__ import main
+from progressBarDistributed.mmapProgressBar import MmapProgressBar
+from progressBarDistributed.monitor import attach, monitor
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class TestAttach:
+    """Test attaching read-only to an existing progress bar."""
+
+    def test_options_from_header(self):
+        owner = SharedMemoryProgressBar(3, layout="padded", aggregates=True, phases=["load", "compute"],
+                                        heartbeat_timeout=2., total_mode="growing", n_units=10)
+        view = SharedMemoryProgressBar.attach(owner.shm_name)
+        assert view.read_only
+        assert view.n_workers == 3
+        assert view.layout.name == "padded"
+        assert view.aggregates
+        assert not view.growable
+        assert view.total_mode == "growing"
+        assert view.phase_names == ("load", "compute")
+        assert view.heartbeat_timeout == pytest.approx(2.)
+        assert view.n_units == 10
+        view.close()
+        owner.close()
+
+    def test_reads_progress_and_never_unlinks(self):
+        owner = SharedMemoryProgressBar(2, n_units=4)
+        view = attach(owner.shm_name)
+        with SharedMemoryProgressBarWorker(0, owner.shm_name) as worker:
+            worker.set_total_steps(5)
+            worker.update(2)
+            worker.mark_done(3)
+        assert view.get_cum_steps() == 2
+        assert view.totals.tolist() == [5, -1]
+        assert view.done_units() == [3]
+        view.close()
+        assert not owner.progress_bar_closed  # Closing a view does not close the progress bar
+        with SharedMemoryProgressBarWorker(1, owner.shm_name) as worker:  # The segments still exist
+            worker.set_total_steps(1)
+        assert owner.get_total_steps() == 6
+        view = attach(owner.shm_name)
+        owner.close()
+        assert view.progress_bar_closed
+        assert view.get_total_steps() == 6  # The mapping outlives the unlink
+        view.close()
+
+    def test_growable_view_follows_new_segments(self):
+        owner = SharedMemoryProgressBar(1, growable=True, aggregates=True)
+        view = attach(owner.shm_name)
+        assert view.growable and view.total_mode == "growing"
+        owner.grow(2)
+        assert view.capacity == 1
+        view._serve_grow_requests()
+        assert view.capacity == 3
+        worker = SharedMemoryProgressBarWorker(2, owner.shm_name)
+        assert worker.n_workers == 1  # Slot 2 lives in the second segment of the chain
+        view.close()
+        worker.close()
+        owner.close()
+
+    def test_missing_segment(self):
+        with pytest.raises(FileNotFoundError):
+            attach("psm_does_not_exist")
+
+    def test_mmap_backend(self, tmp_path):
+        owner = MmapProgressBar(2, dir=str(tmp_path))
+        view = attach(owner.path)
+        assert isinstance(view, MmapProgressBar)
+        with owner.get_worker(1, owner.path) as worker:
+            worker.set_total_steps(3)
+            worker.update(3)
+        assert view.get_cum_steps() == 3
+        view.close()
+        assert (tmp_path / owner.path.split("/")[-1]).exists()
+        owner.close()
+
+
+class TestMonitor:
+    """Test the monitor loop and the command line."""
+
+    def test_monitor_stops_when_owner_closes(self):
+        owner = SharedMemoryProgressBar(1, total_mode="growing")
+        output = io.StringIO()
+        thread = threading.Thread(target=monitor, args=(owner.shm_name, 0.05), kwargs={"file": output})
+        thread.start()
+        with SharedMemoryProgressBarWorker(0, owner.shm_name) as worker:
+            worker.add_total_steps(4)
+            worker.update(4)
+        thread.join(0.3)
+        assert thread.is_alive()  # Growing totals: only closing the bar ends it
+        owner.close()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert "4/4" in output.getvalue()
+
+    def test_monitor_stops_when_done(self):
+        owner = SharedMemoryProgressBar(1)
+        with SharedMemoryProgressBarWorker(0, owner.shm_name) as worker:
+            worker.set_total_steps(2)
+            worker.update(2)
+        output = io.StringIO()
+        monitor(owner.shm_name, 0.05, file=output)
+        assert "2/2" in output.getvalue()
+        owner.close()
+
+    def test_cli_once(self, capsys):
+        owner = SharedMemoryProgressBar(2)
+        with SharedMemoryProgressBarWorker(0, owner.shm_name) as worker:
+            worker.set_total_steps(4)
+            worker.update(1)
+        assert main(["monitor", owner.shm_name, "--once"]) == 0
+        out = capsys.readouterr().out
+        assert owner.shm_name in out and "waiting for totals" in out
+        owner.set_total_steps(4, 1)
+        assert main(["monitor", owner.shm_name, "--once"]) == 0
+        assert "1/8 steps (12.5%), running" in capsys.readouterr().out
+        owner.close()
+
+    def test_view_never_writes(self, capsys):
+        owner = SharedMemoryProgressBar(2, aggregates=True, growable=True, n_units=8)
+        with SharedMemoryProgressBarWorker(None, owner.shm_name) as worker:
+            worker.set_total_steps(4)
+            worker.update(1)
+            worker.mark_done(2)
+        before = bytes(owner.shm.buf), bytes(owner._units_shm.buf)
+        assert main(["monitor", owner.shm_name, "--once"]) == 0
+        view = attach(owner.shm_name, show_slowest=1)
+        view.progress_thread = view.progress_bar_thread(0.05, file=io.StringIO())
+        view.worker_stats()
+        view.close()
+        assert not view.progress_thread.is_alive()
+        assert (bytes(owner.shm.buf), bytes(owner._units_shm.buf)) == before
+        owner.close()
+
+    def test_cli_missing(self, capsys):
+        assert main(["monitor", "psm_does_not_exist", "--once"]) == 1
+        assert "psm_does_not_exist" in capsys.readouterr().err
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
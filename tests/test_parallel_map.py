@@ -0,0 +1,97 @@
+"""Tests for pmap and imap_unordered."""
+import io
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from progressBarDistributed import pmap, imap_unordered
+from progressBarDistributed.parallelMap import ChunkSizer
+
+
+def _square(x):
+    return x * x
+
+
+def _slow_square(x):
+    time.sleep(0.01)
+    return x * x
+
+
+def _fail_on_three(x):
+    if x == 3:
+        raise ValueError("three")
+    return x
+
+
+class TestChunkSizer:
+    """Test the chunk size tuning with controlled timestamps."""
+
+    def test_starts_with_single_items(self):
+        sizer = ChunkSizer(n_workers=4, target_seconds=0.1)
+        assert sizer.next_size() == 1
+        sizer.observe(0, now=0.)
+        sizer.observe(0, now=1.)
+        assert sizer.next_size() == 1
+
+    def test_tiny_items_give_big_chunks(self):
+        sizer = ChunkSizer(n_workers=4, target_seconds=0.1)
+        sizer.observe(0, now=0.)
+        sizer.observe(40000, now=1.)  # 10000 items/s per worker
+        assert sizer.item_seconds == pytest.approx(1e-4)
+        assert sizer.next_size() == 1000
+        assert sizer.next_size(remaining=1600) == 100  # Load balance at the end of the run
+
+    def test_big_items_give_small_chunks(self):
+        sizer = ChunkSizer(n_workers=4, target_seconds=0.1)
+        sizer.observe(0, now=0.)
+        sizer.observe(8, now=1.)  # 0.5 s per item
+        assert sizer.next_size() == 1
+
+    def test_fixed_and_max_chunksize(self):
+        assert ChunkSizer(2, chunksize=7).next_size() == 7
+        sizer = ChunkSizer(2, max_chunksize=10)
+        sizer.observe(0, now=0.)
+        sizer.observe(100000, now=1.)
+        assert sizer.next_size() == 10
+
+
+class TestParallelMap:
+    """Test the results and the progress of the parallel maps."""
+
+    def test_pmap_keeps_order(self):
+        output = io.StringIO()
+        items = list(range(200))
+        assert pmap(_square, items, max_workers=2, tqdm_kwargs=dict(file=output)) == [x * x for x in items]
+        assert "200/200" in output.getvalue()
+
+    def test_imap_unordered_generator(self):
+        results = imap_unordered(_slow_square, (x for x in range(20)), max_workers=2, show_progress=False)
+        assert sorted(results) == [x * x for x in range(20)]
+
+    def test_fixed_chunksize(self):
+        assert pmap(_square, range(10), max_workers=2, chunksize=3, show_progress=False) == [x * x for x in range(10)]
+
+    def test_exception_is_propagated(self):
+        with pytest.raises(ValueError, match="three"):
+            pmap(_fail_on_three, range(10), max_workers=2, show_progress=False)
+
+    def test_empty(self):
+        assert pmap(_square, [], max_workers=2, show_progress=False) == []
+
+    def test_no_leaked_segment_warning(self):
+        """The parent does not attach a worker, so the resource tracker sees the segment unlinked"""
+        code = textwrap.dedent("""
+            from progressBarDistributed import pmap
+
+            if __name__ == "__main__":
+                assert pmap(abs, range(-50, 50), max_workers=2, show_progress=False)[0] == 50
+        """)
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert "leaked" not in process.stderr and "No such file" not in process.stderr
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,148 @@
+"""Tests for the per-phase step counters and timings."""
+import multiprocessing
+import time
+
+import pytest
+
+from progressBarDistributed import shmWorker
+from progressBarDistributed.shmLayout import ShmLayout, PHASE_NAME_BYTES
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+PHASES = ["load", "compute", "write"]
+
+
+def _phased_worker(worker_id, shm_name):
+    with SharedMemoryProgressBarWorker(worker_id, shm_name, flush_every=3) as pbar:
+        pbar.set_total_steps(10)
+        with pbar.phase("load"):
+            pbar.update(2)
+        with pbar.phase("compute"):
+            time.sleep(0.2)
+            for _ in range(8):
+                pbar.update(1)
+
+
+class TestPhaseLayout:
+    """Test the phase fields and the table of names."""
+
+    @pytest.mark.parametrize("layout", ["packed", "padded"])
+    def test_phase_names_round_trip(self, layout):
+        names = ["load", "compute", "écriture"]
+        layout = ShmLayout(3, layout, n_phases=len(names))
+        words = [0] * layout.n_words
+        layout.write_header(words)
+        layout.write_phase_names(words, names)
+        restored = ShmLayout.from_header(words.__getitem__)
+        assert restored.n_phases == 3
+        assert restored.read_phase_names(words.__getitem__) == tuple(names)
+        indices = {layout.phase_time_index(w, p) for w in range(3) for p in range(3)}
+        indices |= {layout.phase_steps_index(w, p) for w in range(3) for p in range(3)}
+        indices |= {layout.step_index(w) for w in range(3)} | {layout.owner_index(w) for w in range(3)}
+        assert len(indices) == 3 * 8
+        assert max(indices) < layout.phase_names_index
+
+    def test_invalid_names(self):
+        layout = ShmLayout(1, n_phases=1)
+        words = [0] * layout.n_words
+        with pytest.raises(ValueError):
+            layout.write_phase_names(words, ["x" * (PHASE_NAME_BYTES + 1)])
+        with pytest.raises(ValueError):
+            layout.write_phase_names(words, ["a", "b"])
+
+
+class TestPhases:
+    """Test phase() on the workers and phase_stats() on the progress bar."""
+
+    def test_steps_and_times(self):
+        pbar = SharedMemoryProgressBar(2, phases=PHASES)
+        workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(2)]
+        assert workers[0].phase_names == tuple(PHASES)
+        assert pbar.dominant_phase() is None
+        for worker in workers:
+            worker.set_total_steps(5)
+            with worker.phase("load"):
+                worker.update(1)
+            with worker.phase("compute"):
+                time.sleep(0.05)
+                worker.update(3)
+            worker.update(1)  # Outside of any phase
+        stats = {stats.name: stats for stats in pbar.phase_stats()}
+        assert [stats.steps for stats in stats.values()] == [2, 6, 0]
+        assert stats["compute"].seconds >= 0.1
+        assert stats["compute"].seconds > stats["load"].seconds
+        assert sum(s.time_fraction for s in stats.values()) == pytest.approx(1.)
+        assert pbar.dominant_phase() == "compute"
+        assert pbar.get_cum_steps() == 10
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+    def test_nested_phases(self):
+        pbar = SharedMemoryProgressBar(1, phases=PHASES)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            with worker.phase("compute"):
+                with worker.phase("write"):
+                    time.sleep(0.1)
+                    worker.update(2)
+                worker.update(1)
+        stats = pbar.phase_stats()
+        assert [s.steps for s in stats] == [0, 1, 2]
+        assert stats[2].seconds >= 0.1 > stats[1].seconds
+        pbar.close()
+
+    def test_running_phase(self, monkeypatch):
+        monkeypatch.setattr(shmWorker, "PHASE_PUBLISH_INTERVAL_NS", 0)
+        pbar = SharedMemoryProgressBar(1, phases=PHASES)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            with worker.phase("load"):
+                time.sleep(0.1)
+                worker.update(1)
+                assert pbar.phase_stats()[0].seconds >= 0.1  # Before the phase ends
+                assert pbar.dominant_phase() == "load"
+        pbar.close()
+
+    def test_running_phase_without_steps(self):
+        pbar = SharedMemoryProgressBar(1, phases=PHASES, heartbeat_timeout=0.2)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            with worker.phase("load"):
+                time.sleep(0.2)
+                assert pbar.phase_stats()[0].seconds >= 0.1  # Published by the heartbeats
+        assert pbar.phase_stats()[0].seconds >= 0.2
+        pbar.close()
+
+    def test_unknown_phase(self):
+        pbar = SharedMemoryProgressBar(1, phases=PHASES)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            with pytest.raises(ValueError):
+                with worker.phase("sleep"):
+                    pass
+        pbar.close()
+
+    def test_multiprocessing_buffered(self):
+        n_jobs = 2
+        with SharedMemoryProgressBar(n_jobs, phases=PHASES, show_phases=True) as pbar:
+            with multiprocessing.Pool(n_jobs) as pool:
+                pool.starmap(_phased_worker, [(i, pbar.shm_name) for i in range(n_jobs)])
+            assert [s.steps for s in pbar.phase_stats()] == [4, 16, 0]
+            assert pbar.dominant_phase() == "compute"
+            assert pbar._dominant_phase_postfix().startswith("phase: compute")
+
+    def test_growable(self):
+        with SharedMemoryProgressBar(1, growable=True, phases=PHASES) as pbar:
+            workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name) for _ in range(2)]  # Grows the chain
+            for worker in workers:
+                assert worker.phase_names == tuple(PHASES)
+                worker.set_total_steps(1)
+                with worker.phase("write"):
+                    worker.update(1)
+            for worker in workers:
+                worker.close()
+            assert pbar.capacity == 2
+            assert pbar.phase_stats()[2].steps == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,133 @@
+"""Tests for the work-rebalancing hints computed from the progress of the workers."""
+import time
+
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+from progressBarDistributed.workerStats import WorkerStats, rebalance_hints
+
+
+def _stats(worker_id, steps, total, rate):
+    eta = (total - steps) / rate if rate > 0 else None
+    return WorkerStats(worker_id, steps, total, rate, eta, False)
+
+
+class TestRebalanceHints:
+    """Test the prediction of the late workers."""
+
+    def test_late_worker(self):
+        stats = [_stats(0, 50, 100, 10.), _stats(1, 10, 100, 1.), _stats(2, 90, 100, 10.)]
+        hints = rebalance_hints(stats)
+        assert [hint.worker_id for hint in hints] == [1]
+        hint = hints[0]
+        assert hint.target_eta == pytest.approx(150 / 21)
+        assert hint.eta == pytest.approx(90)
+        assert hint.shed == int(90 - 150 / 21)
+
+    def test_no_hints(self):
+        assert rebalance_hints([_stats(0, 0, 100, 1.)]) == []  # A single active worker
+        assert rebalance_hints([_stats(0, 0, 100, 1.), _stats(1, 0, 100, 0.)]) == []  # No rate for the second
+        assert rebalance_hints([_stats(0, 0, 100, 1.), _stats(1, 0, 100, 1.2)]) == []  # Balanced
+        stats = [_stats(0, 0, 100, 10.), _stats(1, 98, 100, 0.1)]
+        assert rebalance_hints(stats, min_shed=5) == []
+
+
+class TestRebalance:
+    """Test publishing the hints to the slots of the late workers."""
+
+    def test_shed_request(self):
+        pbar = SharedMemoryProgressBar(2)
+        fast = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        slow = SharedMemoryProgressBarWorker(1, pbar.shm_name)
+        for worker in (fast, slow):
+            worker.set_total_steps(100)
+        pbar.worker_stats()
+        time.sleep(0.1)
+        fast.update(50)
+        slow.update(5)
+        hints = pbar.rebalance()
+        assert [hint.worker_id for hint in hints] == [1]
+        n = hints[0].shed
+        assert 60 <= n <= 95
+        assert fast.shed_request() == 0 and slow.shed_request() == n
+        slow.shed(n)
+        fast.add_total_steps(n)
+        assert slow.shed_request() == 0
+        assert pbar.totals.tolist() == [100 + n, 100 - n]
+        assert pbar.get_total_steps() == 200
+        fast.close()
+        slow.close()
+        pbar.close()
+
+    def test_request_is_cleared(self):
+        pbar = SharedMemoryProgressBar(2, growable=True)
+        workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name) for _ in range(2)]
+        for worker in workers:
+            worker.set_total_steps(100)
+        pbar.worker_stats()
+        time.sleep(0.1)
+        workers[0].update(50)
+        workers[1].update(5)
+        assert pbar.rebalance(publish=False)
+        assert workers[1].shed_request() == 0
+        assert pbar.rebalance()
+        assert workers[1].shed_request() > 0
+        workers[1].update(90)  # Caught up: no longer late
+        time.sleep(0.05)
+        pbar.rebalance()
+        assert workers[1].shed_request() == 0
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+    def test_shed_between_sampling_and_publishing(self, monkeypatch):
+        pbar = SharedMemoryProgressBar(3, growable=True)
+        workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name) for _ in range(3)]
+        for worker in workers:
+            worker.set_total_steps(100)
+        pbar.worker_stats()
+        time.sleep(0.1)
+        for worker, n in zip(workers, (50, 50, 5)):
+            worker.update(n)
+        slow = workers[2]
+        assert pbar.rebalance()
+        n = slow.shed_request()
+        assert n > 0
+        worker_stats = pbar.worker_stats
+
+        def shed_after_sampling():
+            stats = worker_stats()
+            slow.shed(n)  # The worker hands over the steps before the parent publishes the hints of the stale stats
+            return stats
+
+        monkeypatch.setattr(pbar, "worker_stats", shed_after_sampling)
+        hints = pbar.rebalance()
+        assert [hint.worker_id for hint in hints] == [slow.worker_id]
+        assert slow.shed_request() == 0  # Not requested again
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+    def test_grown_segments(self):
+        pbar = SharedMemoryProgressBar(1, growable=True)
+        workers = [SharedMemoryProgressBarWorker(None, pbar.shm_name) for _ in range(2)]
+        assert len(pbar._extra_segments) == 1
+        for worker in workers:
+            worker.set_total_steps(100)
+        pbar.worker_stats()
+        time.sleep(0.1)
+        workers[0].update(50)
+        workers[1].update(5)
+        hints = pbar.rebalance()
+        assert [hint.worker_id for hint in hints] == [workers[1].worker_id]
+        assert workers[1].shed_request() == hints[0].shed and workers[0].shed_request() == 0
+        for worker in workers:
+            worker.close()
+        pbar.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""Tests for drawing many progress bars from a single RenderManager thread."""
+import io
+import threading
+import time
+
+import pytest
+
+from progressBarDistributed.renderManager import RenderManager, get_render_manager
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+def _progress_threads():
+    return [thread for thread in threading.enumerate() if thread.name != "MainThread" and thread.is_alive()]
+
+
+class TestRenderManager:
+    """Test registering, drawing and unregistering progress bars."""
+
+    def test_single_thread_for_many_bars(self):
+        manager = RenderManager(refresh_seconds=0.02)
+        output = io.StringIO()
+        n_threads = len(_progress_threads())
+        pbars = [SharedMemoryProgressBar(1, render_manager=manager) for _ in range(10)]
+        for i, pbar in enumerate(pbars):
+            manager.register(pbar, desc="job%d" % i, file=output)
+        assert manager.n_bars == 10
+        assert len(_progress_threads()) == n_threads + 1
+        workers = [SharedMemoryProgressBarWorker(0, pbar.shm_name) for pbar in pbars]
+        for i, worker in enumerate(workers):
+            worker.set_total_steps(i + 1)
+            worker.update(i + 1)
+        deadline = time.monotonic() + 5
+        while manager.n_bars and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert manager.n_bars == 0  # Finished bars are unregistered
+        for i in range(10):
+            assert "job%d: 100%%" % i in output.getvalue()
+        for worker in workers:
+            worker.close()
+        for pbar in pbars:
+            pbar.close()
+        manager._wake.set()
+        time.sleep(0.1)
+        assert manager._thread is None  # The thread stops when no bar is registered
+
+    def test_stable_positions(self):
+        manager = RenderManager(refresh_seconds=10.)
+        pbars = [SharedMemoryProgressBar(1) for _ in range(3)]
+        output = io.StringIO()
+        for pbar in pbars:
+            manager.register(pbar, file=output)
+        positions = [manager._renderers[id(pbar)].kwargs["position"] for pbar in pbars]
+        assert positions == [0, 1, 2]
+        pbars[1].close()  # Unregisters the bar, the others keep their rows
+        pbar = SharedMemoryProgressBar(1)
+        manager.register(pbar, file=output)
+        assert manager._renderers[id(pbar)].kwargs["position"] == 1  # The row of the finished bar
+        for other in (pbars[0], pbars[2], pbar):
+            other.close()
+        assert manager.n_bars == 0
+        assert manager._next_position == 0 and not manager._free_positions
+
+    def test_rows_reused_next_to_long_lived_bar(self):
+        manager = RenderManager(refresh_seconds=10.)
+        output = io.StringIO()
+        long_lived = SharedMemoryProgressBar(1)
+        manager.register(long_lived, file=output)
+        for _ in range(20):
+            pbars = [SharedMemoryProgressBar(1) for _ in range(2)]
+            for pbar in pbars:
+                manager.register(pbar, file=output)
+            assert sorted(manager._renderers[id(pbar)].kwargs["position"] for pbar in pbars) == [1, 2]
+            for pbar in pbars:
+                pbar.close()
+        assert manager._renderers[id(long_lived)].kwargs["position"] == 0
+        assert manager._next_position == 1
+        long_lived.close()
+        assert manager._next_position == 0
+
+    def test_close_draws_final_progress(self):
+        manager = RenderManager(refresh_seconds=10.)
+        output = io.StringIO()
+        pbar = SharedMemoryProgressBar(1, total_mode="growing")
+        manager.register(pbar, file=output)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.add_total_steps(3)
+            worker.update(2)
+        pbar.close()  # Must not leave the manager reading released segments
+        assert "2/3" in output.getvalue()
+        assert manager.n_bars == 0
+
+    def test_context_manager(self):
+        output = io.StringIO()
+        manager = RenderManager(refresh_seconds=0.02, tqdm_kwargs={"file": output})
+        with SharedMemoryProgressBar(2, render_manager=manager) as pbar:
+            assert pbar.progress_thread is None
+            for worker_id in range(2):
+                with SharedMemoryProgressBarWorker(worker_id, pbar.shm_name) as worker:
+                    worker.set_total_steps(2)
+                    worker.update(2)
+        assert manager.n_bars == 0
+        assert "4/4" in output.getvalue()
+
+    def test_default_manager(self):
+        assert get_render_manager() is get_render_manager()
+        pbar = SharedMemoryProgressBar(1, render_manager=True)
+        assert pbar.render_manager is get_render_manager()
+        pbar.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,177 @@
+"""Tests for the adaptive refreshes of the renderer and the log-line output."""
+import io
+import os
+import sys
+import time
+
+import pytest
+
+from progressBarDistributed.renderManager import BarRenderer, LogLineBar, is_log_file
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class _Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class TestLogLineBar:
+    """Test the plain log lines written for outputs that are not terminals."""
+
+    def test_one_line_per_percent_step(self):
+        output = io.StringIO()
+        bar = LogLineBar(total=200, desc="job", file=output, log_percent=25.)
+        for _ in range(200):
+            bar.n += 1
+            bar.refresh()
+        bar.close()
+        lines = output.getvalue().splitlines()
+        assert "\r" not in output.getvalue()
+        assert len(lines) == 5  # The first refresh, then 25%, 50%, 75% and 100%
+        assert "1/200" in lines[0] and lines[1].startswith("job:  25%") and "200/200" in lines[-1]
+
+    def test_total_change_and_time(self):
+        output = io.StringIO()
+        bar = LogLineBar(desc="job", file=output, log_seconds=0.05)
+        bar.n = 1
+        bar.refresh()
+        bar.n = 2
+        bar.refresh()  # Too early, and no total
+        assert len(output.getvalue().splitlines()) == 1
+        time.sleep(0.06)
+        bar.refresh()
+        bar.refresh()  # Unchanged
+        assert len(output.getvalue().splitlines()) == 2
+        bar.total = 10
+        bar.refresh()
+        assert "2/10" in output.getvalue().splitlines()[-1]
+        bar.close()
+        assert len(output.getvalue().splitlines()) == 3
+
+    def test_growing_total(self):
+        output = io.StringIO()
+        bar = LogLineBar(desc="job", file=output, log_percent=25.)
+        for n in range(1, 1001):
+            bar.n = n
+            bar.total = n + 10  # Discovered one item ahead, like pmap over a generator
+            bar.refresh()
+        lines = output.getvalue().splitlines()
+        assert len(lines) == 4  # The first refresh, then 25%, 50% and 75%
+        bar.close()
+        assert "1000/1010" in output.getvalue().splitlines()[-1]
+
+class TestBarRenderer:
+    """Test skipping unchanged redraws and adapting the refresh interval."""
+
+    def _renderer(self, pbar, **kwargs):
+        renderer = BarRenderer(pbar, refresh_seconds=1., max_refresh_seconds=8., output="bar", file=io.StringIO(),
+                               **kwargs)
+        renderer.open()
+        return renderer
+
+    def test_skips_unchanged_redraws(self):
+        pbar = SharedMemoryProgressBar(1)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(100)
+            renderer = self._renderer(pbar)
+            now = time.monotonic()
+            assert not renderer.update(now)
+            assert renderer.n_redraws == 1
+            for k in range(1, 4):
+                now += renderer.interval
+                renderer.update(now)
+            assert renderer.n_redraws == 1  # Nothing changed
+            worker.update(1)
+            renderer.update(now + renderer.interval)
+            assert renderer.n_redraws == 2
+            renderer.close()
+        pbar.close()
+
+    def test_interval_adapts_to_rate(self):
+        pbar = SharedMemoryProgressBar(1)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(100)
+            renderer = self._renderer(pbar)
+            start = now = time.monotonic()
+            renderer.update(now)
+            for _ in range(4):
+                now += renderer.interval
+                renderer.update(now)
+            assert renderer.interval == 8.  # Backed off while nothing happened
+            worker.update(4)
+            now += 8.
+            renderer.update(now)
+            assert renderer.interval == pytest.approx((now - start) / 4)  # About one refresh per step
+            worker.update(50)
+            now += renderer.interval
+            renderer.update(now)
+            assert renderer.interval == 1.  # Fast steps: the shortest interval
+            n_redraws = renderer.n_redraws
+            worker.update(1)
+            renderer.update(now + 0.5)
+            assert renderer.n_redraws == n_redraws  # Not due yet
+            renderer.close()
+        pbar.close()
+
+    def test_completion_checked_between_refreshes(self):
+        pbar = SharedMemoryProgressBar(1)
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(2)
+            renderer = self._renderer(pbar)
+            now = time.monotonic()
+            renderer.update(now)
+            worker.update(2)
+            assert renderer.update(now + 0.01)
+            renderer.close()
+        pbar.close()
+
+    def test_output_auto(self, tmp_path):
+        pbar = SharedMemoryProgressBar(1)
+        assert BarRenderer(pbar, file=io.StringIO()).output == "bar"
+        assert BarRenderer(pbar, file=_Terminal()).output == "bar"
+        with open(tmp_path / "job.log", "w") as log:
+            assert BarRenderer(pbar, file=log).output == "log"
+        with pytest.raises(ValueError):
+            BarRenderer(pbar, output="html")
+        pbar.close()
+
+    def test_is_log_file(self, tmp_path, monkeypatch):
+        read_fd, write_fd = os.pipe()
+        with open(tmp_path / "job.log", "w") as log, os.fdopen(read_fd) as _, os.fdopen(write_fd, "w") as pipe:
+            assert is_log_file(log)
+            assert is_log_file(pipe)
+            assert not is_log_file(io.StringIO())
+            assert not is_log_file(None)
+            monkeypatch.setitem(sys.modules, "ipykernel", sys)  # An IPython kernel
+            assert not is_log_file(log)
+            assert not is_log_file(pipe)
+        assert not is_log_file(log)  # Closed
+
+
+class TestProgressThreadOutput:
+    """Test the output of the progress thread when it is a log file."""
+
+    def test_log_lines(self, tmp_path):
+        pbar = SharedMemoryProgressBar(1)
+        path = tmp_path / "job.log"
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker, open(path, "w") as output:
+            worker.set_total_steps(1000)
+            pbar.progress_thread = pbar.progress_bar_thread(0.001, file=output, desc="job")
+            for _ in range(1000):
+                worker.update(1)
+                if _ % 100 == 0:
+                    time.sleep(0.005)
+            pbar.progress_thread.join(10)
+        pbar.close()
+        text = path.read_text()
+        lines = text.splitlines()
+        assert "\r" not in text
+        assert 1 <= len(lines) <= 11
+        assert "1000/1000" in lines[-1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
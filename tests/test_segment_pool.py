@@ -0,0 +1,168 @@
+"""Tests for recycling the segments of short-lived progress bars with a SegmentPool."""
+import threading
+import time
+
+import pytest
+
+from progressBarDistributed import segmentPool
+from progressBarDistributed.joblibParallel import _get_worker, _close_workers
+from progressBarDistributed.mmapProgressBar import MmapProgressBar
+from progressBarDistributed.segmentPool import SegmentPool, get_segment_pool
+from progressBarDistributed.shmLayout import GENERATION_IDX
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class TestSegmentPool:
+    """Test acquiring and releasing segments."""
+
+    def test_reuses_segment_and_resets_counters(self):
+        with SegmentPool() as pool:
+            pbar = SharedMemoryProgressBar(2, pool=pool, aggregates=True)
+            name = pbar.shm_name
+            with SharedMemoryProgressBarWorker(0, name) as worker:
+                worker.set_total_steps(5)
+                worker.update(3)
+            pbar.close()
+            assert pool.n_idle == 1
+            pbar = SharedMemoryProgressBar(2, pool=pool, aggregates=True)
+            assert pbar.shm_name == name
+            assert pool.n_reused == 1 and pool.n_idle == 0
+            assert pbar.get_cum_steps() == 0
+            assert pbar.totals.tolist() == [-1, -1]
+            assert not pbar.progress_bar_closed
+            assert pbar.progress[GENERATION_IDX] == 1
+            with SharedMemoryProgressBarWorker(1, name) as worker:
+                worker.set_total_steps(1)
+                worker.update(1)
+            assert pbar.get_cum_steps() == 1
+            pbar.close()
+            pbar.close()  # A second close must not unlink the segment of the pool
+            assert pool.n_idle == 1
+            SharedMemoryProgressBarWorker(0, name).close()
+        with pytest.raises(FileNotFoundError):
+            SharedMemoryProgressBarWorker(0, name)  # Closing the pool unlinks its idle segments
+
+    def test_size_matching(self):
+        with SegmentPool(max_segments=1, max_waste=4.) as pool:
+            SharedMemoryProgressBar(100, pool=pool).close()
+            large = pool._idle[0][1].name
+            pbar = SharedMemoryProgressBar(1, pool=pool)  # Too small for the idle segment
+            assert pbar.shm_name != large
+            pbar.close()  # The pool is full: unlinked
+            assert pool.n_idle == 1 and pool.n_missed == 2
+            pbar = SharedMemoryProgressBar(60, pool=pool)
+            assert pbar.shm_name == large
+            assert pbar.n_workers == 60 and pbar.totals.shape == (60,)
+            pbar.close()
+
+    def test_backends_are_not_mixed(self, tmp_path):
+        with SegmentPool() as pool:
+            MmapProgressBar(1, dir=str(tmp_path), pool=pool).close()
+            pbar = SharedMemoryProgressBar(1, pool=pool)
+            assert pool.n_reused == 0
+            pbar.close()
+            pbar = MmapProgressBar(1, dir=str(tmp_path), pool=pool)
+            assert pool.n_reused == 1
+            pbar.close()
+        assert not list(tmp_path.iterdir())
+
+    def test_options(self):
+        with pytest.raises(ValueError):
+            SharedMemoryProgressBar(1, shm_name="psm_test", pool=True)
+        assert get_segment_pool() is get_segment_pool()
+        pbar = SharedMemoryProgressBar(1, pool=True)
+        assert pbar._pool is get_segment_pool()
+        pbar.close()
+
+
+class TestStaleWorkers:
+    """Test that the workers of a closed bar never write into the bar reusing its segment."""
+
+    def test_writes_are_dropped(self):
+        with SegmentPool() as pool:
+            pbar = SharedMemoryProgressBar(2, pool=pool, aggregates=True, n_units=4, phases=["load"])
+            stale = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+            buffered = SharedMemoryProgressBarWorker(1, pbar.shm_name, flush_every=100)
+            stale.set_total_steps(10)
+            pbar.close()
+            assert stale.progress_bar_closed
+            pbar = SharedMemoryProgressBar(2, pool=pool, aggregates=True, n_units=4, phases=["load"])
+            assert stale.progress_bar_closed  # Recycled
+            with stale.phase("load"):
+                stale.update(2)
+            stale.set_total_steps(3)
+            stale.add_total_steps(1)
+            assert not stale.mark_done(1)
+            buffered.update(5)
+            buffered.close()
+            stale.close()  # Must not free the slot of the new bar
+            assert pbar.get_cum_steps() == 0
+            assert pbar.totals.tolist() == [-1, -1]
+            assert pbar.done_units() == []
+            assert pbar.phase_stats()[0].steps == 0
+            with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+                assert not worker.progress_bar_closed
+                worker.set_total_steps(2)
+                worker.update(2)
+            assert pbar.get_cum_steps() == 2
+            pbar.close()
+
+    def test_worker_attached_to_idle_segment(self):
+        with SegmentPool() as pool:
+            pbar = SharedMemoryProgressBar(1, pool=pool)
+            name = pbar.shm_name
+            pbar.close()
+            worker = SharedMemoryProgressBarWorker(0, name)  # Too late for the closed bar
+            pbar = SharedMemoryProgressBar(1, pool=pool)
+            worker.update(1)
+            worker.close()
+            assert pbar.get_cum_steps() == 0
+            pbar.close()
+
+    def test_release_waits_for_writes_in_progress(self):
+        with SegmentPool() as pool:
+            pbar = SharedMemoryProgressBar(1, pool=pool)
+            worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+            assert worker._begin_write()  # The worker checked the generation, and is preempted before writing
+            closing = threading.Thread(target=pbar.close)
+            closing.start()
+            time.sleep(0.1)
+            assert closing.is_alive()
+            worker._slot_atomic.fetch_add(worker._step_idx, 3)  # The write lands in the closed bar
+            worker._end_write()
+            closing.join()
+            pbar = SharedMemoryProgressBar(1, pool=pool)
+            worker.update(1)
+            assert pbar.get_cum_steps() == 0
+            worker.close()
+            pbar.close()
+
+    def test_unfinished_write_unlinks_segment(self, monkeypatch):
+        monkeypatch.setattr(segmentPool, "WRITES_TIMEOUT", 0.05)
+        with SegmentPool() as pool:
+            pbar = SharedMemoryProgressBar(1, pool=pool)
+            worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+            assert worker._begin_write()  # Never ended, like a worker killed mid-write
+            pbar.close()
+            assert pool.n_idle == 0
+            worker.close()
+
+    def test_cached_joblib_worker_is_replaced(self):
+        with SegmentPool() as pool:
+            pbar = SharedMemoryProgressBar(1, growable=True, pool=pool)
+            name = pbar.shm_name
+            _get_worker(name).update(1)
+            pbar.close()
+            pbar = SharedMemoryProgressBar(1, growable=True, pool=pool)
+            assert pbar.shm_name == name
+            _get_worker(name).update(1)
+            assert pbar.get_cum_steps() == 1
+            _close_workers()
+            pbar.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
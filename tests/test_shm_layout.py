@@ -0,0 +1,72 @@
+"""Tests for the packed and padded shared memory layouts."""
+import pytest
+
+from progressBarDistributed.shmLayout import ShmLayout, LAYOUT_PACKED, LAYOUT_PADDED, WORDS_PER_CACHE_LINE
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class TestShmLayout:
+    """Test the index computations of ShmLayout."""
+
+    def test_packed_indices(self):
+        layout = ShmLayout(4, "packed")
+        steps = [layout.step_index(i) for i in range(4)]
+        totals = [layout.total_index(i) for i in range(4)]
+        assert steps == list(range(layout.header_words, layout.header_words + 4))
+        assert totals == list(range(layout.header_words + 4, layout.header_words + 8))
+        assert layout.n_words == layout.header_words + 4 * layout.n_fields
+
+    def test_padded_indices_one_cache_line_per_worker(self):
+        layout = ShmLayout(4, "padded")
+        steps = [layout.step_index(i) for i in range(4)]
+        cache_lines = {idx // WORDS_PER_CACHE_LINE for idx in steps}
+        assert len(cache_lines) == 4
+        assert 0 not in cache_lines  # The header has its own cache line
+        for i in range(4):
+            assert layout.total_index(i) // WORDS_PER_CACHE_LINE == steps[i] // WORDS_PER_CACHE_LINE
+
+    def test_header_round_trip(self):
+        layout = ShmLayout(3, "padded")
+        words = [0] * layout.n_words
+        layout.write_header(words)
+        restored = ShmLayout.from_header(words.__getitem__)
+        assert restored.version == LAYOUT_PADDED
+        assert restored.n_workers == 3
+        assert restored.n_words == layout.n_words
+
+    def test_invalid_layout(self):
+        with pytest.raises(ValueError):
+            ShmLayout(2, "sparse")
+        with pytest.raises(ValueError):
+            ShmLayout.from_header([2, 99, 8].__getitem__)
+
+
+class TestLayoutsEndToEnd:
+    """Workers attach correctly whatever the layout chosen by the parent."""
+
+    @pytest.mark.parametrize("layout", ["packed", "padded"])
+    def test_workers_attach(self, layout):
+        n_workers = 5
+        with SharedMemoryProgressBar(n_workers, layout=layout) as pbar:
+            assert not pbar.are_workers_ready()
+            workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(n_workers)]
+            for i, worker in enumerate(workers):
+                assert worker.n_workers == n_workers
+                assert worker.layout.version == (LAYOUT_PADDED if layout == "padded" else LAYOUT_PACKED)
+                worker.set_total_steps(i + 1)
+            assert pbar.are_workers_ready()
+            assert pbar.get_total_steps() == sum(range(1, n_workers + 1))
+            for i, worker in enumerate(workers):
+                worker.update(i + 1)
+                assert worker.get_total_steps() == i + 1
+            assert pbar.get_cum_steps() == sum(range(1, n_workers + 1))
+            assert list(pbar.steps) == list(range(1, n_workers + 1))
+            for worker in workers:
+                worker.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
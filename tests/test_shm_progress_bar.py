@@ -2,7 +2,9 @@
 import multiprocessing
 import os
 import random
+import subprocess
 import sys
+import textwrap
 import time
 from subprocess import Popen
 
@@ -316,6 +318,49 @@ class TestProgressBarBasics:
             worker0.close()
             worker1.close()
 
+    def test_update_fast_path(self):
+        """Workers that only add to their slot bind update() to the fast path, and leave it when a phase starts."""
+        with SharedMemoryProgressBar(1, phases=["load"]) as pbar:
+            worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+            assert worker.update == worker._update_fast
+            worker.set_total_steps(3)
+            worker.update(1)
+            with worker.phase("load"):
+                assert worker.update != worker._update_fast
+                worker.update(1)
+            assert worker.update == worker._update_fast
+            sequence = pbar._wakeup.sequence()
+            worker.update(1)
+            assert pbar._wakeup.sequence() != sequence  # The worker is done
+            assert pbar.get_cum_steps() == 3 and pbar.phase_stats()[0].steps == 1
+            worker.close()
+            with pytest.raises(IndexError):
+                worker.update(1)  # The segment is released
+        with SharedMemoryProgressBar(1, aggregates=True) as pbar:
+            with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+                assert worker.update != worker._update_fast
+
+
+class TestResourceTracker:
+    """Test that attaching to a segment never breaks the tracking of the segments of this process."""
+
+    def test_worker_in_owner_process(self):
+        """The owner unlinks its segment, so the tracker has nothing to clean up, and other segments stay tracked"""
+        code = textwrap.dedent("""
+            from multiprocessing import shared_memory
+            from progressBarDistributed.shmProgressBar import SharedMemoryProgressBar, SharedMemoryProgressBarWorker
+
+            pbar = SharedMemoryProgressBar(1)
+            SharedMemoryProgressBarWorker(0, pbar.shm_name).close()
+            SharedMemoryProgressBarWorker(0, pbar.shm_name).close()
+            pbar.close()
+            leaked = shared_memory.SharedMemory(create=True, size=8)  # Still tracked: cleaned up at exit
+            leaked.close()
+        """)
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert "There appear to be 1 leaked shared_memory objects" in process.stderr
+        assert "No such file" not in process.stderr
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""Tests for the in-process backend of worker threads."""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import pytest
+
+from progressBarDistributed import pmap, ProgressParallel
+from progressBarDistributed.monitor import attach
+from progressBarDistributed.renderManager import RenderManager
+from progressBarDistributed.shmWorker import get_worker
+from progressBarDistributed.threadProgressBar import ThreadProgressBar
+from progressBarDistributed.threadWorker import LocalSegment, ThreadProgressBarWorker, is_local_name
+
+
+def _shm_names():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+def _square(x):
+    return x * x
+
+
+class TestLocalSegment:
+    """Test the anonymous memory of in-process progress bars."""
+
+    def test_attach_and_unlink(self):
+        segment = LocalSegment(create=True, size=64)
+        assert is_local_name(segment.name)
+        other = LocalSegment(segment.name)
+        other.buf[0] = 7
+        assert segment.buf[0] == 7 and other.size == 64
+        with pytest.raises(FileExistsError):
+            LocalSegment(segment.name, create=True, size=64)
+        other.close()
+        segment.close()
+        segment.unlink()
+        assert not is_local_name(segment.name)
+        with pytest.raises(FileNotFoundError):
+            LocalSegment(segment.name)
+
+
+class TestThreadProgressBar:
+    """Test progress bars updated by threads of the process."""
+
+    def test_fixed_slots(self):
+        before = _shm_names()
+        pbar = ThreadProgressBar(2, growable=False)
+        assert _shm_names() == before  # No shared memory
+        workers = [get_worker(i, pbar.shm_name) for i in range(2)]
+        assert all(isinstance(worker, ThreadProgressBarWorker) for worker in workers)
+        for worker in workers:
+            worker.set_total_steps(3)
+            worker.update(3)
+            worker.close()
+        assert pbar.are_workers_ready()
+        assert pbar.get_cum_steps() == 6 and pbar.get_total_steps() == 6
+        pbar.close()
+        assert not is_local_name(pbar.shm_name)
+
+    def test_one_slot_per_thread(self):
+        output = io.StringIO()
+        n_items = 2000
+        with ThreadProgressBar(2, render_manager=RenderManager(0.01, {"file": output})) as pbar:
+            pbar.worker().set_total_steps(n_items)
+
+            def task(item):
+                pbar.worker().update(1)
+                return threading.get_ident(), pbar.worker().worker_id
+
+            with ThreadPoolExecutor(4) as executor:
+                slots = dict(executor.map(task, range(n_items)))
+            assert pbar.get_cum_steps() == n_items
+            assert len(set(slots.values())) == len(slots)  # Distinct slots, the bar grew for them
+            assert pbar.capacity >= len(slots) + 1
+        assert "%d/%d" % (n_items, n_items) in output.getvalue()
+
+    def test_view(self):
+        pbar = ThreadProgressBar(1, growable=False, counters=["bytes"])
+        with ThreadProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(2)
+            worker.update(1)
+            worker.increment("bytes", 10)
+        view = attach(pbar.shm_name)
+        assert isinstance(view, ThreadProgressBar) and view.read_only
+        assert view.get_cum_steps() == 1 and view.counter_stats()[0].value == 10
+        view.close()
+        assert is_local_name(pbar.shm_name)
+        pbar.close()
+
+
+class TestExecutors:
+    """Test the automatic selection of the in-process backend for threads."""
+
+    def test_pmap_threads(self):
+        assert pmap(_square, range(100), max_workers=4, executor="thread", show_progress=False) == \
+            [x * x for x in range(100)]
+        with pytest.raises(ValueError):
+            pmap(_square, range(3), executor="fibers")
+
+    @pytest.mark.parametrize("kwargs", [dict(n_jobs=4, backend="threading"), dict(n_jobs=4, prefer="threads"),
+                                        dict(n_jobs=1)])
+    def test_joblib_threads(self, kwargs):
+        parallel = ProgressParallel(show_progress=False, **kwargs)
+        before = _shm_names()
+        assert parallel(joblib.delayed(_square)(x) for x in range(50)) == [x * x for x in range(50)]
+        assert isinstance(parallel.progress_bar, ThreadProgressBar)
+        assert parallel.progress_bar.get_cum_steps() == 50
+        assert _shm_names() == before
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
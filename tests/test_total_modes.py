@@ -0,0 +1,96 @@
+"""Tests for growing and unknown totals."""
+import io
+import time
+
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+
+
+class TestAddTotalSteps:
+    """Test that workers can add to their totals at any time."""
+
+    @pytest.mark.parametrize("aggregates", [False, True])
+    def test_add_total_steps(self, aggregates):
+        pbar = SharedMemoryProgressBar(2, aggregates=aggregates)
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        worker.add_total_steps(5)  # The unset total (-1) starts from 0
+        assert worker.get_total_steps() == 5
+        worker.add_total_steps(3)
+        assert worker.get_total_steps() == 8
+        pbar.set_total_steps(2, 1)
+        assert pbar.are_workers_ready()
+        assert pbar.get_total_steps() == 10
+        worker.close()
+        pbar.close()
+
+    def test_claimed_slots(self):
+        with SharedMemoryProgressBar(1, growable=True, aggregates=True) as pbar:
+            for _ in range(2):
+                with SharedMemoryProgressBarWorker(None, pbar.shm_name) as worker:
+                    worker.set_total_steps(2)
+                    worker.add_total_steps(3)
+                    worker.update(5)
+            assert pbar.get_total_steps() == pbar.get_cum_steps() == 10
+
+
+class TestTotalModes:
+    """Test how the progress thread handles the totals in each mode."""
+
+    def test_fixed_total_raised_later(self):
+        pbar = SharedMemoryProgressBar(1)
+        output = io.StringIO()
+        with SharedMemoryProgressBarWorker(0, pbar.shm_name) as worker:
+            worker.set_total_steps(5)
+            thread = pbar.progress_bar_thread(0.01, file=output)
+            worker.update(3)
+            worker.set_total_steps(10)
+            time.sleep(0.05)
+            assert thread.is_alive()
+            worker.update(7)
+        thread.join(10)
+        assert not thread.is_alive()
+        assert "10/10" in output.getvalue()
+        pbar.close()
+
+    def test_growing_total(self):
+        pbar = SharedMemoryProgressBar(1, total_mode="growing")
+        output = io.StringIO()
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        worker.add_total_steps(5)
+        pbar.progress_thread = pbar.progress_bar_thread(0.01, file=output)
+        worker.update(5)
+        time.sleep(0.1)
+        assert pbar.progress_thread.is_alive()  # Reaching the current total does not end the bar
+        worker.add_total_steps(5)
+        worker.update(5)
+        time.sleep(0.1)
+        assert "5/5" in output.getvalue() and "10/10" in output.getvalue()
+        worker.close()
+        pbar.close()
+        assert not pbar.progress_thread.is_alive()
+
+    def test_unknown_total(self):
+        pbar = SharedMemoryProgressBar(2, total_mode="unknown")
+        output = io.StringIO()
+        pbar.progress_thread = pbar.progress_bar_thread(0.01, file=output)
+        with SharedMemoryProgressBarWorker(1, pbar.shm_name) as worker:  # Never reports a total
+            worker.update(42)
+            time.sleep(0.1)
+        snapshot = pbar.snapshot()
+        assert snapshot.steps == 42 and not snapshot.done
+        pbar.close()
+        assert "42it" in output.getvalue()
+
+    def test_invalid_modes(self):
+        with pytest.raises(ValueError):
+            SharedMemoryProgressBar(1, total_mode="infinite")
+        with pytest.raises(ValueError):
+            SharedMemoryProgressBar(1, growable=True, total_mode="fixed")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
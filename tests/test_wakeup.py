@@ -0,0 +1,89 @@
+"""Tests for the event-driven wakeups of the progress thread."""
+import threading
+import time
+
+import pytest
+
+from progressBarDistributed.atomicOps import AtomicInt64Array
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+from progressBarDistributed.wakeup import SharedWakeup
+
+LONG_REFRESH = 30
+
+
+class TestSharedWakeup:
+    """Test the wait/notify primitive."""
+
+    def test_wait_returns_if_sequence_changed(self):
+        atomic = AtomicInt64Array(bytearray(8 * 2))
+        wakeup = SharedWakeup(atomic, 1)
+        sequence = wakeup.sequence()
+        wakeup.notify()
+        t0 = time.monotonic()
+        wakeup.wait(sequence, LONG_REFRESH, threading.Event())
+        assert wakeup.native is False or time.monotonic() - t0 < 1
+        atomic.release()
+
+    def test_notify_wakes_up_waiter(self):
+        atomic = AtomicInt64Array(bytearray(8 * 2))
+        wakeup = SharedWakeup(atomic, 1)
+        if not wakeup.native:
+            pytest.skip("futex not available")
+        sequence = wakeup.sequence()
+        timer = threading.Timer(0.1, wakeup.notify)
+        timer.start()
+        t0 = time.monotonic()
+        wakeup.wait(sequence, LONG_REFRESH)
+        assert time.monotonic() - t0 < 5
+        timer.join()
+        atomic.release()
+
+
+class TestFastProgressThread:
+    """The progress thread reacts right away instead of sleeping a full refresh interval."""
+
+    def test_close_while_waiting_for_workers(self):
+        pbar = SharedMemoryProgressBar(2)
+        pbar.progress_thread = pbar.progress_bar_thread(refresh_seconds=LONG_REFRESH)
+        time.sleep(0.1)
+        t0 = time.monotonic()
+        pbar.close()
+        assert time.monotonic() - t0 < 5
+
+    def test_close_while_running(self):
+        pbar = SharedMemoryProgressBar(1)
+        pbar.progress_thread = pbar.progress_bar_thread(refresh_seconds=LONG_REFRESH)
+        worker = SharedMemoryProgressBarWorker(0, pbar.shm_name)
+        worker.set_total_steps(10)
+        worker.update(1)
+        time.sleep(0.1)
+        t0 = time.monotonic()
+        pbar.close()
+        assert time.monotonic() - t0 < 5
+        worker.close()
+
+    def test_completion_is_noticed(self):
+        pbar = SharedMemoryProgressBar(2)
+        if not pbar._wakeup.native:
+            pbar.close()
+            pytest.skip("futex not available")
+        thread = pbar.progress_bar_thread(refresh_seconds=LONG_REFRESH)
+        workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name, flush_every=4) for i in range(2)]
+        for worker in workers:
+            worker.set_total_steps(10)
+        time.sleep(0.1)
+        for worker in workers:
+            for _ in range(10):
+                worker.update(1)
+            worker.close()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert pbar.get_cum_steps() == 20
+        pbar.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
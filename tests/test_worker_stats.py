@@ -0,0 +1,88 @@
+"""Tests for per-worker throughput statistics and straggler detection."""
+import time
+
+import pytest
+
+from progressBarDistributed.shmProgressBar import (
+    SharedMemoryProgressBarWorker,
+    SharedMemoryProgressBar,
+)
+from progressBarDistributed.workerStats import WorkerRateTracker
+
+
+class TestWorkerRateTracker:
+    """Test the rate estimation with controlled timestamps."""
+
+    def test_rates_and_etas(self):
+        tracker = WorkerRateTracker(rate_window=1., straggler_ratio=0.5)
+        tracker.sample([0, 0, 0], now=0.)
+        tracker.sample([10, 20, 1], now=1.)
+        stats = tracker.stats([10, 20, 1], [100, 40, 100])
+        assert [s.rate for s in stats] == pytest.approx([10., 20., 1.])
+        assert stats[0].eta == pytest.approx(9.)
+        assert stats[1].eta == pytest.approx(1.)
+        assert [s.straggler for s in stats] == [False, False, True]
+
+    def test_moving_average(self):
+        tracker = WorkerRateTracker(rate_window=1.)
+        tracker.sample([0], now=0.)
+        tracker.sample([10], now=1.)
+        tracker.sample([10], now=2.)  # Stalled during one second
+        rate = tracker.stats([10], [100])[0].rate
+        assert 0 < rate < 10
+
+    def test_finished_workers_are_not_stragglers(self):
+        tracker = WorkerRateTracker(straggler_ratio=0.5)
+        tracker.sample([0, 0, 0], now=0.)
+        tracker.sample([10, 10, 5], now=1.)
+        stats = tracker.stats([10, 10, 5], [100, 100, 5])
+        assert not any(s.straggler for s in stats)
+        assert stats[2].eta == 0.
+
+    def test_growth(self):
+        tracker = WorkerRateTracker()
+        tracker.sample([0], now=0.)
+        tracker.sample([5, 3], now=1.)
+        tracker.sample([10, 6], now=2.)
+        assert len(tracker.stats([10, 6], [20, 20])) == 2
+
+
+class TestWorkerStatsEndToEnd:
+    """Test worker_stats() on a real progress bar."""
+
+    def test_straggler_detection(self):
+        n_workers = 4
+        with SharedMemoryProgressBar(n_workers, straggler_ratio=0.5) as pbar:
+            workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(n_workers)]
+            for worker in workers:
+                worker.set_total_steps(1000)
+            pbar.worker_stats()
+            for worker in workers[:-1]:
+                worker.update(100)
+            workers[-1].update(5)
+            time.sleep(0.2)
+            stats = pbar.worker_stats()
+            assert [s.steps for s in stats] == [100, 100, 100, 5]
+            assert pbar.stragglers() == [n_workers - 1]
+            assert stats[0].rate > stats[-1].rate > 0
+            for worker in workers:
+                worker.close()
+
+    def test_slowest_workers_postfix(self):
+        with SharedMemoryProgressBar(2, show_slowest=1) as pbar:
+            assert pbar.track_workers
+            workers = [SharedMemoryProgressBarWorker(i, pbar.shm_name) for i in range(2)]
+            for worker in workers:
+                worker.set_total_steps(100)
+            pbar.worker_stats()
+            workers[0].update(50)
+            workers[1].update(1)
+            time.sleep(0.1)
+            assert pbar._slowest_workers_postfix().startswith("w1")
+            for worker in workers:
+                worker.update(100)
+                worker.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])